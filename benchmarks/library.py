@@ -0,0 +1,238 @@
+"""
+Generates a synthetic music library made of small but valid MP3, FLAC, M4A and OGG files.
+
+Usage: python benchmarks/library.py DIRECTORY [--files 100] [--size 256] [--formats mp3,flac,m4a,ogg] [--tagged 0.5]
+
+Files contain filler rather than real audio, they can be tagged but not converted. Tagged files carry title and
+artist, untagged ones have no such tags and are named "Artist - Title". Songs are named "Song N" and artists
+"Artist N" so that the local stand-ins (see "standins.py") can match them.
+"""
+from typing import List, Dict, Any
+from argparse import ArgumentParser
+import random
+import struct
+import sys
+import os
+
+FORMATS: List[str] = ['mp3', 'flac', 'm4a', 'ogg']
+# An MPEG-1 Layer III frame header (128 kbps, 44.1 kHz, stereo) and the length of the frames it describes.
+MP3_FRAME_HEADER: bytes = b'\xff\xfb\x90\x00'
+MP3_FRAME_LENGTH: int = 417
+SAMPLE_RATE: int = 44100
+# Titles having these suffixes exercise the shorter search query used as fallback.
+SUFFIXES: List[str] = ['', '', '', ' (Live)', ' (Remastered)', ' [Bonus Track]']
+
+
+def encode_atom(name: bytes, payload: bytes) -> bytes:
+    """
+    Encodes an MP4 atom.
+    :param name: The four characters atom name.
+    :type name: bytes
+    :param payload: The atom contents.
+    :type payload: bytes
+    :return: The encoded atom.
+    :rtype: bytes
+    """
+    return struct.pack('>I', len(payload) + 8) + name + payload
+
+
+def encode_ogg_page(packets: List[bytes], sequence: int, position: int, first: bool, last: bool) -> bytes:
+    """
+    Encodes an Ogg page containing the given packets.
+    :param packets: A list containing the packets to store in the page.
+    :type packets: List[bytes]
+    :param sequence: An integer number representing the page number.
+    :type sequence: int
+    :param position: An integer number representing the granule position, the number of samples so far.
+    :type position: int
+    :param first: If set to "True" the page is marked as the first one of the stream.
+    :type first: bool
+    :param last: If set to "True" the page is marked as the last one of the stream.
+    :type last: bool
+    :return: The encoded page.
+    :rtype: bytes
+    """
+    from mutagen.ogg import OggPage
+    page: Any = OggPage()
+    page.packets = packets
+    page.serial = 1
+    page.sequence = sequence
+    page.position = position
+    page.first = first
+    page.last = last
+    return page.write()
+
+
+def create_mp3(path: str, size: int) -> None:
+    """
+    Creates an MP3 file made of empty frames.
+    :param path: A string containing the path to the file to create.
+    :type path: str
+    :param size: An integer number representing the approximate file size in bytes.
+    :type size: int
+    """
+    frame: bytes = MP3_FRAME_HEADER + b'\x00' * (MP3_FRAME_LENGTH - len(MP3_FRAME_HEADER))
+    with open(path, 'wb') as file:
+        file.write(frame * max(size // MP3_FRAME_LENGTH, 1))
+
+
+def create_flac(path: str, size: int) -> None:
+    """
+    Creates a FLAC file having a stream info block followed by filler data.
+    :param path: A string containing the path to the file to create.
+    :type path: str
+    :param size: An integer number representing the approximate file size in bytes.
+    :type size: int
+    """
+    samples: int = SAMPLE_RATE * max(size // 100000, 1)
+    # Sample rate (20 bits), channels - 1 (3 bits), bits per sample - 1 (5 bits) and total samples (36 bits).
+    packed: int = (SAMPLE_RATE << 44) | (1 << 41) | (15 << 36) | samples
+    info: bytes = struct.pack('>HH', 4096, 4096) + b'\x00' * 6 + struct.pack('>Q', packed) + b'\x00' * 16
+    with open(path, 'wb') as file:
+        file.write(b'fLaC' + struct.pack('>I', (1 << 31) | len(info)) + info + b'\x00' * size)
+
+
+def create_m4a(path: str, size: int) -> None:
+    """
+    Creates an M4A file having the movie header only followed by filler media data.
+    :param path: A string containing the path to the file to create.
+    :type path: str
+    :param size: An integer number representing the approximate file size in bytes.
+    :type size: int
+    """
+    duration: int = max(size // 16000, 1)
+    # Version and flags, creation and modification time, time scale and duration, then the fixed fields.
+    mvhd: bytes = struct.pack('>IIIII', 0, 0, 0, 1000, duration * 1000) + struct.pack('>IH', 0x00010000, 0x0100)
+    mvhd += b'\x00' * 10 + struct.pack('>9I', 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+    mvhd += b'\x00' * 24 + struct.pack('>I', 2)
+    with open(path, 'wb') as file:
+        file.write(encode_atom(b'ftyp', b'M4A \x00\x00\x02\x00M4A mp42isom'))
+        file.write(encode_atom(b'moov', encode_atom(b'mvhd', mvhd)))
+        file.write(encode_atom(b'mdat', b'\x00' * size))
+
+
+def create_ogg(path: str, size: int) -> None:
+    """
+    Creates an Ogg Vorbis file having valid headers followed by pages of filler data.
+    :param path: A string containing the path to the file to create.
+    :type path: str
+    :param size: An integer number representing the approximate file size in bytes.
+    :type size: int
+    """
+    identification: bytes = b'\x01vorbis' + struct.pack('<IBIiiiBB', 0, 2, SAMPLE_RATE, 0, 128000, 0, 0xb8, 1)
+    vendor: bytes = b'diesis benchmarks'
+    comment: bytes = b'\x03vorbis' + struct.pack('<I', len(vendor)) + vendor + struct.pack('<I', 0) + b'\x01'
+    setup: bytes = b'\x05vorbis' + b'\x00' * 32
+    pages: List[bytes] = [encode_ogg_page([identification], 0, 0, True, False)]
+    pages.append(encode_ogg_page([comment, setup], 1, 0, False, False))
+    count: int = max(size // 4096, 1)
+    for i in range(0, count):
+        pages.append(encode_ogg_page([b'\x00' * 4096], i + 2, (i + 1) * SAMPLE_RATE // 4, False, i == count - 1))
+    with open(path, 'wb') as file:
+        file.write(b''.join(pages))
+
+
+def tag(path: str, title: str, artist: str) -> None:
+    """
+    Writes title and artist into the given file.
+    :param path: A string containing the path to the file.
+    :type path: str
+    :param title: A string containing the song title.
+    :type title: str
+    :param artist: A string containing the song artist.
+    :type artist: str
+    """
+    extension: str = os.path.splitext(path)[1][1:]
+    if extension == 'mp3':
+        from mutagen.id3 import ID3, TIT2, TPE1
+        tags: Any = ID3()
+        tags.add(TIT2(encoding=3, text=title))
+        tags.add(TPE1(encoding=3, text=artist))
+        tags.save(path)
+        return
+    if extension == 'm4a':
+        from mutagen.mp4 import MP4
+        tags = MP4(path)
+        tags['\xa9nam'] = title
+        tags['\xa9ART'] = artist
+    elif extension == 'flac':
+        from mutagen.flac import FLAC
+        tags = FLAC(path)
+        tags['title'] = title
+        tags['artist'] = artist
+    else:
+        from mutagen.oggvorbis import OggVorbis
+        tags = OggVorbis(path)
+        tags['title'] = title
+        tags['artist'] = artist
+    tags.save()
+
+
+def generate(directory: str, files: int, size: int, formats: List[str], tagged: float, seed: int = 0) -> List[str]:
+    """
+    Generates the synthetic library, files are spread into one directory per artist.
+    :param directory: A string containing the path to the directory to create the files in.
+    :type directory: str
+    :param files: An integer number representing how many files must be created.
+    :type files: int
+    :param size: An integer number representing the approximate size of each file in bytes.
+    :type size: int
+    :param formats: A list containing the formats to use, files are spread evenly among them.
+    :type formats: List[str]
+    :param tagged: A floating point number between 0 and 1 representing the share of files having tags.
+    :type tagged: float
+    :param seed: An integer number used to initialize the random generator, the same seed gives the same library.
+    :type seed: int
+    :return: A list containing the paths to the created files.
+    :rtype: List[str]
+    """
+    creators: Dict[str, Any] = {'mp3': create_mp3, 'flac': create_flac, 'm4a': create_m4a, 'ogg': create_ogg}
+    generator: random.Random = random.Random(seed)
+    paths: List[str] = []
+    for i in range(0, files):
+        extension: str = formats[i % len(formats)]
+        # Several songs share the same artist, as in real albums.
+        artist: str = 'Artist ' + str(i // 10 + 1)
+        title: str = 'Song ' + str(i + 1) + generator.choice(SUFFIXES)
+        parent: str = os.path.join(directory, artist)
+        os.makedirs(parent, exist_ok=True)
+        if generator.random() < tagged:
+            path: str = os.path.join(parent, 'track_' + str(i + 1) + '.' + extension)
+            creators[extension](path, size)
+            tag(path, title, artist)
+        else:
+            path = os.path.join(parent, artist + ' - ' + title + '.' + extension)
+            creators[extension](path, size)
+            if extension == 'mp3':
+                # MP3 files are expected to start with an ID3 header, even an empty one.
+                from mutagen.id3 import ID3
+                ID3().save(path)
+        paths.append(path)
+    return paths
+
+
+def main() -> int:
+    """
+    Generates a library according to the command line arguments.
+    :return: An integer number representing the exit status.
+    :rtype: int
+    """
+    parser: ArgumentParser = ArgumentParser(description='Generates a synthetic music library.')
+    parser.add_argument('directory', type=str, help='the directory to create the files in.')
+    parser.add_argument('--files', type=int, default=100, help='the number of files to create, 100 by default.')
+    parser.add_argument('--size', type=int, default=256, help='the approximate size of each file in KiB.')
+    parser.add_argument('--formats', type=str, default=','.join(FORMATS), help='comma separated formats to use.')
+    parser.add_argument('--tagged', type=float, default=0.5, help='the share of files having tags, 0.5 by default.')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the random generator.')
+    args = parser.parse_args()
+    formats: List[str] = [name for name in args.formats.split(',') if name in FORMATS]
+    if not formats:
+        print('No supported format given.')
+        return 1
+    paths: List[str] = generate(args.directory, args.files, args.size * 1024, formats, args.tagged, args.seed)
+    print('Created ' + str(len(paths)) + ' files in ' + args.directory)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Times the functions run for every file and compares the results with the saved baselines.
+
+Usage: python benchmarks/micro.py [--filter NAME] [--baseline FILE] [--tolerance 0.5] [--save]
+
+Covered functions are the iTunes results filter (100 results), the search query generation and its regex filters, tag
+reading and writing for each format, the AZLyrics and MusixMatch HTML extraction and the look up of eligible files in
+a deep directory tree. Pages and audio files are the synthetic ones used by "scan.py", no network access is needed.
+Each function is run as many times as needed to take about 0.2 seconds, the best of fifteen rounds is kept. Files are
+created in "/dev/shm" so that disk activity does not show up in the timings, when it is not available, benchmarks
+touching files are reported but not compared. The script exits with a non-zero status if any function got slower than
+its baseline by more than the tolerance, "--save" stores the current results as the new baselines. Baselines depend on
+the machine, save them again when it changes.
+"""
+from typing import List, Dict, Any, Callable, Optional
+from argparse import ArgumentParser
+import platform
+import tempfile
+import shutil
+import timeit
+import json
+import sys
+import os
+import re
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import library  # noqa: E402
+import standins  # noqa: E402
+from diesis import FileScanner  # noqa: E402
+from diesis import Song  # noqa: E402
+from diesis.scrapers import AZLyrics, MusixMatch, LyricsScraper  # noqa: E402
+
+BASELINE: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+# Rounds taken the best of, a single CPU shared with other processes makes some rounds much slower than others.
+ROUNDS: int = 15
+# A memory backed file system, files written there never wait for the disk.
+MEMORY_DIRECTORY: str = '/dev/shm'
+# Benchmarks reading or writing files, they can only be compared when files are stored in memory.
+FILE_BENCHMARKS: List[str] = ['tag_fetch', 'tag_save', 'load_eligible_files']
+# Times a function slower than its baseline is measured again before being reported.
+CONFIRMATIONS: int = 2
+# Size of the synthetic audio files and shape of the directory tree scanned for eligible files.
+FILE_SIZE: int = 64 * 1024
+TREE_DEPTH: int = 4
+TREE_WIDTH: int = 4
+TREE_FILES: List[str] = ['01 Track.mp3', '02 Track.flac', '03 Track.m4a', '04 Track.ogg', 'cover.jpg', 'notes.txt']
+
+
+def measure(function: Callable[[], Any]) -> float:
+    """
+    Times the given function.
+    :param function: The function to time, it takes no arguments.
+    :type function: Callable[[], Any]
+    :return: A floating point number representing the best time per call in seconds.
+    :rtype: float
+    """
+    timer: timeit.Timer = timeit.Timer(function)
+    number: int = timer.autorange()[0]
+    return min(timer.repeat(ROUNDS, number)) / number
+
+
+def create_tree(directory: str, depth: int) -> None:
+    """
+    Creates a directory tree containing empty files, both supported and unsupported, at every level.
+    :param directory: A string containing the path to the directory to fill.
+    :type directory: str
+    :param depth: An integer number representing how many levels of sub-directories must be created.
+    :type depth: int
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in TREE_FILES:
+        open(os.path.join(directory, name), 'wb').close()
+    if depth > 0:
+        for i in range(0, TREE_WIDTH):
+            create_tree(os.path.join(directory, 'Directory ' + str(i + 1)), depth - 1)
+
+
+def collect(directory: str) -> Dict[str, Callable[[], Any]]:
+    """
+    Prepares the data needed by the benchmarks and returns the functions to time.
+    :param directory: A string containing the path to a temporary directory the files can be created in.
+    :type directory: str
+    :return: A dictionary containing the functions to time by benchmark name.
+    :rtype: Dict[str, Callable[[], Any]]
+    """
+    benchmarks: Dict[str, Callable[[], Any]] = {}
+    # The query is not identical to any result, so that every result gets scored.
+    results: List[Dict[str, Any]] = standins.generate_itunes_results('Song 57 Artist 6', ('Song 57', 'Artist 6'), 100)
+    benchmarks['filter_itunes_results'] = lambda: Song.Song._Song__filter_itunes_results(
+        results, 'Song 57 (Live) Artist 6'
+    )
+    tagged: Song.Song = Song.Song(None)
+    tagged.original_path = '/music/Artist 6/track_57.mp3'
+    tagged.set_title('01. Song 57 (Radio Edit) [Bonus Track]')
+    tagged.set_artist('Artist 6')
+    untagged: Song.Song = Song.Song(None)
+    untagged.original_path = '/music/Artist 6/03. artist_6 - song_57 (live) [remastered].mp3'
+
+    def generate_search_query(song: Song.Song) -> None:
+        song.query_accuracy = 0
+        song._Song__generate_search_query()
+
+    benchmarks['search_query[tags]'] = lambda: generate_search_query(tagged)
+    benchmarks['search_query[filename]'] = lambda: generate_search_query(untagged)
+    pattern: str = tagged._Song__get_filter_regex()
+    benchmarks['query_filters'] = lambda: re.sub(pattern, '', '01. Song 57 (Radio Edit) [Bonus Track] Artist 6')
+    # Tags are read from and written to files of each format.
+    creators: Dict[str, Any] = {
+        'mp3': library.create_mp3, 'flac': library.create_flac, 'm4a': library.create_m4a, 'ogg': library.create_ogg
+    }
+    for extension in library.FORMATS:
+        path: str = os.path.join(directory, 'track.' + extension)
+        creators[extension](path, FILE_SIZE)
+        library.tag(path, 'Song 57', 'Artist 6')
+        song: Song.Song = Song.Song(path)
+
+        def fetch(song: Song.Song = song) -> None:
+            # The file is opened again, as it happens for every file scanned.
+            song.tags = None
+            song.get_tag_helper().fetch()
+
+        benchmarks['tag_fetch[' + extension + ']'] = fetch
+        benchmarks['tag_save[' + extension + ']'] = song.get_tag_helper().save
+    # Pages are parsed as a whole, the HTTP client usually truncates them once the needed element ends.
+    song_found: Any = ('Song 57', 'Artist 6')
+    azlyrics_search: str = standins.generate_azlyrics_search(song_found)
+    azlyrics_lyrics: str = standins.generate_azlyrics_lyrics()
+    musixmatch_search: str = standins.generate_musixmatch_search(song_found)
+    musixmatch_lyrics: str = standins.generate_musixmatch_lyrics()
+    benchmarks['azlyrics_search'] = lambda: AZLyrics.AZLyrics._AZLyrics__find_link(azlyrics_search)
+    benchmarks['azlyrics_lyrics'] = lambda: AZLyrics.AZLyrics._AZLyrics__extract(azlyrics_lyrics)
+    benchmarks['musixmatch_search'] = lambda: MusixMatch.MusixMatch._MusixMatch__find_link(musixmatch_search)
+    benchmarks['musixmatch_lyrics'] = lambda: MusixMatch.MusixMatch._MusixMatch__extract(musixmatch_lyrics)
+    tree: str = os.path.join(directory, 'tree')
+    create_tree(tree, TREE_DEPTH)
+    scanner: FileScanner.FileScanner = FileScanner.FileScanner(tree)
+    benchmarks['load_eligible_files'] = lambda: scanner._FileScanner__load_eligible_files(True)
+    return benchmarks
+
+
+def run(name_filter: Optional[str], directory: str, limits: Dict[str, float]) -> Dict[str, float]:
+    """
+    Runs the benchmarks.
+    :param name_filter: A string the names of the benchmarks to run must contain, if None, all are run.
+    :type name_filter: Optional[str]
+    :param directory: A string containing the path to the directory the files needed by the benchmarks are created in.
+    :type directory: str
+    :param limits: A dictionary containing the slowest allowed time per call in seconds by benchmark name.
+    :type limits: Dict[str, float]
+    :return: A dictionary containing the time per call in seconds by benchmark name.
+    :rtype: Dict[str, float]
+    """
+    directory = tempfile.mkdtemp(prefix='diesis-micro-', dir=directory)
+    timings: Dict[str, float] = {}
+    try:
+        benchmarks: Dict[str, Callable[[], Any]] = collect(directory)
+        for name, function in benchmarks.items():
+            if name_filter is None or name_filter in name:
+                timings[name] = measure(function)
+        # Slowdowns of the machine last a few seconds, so suspected regressions are measured again after the others.
+        for i in range(0, CONFIRMATIONS):
+            for name in [name for name in timings if name in limits and timings[name] > limits[name]]:
+                timings[name] = min(timings[name], measure(benchmarks[name]))
+    finally:
+        shutil.rmtree(directory, True)
+    return timings
+
+
+def load_baselines(path: str) -> Dict[str, float]:
+    """
+    Loads the saved baselines.
+    :param path: A string containing the path to the baselines file.
+    :type path: str
+    :return: A dictionary containing the time per call in seconds by benchmark name, empty if no baseline exists.
+    :rtype: Dict[str, float]
+    """
+    if not os.path.isfile(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file).get('results', {})
+
+
+def main() -> int:
+    """
+    Runs the benchmarks according to the command line arguments and compares the results with the baselines.
+    :return: An integer number representing the exit status, 0 if no function got slower than allowed.
+    :rtype: int
+    """
+    parser: ArgumentParser = ArgumentParser(description='Times the functions run for every file.')
+    parser.add_argument('--filter', type=str, help='run only the benchmarks whose name contains this text.')
+    parser.add_argument('--baseline', type=str, default=BASELINE, help='the JSON file containing the baselines.')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='the allowed slowdown, 0.5 (50%%) by default.')
+    parser.add_argument('--save', action='store_true', help='save the results as the new baselines.')
+    args = parser.parse_args()
+    in_memory: bool = os.path.isdir(MEMORY_DIRECTORY) and os.access(MEMORY_DIRECTORY, os.W_OK)
+    if not in_memory:
+        print(MEMORY_DIRECTORY + ' is not available, benchmarks touching files are not compared.')
+    baselines: Dict[str, float] = load_baselines(args.baseline)
+    limits: Dict[str, float] = {name: baseline * (1 + args.tolerance) for name, baseline in baselines.items()}
+    timings: Dict[str, float] = run(args.filter, MEMORY_DIRECTORY if in_memory else tempfile.gettempdir(), limits)
+    regressions: List[str] = []
+    print('%-28s %14s %14s %10s' % ('benchmark', 'time (us)', 'baseline (us)', 'change'))
+    for name, timing in timings.items():
+        baseline: Optional[float] = baselines.get(name)
+        change: str = ''
+        compared: bool = in_memory or not any([name.startswith(prefix) for prefix in FILE_BENCHMARKS])
+        if baseline and compared:
+            ratio: float = timing / baseline - 1
+            change = '%+.1f%%' % (ratio * 100)
+            if ratio > args.tolerance:
+                change += ' !'
+                regressions.append(name)
+        print('%-28s %14.2f %14s %10s' % (
+            name, timing * 1000000, '%.2f' % (baseline * 1000000) if baseline else '-', change
+        ))
+    if args.save:
+        if not in_memory:
+            print('Baselines can only be saved when ' + MEMORY_DIRECTORY + ' is available.')
+            return 1
+        # Benchmarks not run this time keep their previous baseline.
+        baselines.update(timings)
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'html_parser': LyricsScraper.LyricsScraper.get_parser(),
+                'results': dict(sorted(baselines.items()))
+            }, file, indent=4)
+            file.write('\n')
+        print('Baselines saved to ' + args.baseline)
+        return 0
+    if regressions:
+        tolerance: str = str(int(args.tolerance * 100)) + '%'
+        print('Slower than the baseline by more than ' + tolerance + ': ' + ', '.join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Checks that files converted and tagged in a single pass carry the same tags as files tagged after conversion.
+
+Usage: python benchmarks/parity.py [--formats mp3,aiff,m4a,flac,ogg]
+
+A short tone and a small cover picture are generated with ffmpeg, which is required, and converted into each format
+twice: once tagging the converted file with Mutagen, as done by default, and once embedding the properties while
+converting and saving the ones ffmpeg cannot write afterwards, as done by "--single_pass". Tags of both files are read
+back the way "--fill_missing" reads them and the properties having different values are reported, the script exits
+with a non-zero status if any is found.
+"""
+from typing import List, Dict, Any, Tuple
+from argparse import ArgumentParser
+import subprocess
+import tempfile
+import shutil
+import sys
+import os
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from diesis import FileScanner  # noqa: E402,F401
+from diesis import Song, TagHelper  # noqa: E402
+
+FORMATS: List[str] = ['mp3', 'aiff', 'm4a', 'flac', 'ogg']
+# Properties given to both files, lyrics span several lines and every field that has its own frame or atom is set.
+PROPERTIES: Dict[str, Any] = {
+    'title': 'Song 57', 'artist': 'Artist 6', 'album_artist': 'Artist 6', 'album': 'Album 3', 'year': 2001,
+    'genre': 'Rock', 'composer': 'Composer 2', 'group': 'Group 1', 'lyrics': 'First line\nSecond line',
+    'lyrics_writer': 'Writer 4', 'track_url': 'https://music.apple.com/song/57',
+    'album_url': 'https://music.apple.com/album/3', 'explicit': True
+}
+
+
+def generate(directory: str) -> Tuple[str, str]:
+    """
+    Generates the source file and the cover picture.
+    :param directory: A string containing the path to the directory the files are created in.
+    :type directory: str
+    :return: A tuple containing the paths to the source file and to the cover picture.
+    :rtype: Tuple[str, str]
+    """
+    source: str = os.path.join(directory, 'source.flac')
+    cover: str = os.path.join(directory, 'cover.jpg')
+    for arguments in [['-f', 'lavfi', '-i', 'sine=frequency=440:duration=2', source],
+                      ['-f', 'lavfi', '-i', 'color=c=red:s=64x64', '-frames:v', '1', cover]]:
+        subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-y'] + arguments, check=True)
+    return source, cover
+
+
+def describe(song: Song.Song, cover: str) -> None:
+    """
+    Sets the properties compared by this script.
+    :param song: The song to set the properties of.
+    :type song: Song.Song
+    :param cover: A string containing the path to the cover picture.
+    :type cover: str
+    """
+    song.set_title(PROPERTIES['title'])
+    song.set_artist(PROPERTIES['artist'])
+    song.set_album_artist(PROPERTIES['album_artist'])
+    song.set_album(PROPERTIES['album'])
+    song.set_year(PROPERTIES['year'])
+    song.set_genre(PROPERTIES['genre'])
+    song.set_composer(PROPERTIES['composer'])
+    song.set_group(PROPERTIES['group'])
+    song.set_lyrics(PROPERTIES['lyrics'])
+    song.set_lyrics_writer(PROPERTIES['lyrics_writer'])
+    song.set_track_url(PROPERTIES['track_url'])
+    song.set_album_url(PROPERTIES['album_url'])
+    song.set_explicit(PROPERTIES['explicit'])
+    song.set_disk(1, 2)
+    song.set_track(3, 12)
+    song.set_cover_path(cover)
+
+
+def read(path: str) -> Dict[str, str]:
+    """
+    Reads the tags of the given file the way they are read when looking up missing information.
+    :param path: A string containing the path to the file.
+    :type path: str
+    :return: A dictionary containing the values found by property name, "cover" tells if a picture is embedded.
+    :rtype: Dict[str, str]
+    """
+    song: Song.Song = Song.Song(path)
+    extension: str = song.get_extension()
+    if extension == 'm4a':
+        values, cover = TagHelper.TagHelper._TagHelper__read_mp4(song.get_tag_object())
+    elif extension == 'mp3' or extension == 'aiff':
+        values, cover = TagHelper.TagHelper._TagHelper__read_id3(song.get_tag_object())
+    else:
+        values, cover = TagHelper.TagHelper._TagHelper__read_vorbis(song.get_tag_object())
+    results: Dict[str, str] = {field: str(value) for field, value in values.items() if value not in ['', None]}
+    results['cover'] = str(cover)
+    return results
+
+
+def compare(conversion_format: str, source: str, cover: str, directory: str) -> List[str]:
+    """
+    Converts the source file into the given format along both paths and compares the tags of the results.
+    :param conversion_format: A string containing the format to convert into.
+    :type conversion_format: str
+    :param source: A string containing the path to the source file.
+    :type source: str
+    :param cover: A string containing the path to the cover picture.
+    :type cover: str
+    :param directory: A string containing the path to the directory the files are created in.
+    :type directory: str
+    :return: A list containing a description of each property having different values.
+    :rtype: List[str]
+    """
+    # Converting without a destination replaces the file, so a copy of the source is converted.
+    copy: str = os.path.join(directory, 'tagged-' + conversion_format + '.flac')
+    shutil.copyfile(source, copy)
+    converted: Song.Song = Song.Song(copy)
+    converted.convert(conversion_format)
+    tagged: Song.Song = Song.Song(converted.get_path())
+    describe(tagged, cover)
+    tagged.get_tag_helper().save()
+    embedded: Song.Song = Song.Song(source)
+    describe(embedded, cover)
+    embedded.convert(conversion_format, os.path.join(directory, 'embedded.' + conversion_format))
+    embedded.get_tag_helper().save_unmapped()
+    expected: Dict[str, str] = read(tagged.get_path())
+    found: Dict[str, str] = read(embedded.get_path())
+    differences: List[str] = []
+    for field in sorted(set(expected) | set(found)):
+        if expected.get(field) != found.get(field):
+            differences.append(field + ': ' + repr(expected.get(field)) + ' != ' + repr(found.get(field)))
+    return differences
+
+
+def main() -> int:
+    """
+    Compares the tags written along both paths for each of the requested formats.
+    :return: An integer number representing the exit status, 0 if all the properties match.
+    :rtype: int
+    """
+    parser: ArgumentParser = ArgumentParser(description='Compares tags written in a single pass and after conversion.')
+    parser.add_argument('--formats', type=str, default=','.join(FORMATS), help='comma separated formats.')
+    args = parser.parse_args()
+    if shutil.which('ffmpeg') is None:
+        print('ffmpeg is required to convert the files.')
+        return 1
+    directory: str = tempfile.mkdtemp(prefix='diesis-parity-')
+    failed: bool = False
+    try:
+        source, cover = generate(directory)
+        for conversion_format in [name for name in args.formats.split(',') if name in FORMATS]:
+            differences: List[str] = compare(conversion_format, source, cover, directory)
+            print('%-6s %s' % (conversion_format, 'same tags' if not differences else '; '.join(differences)))
+            failed = failed or len(differences) > 0
+    finally:
+        shutil.rmtree(directory, True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
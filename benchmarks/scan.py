@@ -0,0 +1,159 @@
+"""
+Runs a whole scan over a synthetic library against local stand-ins of iTunes and the lyrics providers.
+
+Usage: python benchmarks/scan.py [--files 100] [--size 256] [--formats mp3,flac,m4a,ogg] [--tagged 0.5]
+                                 [--latency 0.05] [--error_rate 0.0] [--miss_rate 0.1] [--config FILE] [--output FILE]
+
+The library is generated in a temporary directory (see "library.py") and the requests are sent to the stand-ins
+(see "standins.py"), no network access is needed. Files per second, requests per file, peak RSS and the time spent in
+each stage are reported, "--output" saves them as JSON as well so that runs can be compared. Conversion requires
+ffmpeg and real audio, the synthetic files can only be tagged.
+"""
+from typing import List, Dict, Any
+from argparse import ArgumentParser
+from urllib import request
+import multiprocessing
+import tempfile
+import resource
+import shutil
+import json
+import time
+import sys
+import os
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import library  # noqa: E402
+import standins  # noqa: E402
+from diesis import FileScanner  # noqa: E402
+from diesis import Config, HttpClient, Metrics  # noqa: E402
+
+
+def get_peak_rss() -> float:
+    """
+    Returns the peak resident set size of this process.
+    :return: A floating point number representing the peak memory usage in MiB.
+    :rtype: float
+    """
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB while macOS reports bytes.
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run(args: Any, directory: str) -> Dict[str, Any]:
+    """
+    Generates the library, starts the stand-ins and scans the library.
+    :param args: The parsed command line arguments.
+    :type args: Any
+    :param directory: A string containing the path to the working directory.
+    :type directory: str
+    :return: A dictionary containing the measured figures.
+    :rtype: Dict[str, Any]
+    """
+    formats: List[str] = [name for name in args.formats.split(',') if name in library.FORMATS]
+    source: str = os.path.join(directory, 'library')
+    library.generate(source, args.files, args.size * 1024, formats, args.tagged, args.seed)
+    # The stand-ins run in their own process so that they don't add to the measured memory and CPU time.
+    ready: Any = multiprocessing.Queue()
+    server: multiprocessing.Process = multiprocessing.Process(
+        target=standins.serve, args=(0, args.latency, args.error_rate, args.miss_rate, args.results, ready), daemon=True
+    )
+    server.start()
+    address: str = 'http://127.0.0.1:' + str(ready.get(True, 10))
+    try:
+        for host, prefix in standins.HOSTS.items():
+            HttpClient.HttpClient.set_host(host, address + prefix)
+        if args.config:
+            Config.Config.load_from_json(args.config)
+        # Temporary files are named by appending to the temporary directory path, keep them in the work directory.
+        os.mkdir(os.path.join(directory, 'tmp'))
+        tempfile.tempdir = os.path.join(directory, 'tmp') + '/'
+        # The library is made of one directory per artist.
+        Config.Config.recursive = True
+        Config.Config.progress = 'off'
+        usage: Any = resource.getrusage(resource.RUSAGE_SELF)
+        start: float = time.perf_counter()
+        scanner: FileScanner.FileScanner = FileScanner.FileScanner(source)
+        scanner.set_destination(os.path.join(directory, 'output'))
+        scanner.scan()
+        elapsed: float = time.perf_counter() - start
+        end_usage: Any = resource.getrusage(resource.RUSAGE_SELF)
+        with request.urlopen(address + '/stats') as response:
+            requests: Dict[str, int] = json.loads(response.read().decode('utf-8'))
+    finally:
+        server.terminate()
+        server.join()
+    return {
+        'files': args.files,
+        'elapsed': elapsed,
+        'files_per_second': args.files / elapsed,
+        'cpu_time': end_usage.ru_utime + end_usage.ru_stime - usage.ru_utime - usage.ru_stime,
+        'requests': requests,
+        'requests_per_file': sum(requests.values()) / args.files,
+        'peak_rss': get_peak_rss(),
+        'stages': Metrics.Metrics.get_stages()
+    }
+
+
+def report(results: Dict[str, Any]) -> None:
+    """
+    Prints the measured figures.
+    :param results: A dictionary containing the figures returned by "run".
+    :type results: Dict[str, Any]
+    """
+    print('Files: %d in %.2f s (%.1f files/s, CPU time %.2f s)' % (
+        results['files'], results['elapsed'], results['files_per_second'], results['cpu_time']
+    ))
+    print('Requests per file: %.2f (%s)' % (results['requests_per_file'], ', '.join(
+        [service + ': ' + str(count) for service, count in sorted(results['requests'].items())]
+    )))
+    print('Peak RSS: %.1f MiB' % results['peak_rss'])
+    print('')
+    print('%-40s %8s %10s %10s  %s' % ('stage', 'count', 'total (s)', 'mean (ms)', 'results'))
+    for stage in results['stages']:
+        name: str = stage['stage'] + ''.join(['[' + value + ']' for value in stage['labels'].values()])
+        outcomes: str = ', '.join([result + ': ' + str(count) for result, count in sorted(stage['results'].items())])
+        print('%-40s %8d %10.3f %10.2f  %s' % (name, stage['count'], stage['sum'], stage['mean'] * 1000, outcomes))
+
+
+def main() -> int:
+    """
+    Runs the benchmark according to the command line arguments.
+    :return: An integer number representing the exit status.
+    :rtype: int
+    """
+    parser: ArgumentParser = ArgumentParser(description='Measures a whole scan against local stand-ins.')
+    parser.add_argument('--files', type=int, default=100, help='the number of files to create, 100 by default.')
+    parser.add_argument('--size', type=int, default=256, help='the approximate size of each file in KiB.')
+    parser.add_argument('--formats', type=str, default=','.join(library.FORMATS), help='comma separated formats.')
+    parser.add_argument('--tagged', type=float, default=0.5, help='the share of files having tags, 0.5 by default.')
+    parser.add_argument('--seed', type=int, default=0, help='the seed used to generate the library.')
+    parser.add_argument('--latency', type=float, default=0.05, help='the seconds the stand-ins wait per request.')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='the share of requests failing with 503.')
+    parser.add_argument('--miss_rate', type=float, default=0.1, help='the share of searches finding nothing.')
+    parser.add_argument('--results', type=int, default=50, help='the number of results of each iTunes search.')
+    parser.add_argument('--config', type=str, help='a JSON configuration file for the scan, as used by diesis.')
+    parser.add_argument('--output', type=str, help='a JSON file where the measured figures are saved.')
+    parser.add_argument('--keep', action='store_true', help='keep the generated library and the processed files.')
+    args = parser.parse_args()
+    if args.files <= 0:
+        print('At least one file is required.')
+        return 1
+    directory: str = tempfile.mkdtemp(prefix='diesis-benchmark-')
+    try:
+        results: Dict[str, Any] = run(args, directory)
+    finally:
+        if args.keep:
+            print('Files kept in ' + directory)
+        else:
+            shutil.rmtree(directory, True)
+    report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
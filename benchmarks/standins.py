@@ -0,0 +1,330 @@
+"""
+Local HTTP stand-ins for the iTunes Search API, the iTunes artwork server, AZLyrics and MusixMatch.
+
+Usage: python benchmarks/standins.py [--port 8080] [--latency 0.05] [--error_rate 0.0] [--miss_rate 0.1]
+
+Songs are recognized by the "Song N" and "Artist N" names used by the synthetic library (see "library.py"), any other
+query is answered with decoy results only. Each service is served under its own path prefix, as listed in "HOSTS",
+the number of requests received by service is returned by "/stats".
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from argparse import ArgumentParser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib import parse
+import threading
+import random
+import zlib
+import json
+import time
+import sys
+import re
+
+# Path prefix of the service standing in for each host.
+HOSTS: Dict[str, str] = {
+    'itunes.apple.com': '/itunes',
+    'is1-ssl.mzstatic.com': '/artwork',
+    'search.azlyrics.com': '/azlyrics-search',
+    'www.azlyrics.com': '/azlyrics',
+    'www.musixmatch.com': '/musixmatch'
+}
+# Bytes appended to the HTML pages, real pages are large and the client stops reading once it has what it needs.
+PAGE_FILLER: str = '<div class="filler">' + 'lorem ipsum ' * 3000 + '</div>'
+LYRICS: str = 'First line of the song\nSecond line of the song\nThird line of the song'
+WRITER: str = 'Jane Doe, John Doe'
+COVER: bytes = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00' + b'\x00' * 4096 + b'\xff\xd9'
+
+
+def generate_itunes_results(term: str, song: Tuple[str, str], count: int) -> List[Dict[str, Any]]:
+    """
+    Generates the results of an iTunes search, the matching song is placed among decoys.
+    :param term: A string containing the search query, it decides where the matching song is placed.
+    :type term: str
+    :param song: A tuple containing title and artist of the matching song.
+    :type song: Tuple[str, str]
+    :param count: An integer number representing how many results must be returned.
+    :type count: int
+    :return: A list containing the results as returned by the iTunes Search API.
+    :rtype: List[Dict[str, Any]]
+    """
+    results: List[Dict[str, Any]] = []
+    for i in range(0, count):
+        results.append({
+            'trackName': 'Another Track ' + str(i),
+            'artistName': 'Someone Else',
+            'collectionName': 'Decoys',
+            'collectionId': 1,
+            'trackNumber': i + 1
+        })
+    index: int = zlib.crc32(term.encode('utf-8')) % len(results)
+    results[index] = {'trackName': song[0], 'artistName': song[1], 'collectionName': song[1] + ' Album',
+                      'collectionId': int(song[1].split(' ')[1]) + 1000, 'trackNumber': 1}
+    for result in results:
+        # Fields every result has, whatever the song.
+        number: int = result['collectionId']
+        result.update({
+            'primaryGenreName': 'Rock',
+            'releaseDate': '2001-01-01T12:00:00Z',
+            'artworkUrl100': 'https://is1-ssl.mzstatic.com/image/thumb/' + str(number) + '/100x100bb.jpg',
+            'discCount': 1,
+            'discNumber': 1,
+            'trackCount': 10,
+            'trackExplicitness': 'notExplicit',
+            'artistViewUrl': 'https://music.apple.com/artist/' + str(number),
+            'trackViewUrl': 'https://music.apple.com/album/' + str(number)
+        })
+    return results
+
+
+def generate_page(body: str) -> str:
+    """
+    Wraps the given HTML fragment into a page of realistic size.
+    :param body: A string containing the HTML fragment.
+    :type body: str
+    :return: A string containing the page.
+    :rtype: str
+    """
+    return '<html><body><div class="header">' + PAGE_FILLER + '</div>' + body + PAGE_FILLER + '</body></html>'
+
+
+def generate_azlyrics_search(song: Optional[Tuple[str, str]]) -> str:
+    """
+    Generates an AZLyrics search results page.
+    :param song: A tuple containing title and artist of the song found or None if nothing must be found.
+    :type song: Optional[Tuple[str, str]]
+    :return: A string containing the HTML page.
+    :rtype: str
+    """
+    link: str = ''
+    if song is not None:
+        name: str = song[0].replace(' ', '').lower()
+        link = '<a href="https://www.azlyrics.com/lyrics/' + name + '.html" target="_blank">' + song[0] + '</a>'
+    return generate_page('<table class="table table-condensed"><tr><td>' + link + '</td></tr></table>')
+
+
+def generate_azlyrics_lyrics() -> str:
+    """
+    Generates an AZLyrics lyrics page.
+    :return: A string containing the HTML page.
+    :rtype: str
+    """
+    lyrics: str = LYRICS.replace('\n', '<br>\n')
+    return generate_page('<div class="main-page"><div class="smt"><small>' + WRITER + '</small></div><div>' + lyrics +
+                         '</div></div>')
+
+
+def generate_musixmatch_search(song: Optional[Tuple[str, str]]) -> str:
+    """
+    Generates a MusixMatch search results page.
+    :param song: A tuple containing title and artist of the song found or None if nothing must be found.
+    :type song: Optional[Tuple[str, str]]
+    :return: A string containing the HTML page.
+    :rtype: str
+    """
+    link: str = ''
+    if song is not None:
+        link = '<a class="title" href="/lyrics/' + song[0].replace(' ', '-') + '">' + song[0] + '</a>'
+    return generate_page('<div class="main-panel"><div class="box-content">' + link + '</div></div>')
+
+
+def generate_musixmatch_lyrics() -> str:
+    """
+    Generates a MusixMatch lyrics page.
+    :return: A string containing the HTML page.
+    :rtype: str
+    """
+    blocks: str = ''.join(['<p class="mxm-lyrics__content"><span>' + line + '</span></p>'
+                           for line in LYRICS.split('\n')])
+    return generate_page(blocks + '<p class="mxm-lyrics__copyright">Writer(s): ' + WRITER + '</p>')
+
+
+class StandIns:
+    latency: float = 0.0
+    error_rate: float = 0.0
+    miss_rate: float = 0.0
+    results: int = 50
+    requests: Dict[str, int] = {}
+    lock: threading.Lock = threading.Lock()
+    generator: random.Random = random.Random(0)
+
+    @staticmethod
+    def find_song(text: str) -> Optional[Tuple[str, str]]:
+        """
+        Finds out the song the given query refers to.
+        :param text: A string containing the search query.
+        :type text: str
+        :return: A tuple containing title and artist or None if no song of the synthetic library is mentioned.
+        :rtype: Optional[Tuple[str, str]]
+        """
+        title: Any = re.search(r'\bsong[\s_+-]+([0-9]+)', text, re.I)
+        artist: Any = re.search(r'\bartist[\s_+-]+([0-9]+)', text, re.I)
+        if title is None or artist is None:
+            return None
+        return 'Song ' + title.group(1), 'Artist ' + artist.group(1)
+
+    @staticmethod
+    def roll(rate: float) -> bool:
+        """
+        Draws a random outcome having the given probability.
+        :param rate: A floating point number between 0 and 1 representing the probability.
+        :type rate: float
+        :return: If the outcome occurred will be returned "True".
+        :rtype: bool
+        """
+        with StandIns.lock:
+            return StandIns.generator.random() < rate
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version: str = 'HTTP/1.0'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """
+        Silences the default request log.
+        """
+        pass
+
+    def __send(self, status: int, contents: bytes, content_type: str) -> None:
+        """
+        Sends the response.
+        :param status: An integer number representing the HTTP status.
+        :type status: int
+        :param contents: The response body.
+        :type contents: bytes
+        :param content_type: A string containing the body MIME type.
+        :type content_type: str
+        """
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(contents)))
+        self.end_headers()
+        self.wfile.write(contents)
+
+    def __itunes(self, query: Dict[str, List[str]]) -> bytes:
+        """
+        Generates an iTunes Search API response, the matching song is placed among decoys.
+        :param query: A dictionary containing the query string parameters.
+        :type query: Dict[str, List[str]]
+        :return: The JSON encoded response.
+        :rtype: bytes
+        """
+        term: str = query.get('term', [''])[0]
+        song: Optional[Tuple[str, str]] = StandIns.find_song(term)
+        if song is None or StandIns.roll(StandIns.miss_rate):
+            return json.dumps({'resultCount': 0, 'results': []}).encode('utf-8')
+        results: List[Dict[str, Any]] = generate_itunes_results(term, song, StandIns.results)
+        return json.dumps({'resultCount': len(results), 'results': results}).encode('utf-8')
+
+    def __azlyrics(self, path: str, query: Dict[str, List[str]]) -> bytes:
+        """
+        Generates an AZLyrics search results page or lyrics page.
+        :param path: A string containing the request path without the service prefix.
+        :type path: str
+        :param query: A dictionary containing the query string parameters.
+        :type query: Dict[str, List[str]]
+        :return: The HTML page.
+        :rtype: bytes
+        """
+        if path.startswith('/search.php'):
+            song: Optional[Tuple[str, str]] = StandIns.find_song(query.get('q', [''])[0])
+            if song is not None and StandIns.roll(StandIns.miss_rate):
+                song = None
+            return generate_azlyrics_search(song).encode('utf-8')
+        return generate_azlyrics_lyrics().encode('utf-8')
+
+    def __musixmatch(self, path: str) -> bytes:
+        """
+        Generates a MusixMatch search results page or lyrics page.
+        :param path: A string containing the request path without the service prefix.
+        :type path: str
+        :return: The HTML page.
+        :rtype: bytes
+        """
+        if path.startswith('/it/search/'):
+            song: Optional[Tuple[str, str]] = StandIns.find_song(parse.unquote(path))
+            if song is not None and StandIns.roll(StandIns.miss_rate):
+                song = None
+            return generate_musixmatch_search(song).encode('utf-8')
+        return generate_musixmatch_lyrics().encode('utf-8')
+
+    def do_GET(self) -> None:
+        """
+        Dispatches the request to the service it is addressed to.
+        """
+        url: Any = parse.urlsplit(self.path)
+        if url.path == '/stats':
+            with StandIns.lock:
+                self.__send(200, json.dumps(StandIns.requests).encode('utf-8'), 'application/json')
+            return
+        service: str = url.path.split('/')[1]
+        path: str = url.path[len(service) + 1:]
+        with StandIns.lock:
+            StandIns.requests[service] = StandIns.requests.get(service, 0) + 1
+        time.sleep(StandIns.latency)
+        if StandIns.roll(StandIns.error_rate):
+            self.__send(503, b'Service Unavailable', 'text/plain')
+            return
+        query: Dict[str, List[str]] = parse.parse_qs(url.query)
+        if service == 'itunes':
+            self.__send(200, self.__itunes(query), 'application/json')
+        elif service == 'artwork':
+            self.__send(200, COVER, 'image/jpeg')
+        elif service in ['azlyrics-search', 'azlyrics']:
+            self.__send(200, self.__azlyrics(path, query), 'text/html; charset=utf-8')
+        elif service == 'musixmatch':
+            self.__send(200, self.__musixmatch(path), 'text/html; charset=utf-8')
+        else:
+            self.__send(404, b'Not Found', 'text/plain')
+
+
+def serve(port: int, latency: float, error_rate: float, miss_rate: float, results: int = 50, ready: Any = None) -> None:
+    """
+    Runs the stand-ins until the process gets terminated.
+    :param port: An integer number representing the port to listen on, 0 to pick a free one.
+    :type port: int
+    :param latency: A floating point number representing the seconds to wait before answering each request.
+    :type latency: float
+    :param error_rate: A floating point number between 0 and 1 representing the share of requests failing with 503.
+    :type error_rate: float
+    :param miss_rate: A floating point number between 0 and 1 representing the share of searches finding nothing.
+    :type miss_rate: float
+    :param results: An integer number representing how many results each iTunes search returns.
+    :type results: int
+    :param ready: A queue the port actually used is put into once the server is listening, if any.
+    :type ready: Any
+    """
+    StandIns.latency = latency
+    StandIns.error_rate = error_rate
+    StandIns.miss_rate = miss_rate
+    StandIns.results = max(results, 1)
+    server: ThreadingHTTPServer = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def main() -> int:
+    """
+    Runs the stand-ins according to the command line arguments.
+    :return: An integer number representing the exit status.
+    :rtype: int
+    """
+    parser: ArgumentParser = ArgumentParser(description='Runs local stand-ins for iTunes and the lyrics providers.')
+    parser.add_argument('--port', type=int, default=8080, help='the port to listen on, 8080 by default.')
+    parser.add_argument('--latency', type=float, default=0.05, help='the seconds to wait before each response.')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='the share of requests failing with 503.')
+    parser.add_argument('--miss_rate', type=float, default=0.1, help='the share of searches finding nothing.')
+    parser.add_argument('--results', type=int, default=50, help='the number of results of each iTunes search.')
+    args = parser.parse_args()
+    print('Listening on http://127.0.0.1:' + str(args.port) + ', services:')
+    for host, prefix in HOSTS.items():
+        print('  ' + host + ' -> ' + prefix)
+    try:
+        serve(args.port, args.latency, args.error_rate, args.miss_rate, args.results)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Measures how long the command line tool takes to start and checks it stays within the given budget.
+
+Usage: python benchmarks/startup.py [--runs 20] [--budget 0.1]
+
+The time reported is the median time needed to run "diesis --help" minus the time needed to start a bare interpreter,
+the script exits with a non-zero status if it exceeds the budget or if a heavy dependency gets imported at start-up.
+"""
+from typing import List
+from argparse import ArgumentParser
+import subprocess
+import statistics
+import time
+import sys
+import os
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Dependencies that must be imported on first use only.
+HEAVY_MODULES: List[str] = ['numpy', 'bs4', 'lxml', 'mutagen', 'urllib.request']
+HELP_SCRIPT: str = 'import sys\nsys.argv = ["diesis", "--help"]\nfrom diesis import main\nmain.main()'
+MODULES_SCRIPT: str = 'import sys\nfrom diesis import main\nprint(" ".join(sorted(sys.modules)))'
+
+
+def measure(script: str, runs: int) -> float:
+    """
+    Runs the given Python code in a new interpreter several times.
+    :param script: A string containing the code to run.
+    :type script: str
+    :param runs: An integer number greater than zero representing how many times the code must be run.
+    :type runs: int
+    :return: A floating point number representing the median run time in seconds.
+    :rtype: float
+    """
+    timings: List[float] = []
+    environment: dict = dict(os.environ, PYTHONPATH=ROOT)
+    for i in range(0, runs):
+        start: float = time.perf_counter()
+        subprocess.run([sys.executable, '-c', script], stdout=subprocess.DEVNULL, env=environment, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main() -> int:
+    """
+    Measures the start-up time and compares it with the budget.
+    :return: An integer number representing the exit status, 0 if the start-up time is within budget.
+    :rtype: int
+    """
+    parser: ArgumentParser = ArgumentParser(description='Measures the start-up time of the command line tool.')
+    parser.add_argument('--runs', type=int, default=20, help='the number of runs to take the median of, 20 by default.')
+    parser.add_argument(
+        '--budget', type=float, default=0.1, help='the allowed start-up time in seconds, 0.1 by default.'
+    )
+    args = parser.parse_args()
+    # Modules loaded just by importing the entry point.
+    environment: dict = dict(os.environ, PYTHONPATH=ROOT)
+    output: bytes = subprocess.run(
+        [sys.executable, '-c', MODULES_SCRIPT], stdout=subprocess.PIPE, env=environment, check=True
+    ).stdout
+    loaded: List[str] = [module for module in HEAVY_MODULES if module in output.decode('utf-8').split()]
+    # Warm up the file system cache and the bytecode cache before measuring.
+    measure(HELP_SCRIPT, 1)
+    baseline: float = measure('pass', args.runs)
+    startup: float = measure(HELP_SCRIPT, args.runs) - baseline
+    print('Interpreter start-up: %.1f ms' % (baseline * 1000))
+    print('Diesis start-up: %.1f ms (budget: %.1f ms)' % (startup * 1000, args.budget * 1000))
+    print('Heavy modules imported at start-up: ' + (', '.join(loaded) if loaded else 'none'))
+    if loaded or startup > args.budget:
+        print('Start-up budget exceeded.')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,16 @@
-from typing import Optional, Any, Set
+from typing import Optional, Any, Set, List, Dict
 from argparse import ArgumentParser
-from diesis import Converter, FileScanner
+from diesis import Converter, FileScanner, LoudnessAnalyzer, LyricsFinder, ProviderRegistry, HttpArchive
 import json
 import os
 
 
 class Config:
     WATERMARK: str = 'Processed by Diesis'
+    HTML_PARSERS: List[str] = ['auto', 'lxml', 'html.parser']
+    LOG_FORMATS: List[str] = ['text', 'json']
+    PROFILERS: List[str] = ['cpu', 'mem']
+    PROGRESS_MODES: List[str] = ['auto', 'bar', 'json', 'off']
     USER_AGENT: str = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_9_3) AppleWebKit/537.36 (KHTML, like Gecko) ' \
                       'Chrome/35.0.1916.47 Safari/537.36 '
 
@@ -24,6 +28,31 @@ class Config:
     recursive: bool = False
     flatten: bool = False
     log_file: Optional[str] = None
+    log_format: str = 'text'
+    in_place: bool = False
+    tag_backup: Optional[str] = None
+    index_file: Optional[str] = None
+    cache_directory: Optional[str] = None
+    cache_size: int = 1024
+    single_pass: bool = False
+    profiles: List[Dict[str, Any]] = []
+    replaygain: bool = False
+    lyrics_providers: List[str] = ['azlyrics', 'musixmatch']
+    lyrics_strategy: str = 'first'
+    lyrics_timeout: int = 10
+    lyrics_cache: Optional[str] = None
+    lyrics_cache_ttl: int = 90
+    lyrics_cache_size: int = 50000
+    html_parser: str = 'auto'
+    fill_missing: bool = False
+    lyrics_directory: Optional[str] = None
+    metrics_file: Optional[str] = None
+    metrics_textfile: Optional[str] = None
+    trace_file: Optional[str] = None
+    profiler: Optional[str] = None
+    progress: str = 'auto'
+    record: Optional[str] = None
+    replay: Optional[str] = None
 
     @staticmethod
     def __validate() -> None:
@@ -33,6 +62,59 @@ class Config:
         if not Config.source or not os.path.exists(Config.source):
             print('The given source file or directory does not exist, aborting.')
             quit()
+        if Config.replaygain and not LoudnessAnalyzer.LoudnessAnalyzer.is_available():
+            print('NumPy is required to compute ReplayGain values, install it or disable the option, aborting.')
+            quit()
+        if Config.lyrics_directory and not os.path.isdir(Config.lyrics_directory):
+            print('The given lyrics directory does not exist, aborting.')
+            quit()
+        if Config.record and Config.replay:
+            print('Responses cannot be recorded and replayed at the same time, aborting.')
+            quit()
+        if Config.replay and not os.path.isfile(HttpArchive.HttpArchive.get_path(Config.replay)):
+            print('No recorded responses found in the given replay directory, aborting.')
+            quit()
+
+    @staticmethod
+    def __create_profile(conversion_format: Any, bitrate: Any, destination: Any) -> Optional[Dict[str, Any]]:
+        """
+        Validates the given conversion profile settings.
+        :param conversion_format: The format the songs must be converted into.
+        :type conversion_format: Any
+        :param bitrate: The bitrate to apply as kbps integer value, if any.
+        :type bitrate: Any
+        :param destination: The directory where converted songs must be stored in, if any.
+        :type destination: Any
+        :return: A dictionary representing the profile or None if the format is not supported.
+        :rtype: Optional[Dict[str, Any]]
+        """
+        if type(conversion_format) is not str or conversion_format not in Converter.Converter.get_supported_formats():
+            return None
+        if type(bitrate) is not int or bitrate <= 0:
+            bitrate = None
+        if type(destination) is not str or not destination:
+            destination = None
+        return {
+            'format': conversion_format,
+            'bitrate': bitrate,
+            'destination': FileScanner.FileScanner.prepare_path(destination)
+        }
+
+    @staticmethod
+    def __parse_profile(value: str) -> Optional[Dict[str, Any]]:
+        """
+        Parses a conversion profile given as CLI argument in the "format[:bitrate[:destination]]" form.
+        :param value: A string containing the profile definition.
+        :type value: str
+        :return: A dictionary representing the profile or None if the format is not supported.
+        :rtype: Optional[Dict[str, Any]]
+        """
+        parts: List[str] = value.split(':', 2)
+        bitrate: Optional[int] = None
+        if len(parts) > 1 and parts[1].isdigit():
+            bitrate = int(parts[1])
+        destination: Optional[str] = parts[2] if len(parts) > 2 else None
+        return Config.__create_profile(parts[0], bitrate, destination)
 
     @staticmethod
     def get_watermark_text() -> str:
@@ -178,6 +260,248 @@ class Config:
         """
         return Config.log_file
 
+    @staticmethod
+    def get_log_format() -> str:
+        """
+        Returns the format of the lines written in the log file.
+        :return: A string containing "text" for plain lines or "json" for JSON objects including the context fields.
+        :rtype: str
+        """
+        return Config.log_format
+
+    @staticmethod
+    def get_in_place() -> bool:
+        """
+        Returns if tags should be written directly into the source files rather than into a temporary copy.
+        :return: If the in-place mode has been enabled will be returned "True".
+        :rtype: bool
+        """
+        return Config.in_place
+
+    @staticmethod
+    def get_tag_backup() -> Optional[str]:
+        """
+        Returns the path to the directory where original tags should be backed up before being edited in place.
+        :return: A string containing the path to the backup directory or None if no backup should be made.
+        :rtype: Optional[str]
+        """
+        return Config.tag_backup
+
+    @staticmethod
+    def get_index_file() -> Optional[str]:
+        """
+        Returns the path to the SQLite database where the tags of the scanned files are cached in.
+        :return: A string containing the path to the index file or None if the library should not be indexed.
+        :rtype: Optional[str]
+        """
+        return Config.index_file
+
+    @staticmethod
+    def get_cache_directory() -> Optional[str]:
+        """
+        Returns the path to the directory where converted files are cached in.
+        :return: A string containing the path to the cache directory or None if converted files should not be cached.
+        :rtype: Optional[str]
+        """
+        return Config.cache_directory
+
+    @staticmethod
+    def get_cache_size() -> int:
+        """
+        Returns the maximum size of the conversion cache, least recently used files are removed once exceeded.
+        :return: An integer number greater than zero representing the size in megabytes.
+        :rtype: int
+        """
+        return Config.cache_size
+
+    @staticmethod
+    def get_single_pass() -> bool:
+        """
+        Returns if converted files should be generated with their tags and cover already embedded.
+        :return: If conversion and tagging should be done in a single pass will be returned "True".
+        :rtype: bool
+        """
+        return Config.single_pass
+
+    @staticmethod
+    def get_profiles() -> List[Dict[str, Any]]:
+        """
+        Returns the profiles of the files each song must be converted into at once, they replace the format option.
+        :return: A list of dictionaries containing format, bitrate and destination directory of each profile.
+        :rtype: List[Dict[str, Any]]
+        """
+        return Config.profiles
+
+    @staticmethod
+    def get_replaygain() -> bool:
+        """
+        Returns if songs loudness should be measured in order to write ReplayGain track and album values.
+        :return: If ReplayGain values should be computed will be returned "True".
+        :rtype: bool
+        """
+        return Config.replaygain
+
+    @staticmethod
+    def __parse_lyrics_providers(providers: List[Any]) -> List[str]:
+        """
+        Filters out the unsupported providers and the duplicates from the given list of lyrics provider names.
+        :param providers: A list containing the provider names sorted by priority.
+        :type providers: List[Any]
+        :return: A list containing the valid provider names, their order is preserved.
+        :rtype: List[str]
+        """
+        supported: Set[str] = ProviderRegistry.ProviderRegistry.get_supported_providers()
+        names: List[str] = []
+        for provider in providers:
+            if type(provider) is str and provider.strip().lower() in supported:
+                if provider.strip().lower() not in names:
+                    names.append(provider.strip().lower())
+        return names
+
+    @staticmethod
+    def get_lyrics_providers() -> List[str]:
+        """
+        Returns the lyrics providers that must be queried, sorted by priority.
+        :return: A list containing the provider names, the first one has the highest priority.
+        :rtype: List[str]
+        """
+        return Config.lyrics_providers
+
+    @staticmethod
+    def get_lyrics_strategy() -> str:
+        """
+        Returns how lyrics are picked among the results returned by the providers queried concurrently.
+        :return: A string containing "first", "priority" or "adaptive" to query providers one at a time.
+        :rtype: str
+        """
+        return Config.lyrics_strategy
+
+    @staticmethod
+    def get_lyrics_timeout() -> int:
+        """
+        Returns the time after which pending lyrics providers are no longer waited for.
+        :return: An integer number greater than zero representing the timeout in seconds.
+        :rtype: int
+        """
+        return Config.lyrics_timeout
+
+    @staticmethod
+    def get_lyrics_cache() -> Optional[str]:
+        """
+        Returns the path to the SQLite database where lyrics found are stored to be reused by other songs and runs.
+        :return: A string containing the path to the database file or None if lyrics should not be cached.
+        :rtype: Optional[str]
+        """
+        return Config.lyrics_cache
+
+    @staticmethod
+    def get_lyrics_cache_ttl() -> int:
+        """
+        Returns how long cached lyrics are considered valid.
+        :return: An integer number greater than zero representing the time to live in days.
+        :rtype: int
+        """
+        return Config.lyrics_cache_ttl
+
+    @staticmethod
+    def get_lyrics_cache_size() -> int:
+        """
+        Returns the maximum number of songs the lyrics cache can hold.
+        :return: An integer number greater than zero representing the number of entries.
+        :rtype: int
+        """
+        return Config.lyrics_cache_size
+
+    @staticmethod
+    def get_html_parser() -> str:
+        """
+        Returns the parser used to process the pages of the lyrics providers.
+        :return: A string containing "lxml", "html.parser" or "auto" to use lxml whenever it is installed.
+        :rtype: str
+        """
+        return Config.html_parser
+
+    @staticmethod
+    def get_fill_missing() -> bool:
+        """
+        Returns if only the information missing from the file tags should be looked up.
+        :return: If songs already having complete tags, cover and lyrics should be skipped will be returned "True".
+        :rtype: bool
+        """
+        return Config.fill_missing
+
+    @staticmethod
+    def get_lyrics_directory() -> Optional[str]:
+        """
+        Returns the path to the directory containing LRC and text lyrics files to use before querying the providers.
+        :return: A string containing the path to the directory or None if no directory has been defined.
+        :rtype: Optional[str]
+        """
+        return Config.lyrics_directory
+
+    @staticmethod
+    def get_metrics_file() -> Optional[str]:
+        """
+        Returns the path to the JSON file where the metrics collected during the run are written.
+        :return: A string containing the path to the file or None if no path has been defined.
+        :rtype: Optional[str]
+        """
+        return Config.metrics_file
+
+    @staticmethod
+    def get_metrics_textfile() -> Optional[str]:
+        """
+        Returns the path to the file where the metrics are written for the Prometheus textfile collector.
+        :return: A string containing the path to the file, usually ending with ".prom", or None if no path is defined.
+        :rtype: Optional[str]
+        """
+        return Config.metrics_textfile
+
+    @staticmethod
+    def get_trace_file() -> Optional[str]:
+        """
+        Returns the path to the file where the spans recorded while processing the files are written.
+        :return: A string containing the path to the trace file or None if tracing is disabled.
+        :rtype: Optional[str]
+        """
+        return Config.trace_file
+
+    @staticmethod
+    def get_profiler() -> Optional[str]:
+        """
+        Returns the profiler to run during the scan.
+        :return: A string containing "cpu" for cProfile, "mem" for tracemalloc or None if profiling is disabled.
+        :rtype: Optional[str]
+        """
+        return Config.profiler
+
+    @staticmethod
+    def get_progress() -> str:
+        """
+        Returns how the progress of the scan must be shown.
+        :return: A string containing "bar", "json", "off" or "auto" to use the bar on terminals only.
+        :rtype: str
+        """
+        return Config.progress
+
+    @staticmethod
+    def get_record() -> Optional[str]:
+        """
+        Returns the path to the directory where the HTTP responses received are recorded.
+        :return: A string containing the path to the directory or None if responses are not recorded.
+        :rtype: Optional[str]
+        """
+        return Config.record
+
+    @staticmethod
+    def get_replay() -> Optional[str]:
+        """
+        Returns the path to the directory containing the recorded HTTP responses to serve instead of the network.
+        :return: A string containing the path to the directory or None if requests are sent to the network.
+        :rtype: Optional[str]
+        """
+        return Config.replay
+
     @staticmethod
     def setup_from_cli() -> None:
         """
@@ -274,6 +598,158 @@ class Config:
             type=str,
             help='the path to the log file where log messages should be written in.'
         )
+        parser.add_argument(
+            '--log_format',
+            nargs='?',
+            type=str,
+            choices=Config.LOG_FORMATS,
+            help='write log lines as plain "text" (default) or as "json" objects including the processed file.'
+        )
+        parser.add_argument(
+            '--in_place',
+            action='store_true',
+            help='write tags directly into the source files without copying them, ignored with --dest or --format.'
+        )
+        parser.add_argument(
+            '--tag_backup',
+            nargs='?',
+            type=str,
+            help='the directory where the original tags should be backed up before being edited in place.'
+        )
+        parser.add_argument(
+            '--index_file',
+            nargs='?',
+            type=str,
+            help='the path to a SQLite database used to cache tags of unchanged files across runs.'
+        )
+        parser.add_argument(
+            '--cache_dir',
+            nargs='?',
+            type=str,
+            help='the directory where converted files should be cached in to be reused by later runs.'
+        )
+        parser.add_argument(
+            '--cache_size',
+            nargs='?',
+            type=int,
+            help='the maximum size of the conversion cache in megabytes, 1024 by default.'
+        )
+        parser.add_argument(
+            '--single_pass',
+            action='store_true',
+            help='along with --format, write tags and cover while converting, the fields ffmpeg cannot write after it.'
+        )
+        parser.add_argument(
+            '--profile',
+            action='append',
+            type=str,
+            help='a "format[:bitrate[:dest]]" conversion target, repeat it to convert each song into several formats.'
+        )
+        parser.add_argument(
+            '--replaygain',
+            action='store_true',
+            help='measure songs loudness (EBU R128) and write ReplayGain track and album tags, requires NumPy.'
+        )
+        parser.add_argument(
+            '--lyrics_providers',
+            nargs='?',
+            type=str,
+            help='a comma separated list of lyrics providers sorted by priority, "azlyrics,musixmatch" by default.'
+        )
+        parser.add_argument(
+            '--lyrics_strategy',
+            nargs='?',
+            type=str,
+            choices=sorted(LyricsFinder.LyricsFinder.get_supported_strategies()),
+            help='use the "first" lyrics found (default), wait for providers by "priority" until the timeout or query '
+                 'them one at a time, best success rate and latency first ("adaptive").'
+        )
+        parser.add_argument(
+            '--lyrics_timeout',
+            nargs='?',
+            type=int,
+            help='the time in seconds after which pending lyrics providers are abandoned, 10 by default.'
+        )
+        parser.add_argument(
+            '--lyrics_cache',
+            nargs='?',
+            type=str,
+            help='the path to a SQLite database where lyrics are stored and looked up before scraping providers.'
+        )
+        parser.add_argument(
+            '--lyrics_cache_ttl',
+            nargs='?',
+            type=int,
+            help='the number of days cached lyrics are considered valid, 90 by default.'
+        )
+        parser.add_argument(
+            '--lyrics_cache_size',
+            nargs='?',
+            type=int,
+            help='the maximum number of songs kept in the lyrics cache, 50000 by default.'
+        )
+        parser.add_argument(
+            '--html_parser',
+            nargs='?',
+            type=str,
+            choices=Config.HTML_PARSERS,
+            help='the parser used to process lyrics pages, "auto" (default) uses lxml whenever it is installed.'
+        )
+        parser.add_argument(
+            '--fill_missing',
+            action='store_true',
+            help='look up only the information missing from the file tags, files having them all are skipped.'
+        )
+        parser.add_argument(
+            '--lyrics_directory',
+            nargs='?',
+            type=str,
+            help='the path to a directory of LRC or text files named "Artist - Title", looked up before the providers.'
+        )
+        parser.add_argument(
+            '--metrics_file',
+            nargs='?',
+            type=str,
+            help='the path to a JSON file where the duration and outcome of each processing stage are written.'
+        )
+        parser.add_argument(
+            '--metrics_textfile',
+            nargs='?',
+            type=str,
+            help='the path to a ".prom" file where the same metrics are written for the Prometheus textfile collector.'
+        )
+        parser.add_argument(
+            '--trace_file',
+            nargs='?',
+            type=str,
+            help='the path to a JSON file where a trace of each stage and request is written, see chrome://tracing.'
+        )
+        parser.add_argument(
+            '--profiler',
+            nargs='?',
+            type=str,
+            choices=Config.PROFILERS,
+            help='profile the run with cProfile ("cpu") or tracemalloc ("mem"), reports are saved next to the log file.'
+        )
+        parser.add_argument(
+            '--progress',
+            nargs='?',
+            type=str,
+            choices=Config.PROGRESS_MODES,
+            help='show progress as a "bar", as "json" lines on stderr or "off", "auto" (bar on terminals) by default.'
+        )
+        parser.add_argument(
+            '--record',
+            nargs='?',
+            type=str,
+            help='the path to a directory where the responses of iTunes and the lyrics providers are recorded.'
+        )
+        parser.add_argument(
+            '--replay',
+            nargs='?',
+            type=str,
+            help='the path to a directory of responses recorded by "--record" to serve instead of the network.'
+        )
         # GET the CLI arguments based on the registered values.
         args = parser.parse_args()
         if args.config:
@@ -311,6 +787,57 @@ class Config:
             Config.bitrate = args.bitrate
         if args.log_file:
             Config.log_file = args.log_file
+        if args.log_format:
+            Config.log_format = args.log_format
+        if args.in_place is True:
+            Config.in_place = True
+        if args.tag_backup:
+            Config.tag_backup = FileScanner.FileScanner.prepare_path(args.tag_backup)
+        if args.index_file:
+            Config.index_file = FileScanner.FileScanner.prepare_path(args.index_file)
+        if args.cache_dir:
+            Config.cache_directory = FileScanner.FileScanner.prepare_path(args.cache_dir)
+        if args.cache_size and args.cache_size > 0:
+            Config.cache_size = args.cache_size
+        if args.single_pass is True:
+            Config.single_pass = True
+        if args.profile:
+            profiles: List[Optional[Dict[str, Any]]] = [Config.__parse_profile(value) for value in args.profile]
+            Config.profiles = [profile for profile in profiles if profile is not None]
+        if args.replaygain is True:
+            Config.replaygain = True
+        if args.lyrics_providers:
+            Config.lyrics_providers = Config.__parse_lyrics_providers(args.lyrics_providers.split(','))
+        if args.lyrics_strategy:
+            Config.lyrics_strategy = args.lyrics_strategy
+        if args.lyrics_timeout and args.lyrics_timeout > 0:
+            Config.lyrics_timeout = args.lyrics_timeout
+        if args.lyrics_cache:
+            Config.lyrics_cache = FileScanner.FileScanner.prepare_path(args.lyrics_cache)
+        if args.lyrics_cache_ttl and args.lyrics_cache_ttl > 0:
+            Config.lyrics_cache_ttl = args.lyrics_cache_ttl
+        if args.lyrics_cache_size and args.lyrics_cache_size > 0:
+            Config.lyrics_cache_size = args.lyrics_cache_size
+        if args.html_parser:
+            Config.html_parser = args.html_parser
+        if args.fill_missing is True:
+            Config.fill_missing = True
+        if args.lyrics_directory:
+            Config.lyrics_directory = FileScanner.FileScanner.prepare_path(args.lyrics_directory)
+        if args.metrics_file:
+            Config.metrics_file = FileScanner.FileScanner.prepare_path(args.metrics_file)
+        if args.metrics_textfile:
+            Config.metrics_textfile = FileScanner.FileScanner.prepare_path(args.metrics_textfile)
+        if args.trace_file:
+            Config.trace_file = FileScanner.FileScanner.prepare_path(args.trace_file)
+        if args.profiler:
+            Config.profiler = args.profiler
+        if args.progress:
+            Config.progress = args.progress
+        if args.record:
+            Config.record = FileScanner.FileScanner.prepare_path(args.record)
+        if args.replay:
+            Config.replay = FileScanner.FileScanner.prepare_path(args.replay)
         # Validate all the loaded parameters before starting.
         Config.__validate()
 
@@ -325,7 +852,7 @@ class Config:
             raise ValueError('Invalid file path')
         # Open the given configuration file.
         with open(path, 'rb') as conf:
-            contents: str = str(conf.read())
+            contents: str = conf.read().decode('utf-8')
             # Parse its contents as JSON.
             data: Any = json.loads(contents)
             if 'source' in data and type(data['source']) is str and data['source']:
@@ -358,3 +885,61 @@ class Config:
                 Config.recursive = True
             if 'flatten' in data and data['flatten'] is True:
                 Config.flatten = True
+            if 'in_place' in data and data['in_place'] is True:
+                Config.in_place = True
+            if 'tag_backup' in data and type(data['tag_backup']) is str and data['tag_backup']:
+                Config.tag_backup = FileScanner.FileScanner.prepare_path(data['tag_backup'])
+            if 'index_file' in data and type(data['index_file']) is str and data['index_file']:
+                Config.index_file = FileScanner.FileScanner.prepare_path(data['index_file'])
+            if 'cache_dir' in data and type(data['cache_dir']) is str and data['cache_dir']:
+                Config.cache_directory = FileScanner.FileScanner.prepare_path(data['cache_dir'])
+            if 'cache_size' in data and type(data['cache_size']) is int and data['cache_size'] > 0:
+                Config.cache_size = data['cache_size']
+            if 'single_pass' in data and data['single_pass'] is True:
+                Config.single_pass = True
+            if 'profiles' in data and type(data['profiles']) is list:
+                Config.profiles = []
+                for item in data['profiles']:
+                    if type(item) is dict:
+                        profile: Optional[Dict[str, Any]] = Config.__create_profile(
+                            item.get('format'), item.get('bitrate'), item.get('destination')
+                        )
+                        if profile is not None:
+                            Config.profiles.append(profile)
+            if 'replaygain' in data and data['replaygain'] is True:
+                Config.replaygain = True
+            if 'lyrics_providers' in data and type(data['lyrics_providers']) is list:
+                Config.lyrics_providers = Config.__parse_lyrics_providers(data['lyrics_providers'])
+            if 'lyrics_strategy' in data and type(data['lyrics_strategy']) is str:
+                if data['lyrics_strategy'] in LyricsFinder.LyricsFinder.get_supported_strategies():
+                    Config.lyrics_strategy = data['lyrics_strategy']
+            if 'lyrics_timeout' in data and type(data['lyrics_timeout']) is int and data['lyrics_timeout'] > 0:
+                Config.lyrics_timeout = data['lyrics_timeout']
+            if 'lyrics_cache' in data and type(data['lyrics_cache']) is str and data['lyrics_cache']:
+                Config.lyrics_cache = FileScanner.FileScanner.prepare_path(data['lyrics_cache'])
+            if 'lyrics_cache_ttl' in data and type(data['lyrics_cache_ttl']) is int and data['lyrics_cache_ttl'] > 0:
+                Config.lyrics_cache_ttl = data['lyrics_cache_ttl']
+            if 'lyrics_cache_size' in data and type(data['lyrics_cache_size']) is int and data['lyrics_cache_size'] > 0:
+                Config.lyrics_cache_size = data['lyrics_cache_size']
+            if 'html_parser' in data and data['html_parser'] in Config.HTML_PARSERS:
+                Config.html_parser = data['html_parser']
+            if 'log_format' in data and data['log_format'] in Config.LOG_FORMATS:
+                Config.log_format = data['log_format']
+            if 'fill_missing' in data and data['fill_missing'] is True:
+                Config.fill_missing = True
+            if 'lyrics_directory' in data and type(data['lyrics_directory']) is str and data['lyrics_directory']:
+                Config.lyrics_directory = FileScanner.FileScanner.prepare_path(data['lyrics_directory'])
+            if 'metrics_file' in data and type(data['metrics_file']) is str and data['metrics_file']:
+                Config.metrics_file = FileScanner.FileScanner.prepare_path(data['metrics_file'])
+            if 'metrics_textfile' in data and type(data['metrics_textfile']) is str and data['metrics_textfile']:
+                Config.metrics_textfile = FileScanner.FileScanner.prepare_path(data['metrics_textfile'])
+            if 'trace_file' in data and type(data['trace_file']) is str and data['trace_file']:
+                Config.trace_file = FileScanner.FileScanner.prepare_path(data['trace_file'])
+            if 'profiler' in data and data['profiler'] in Config.PROFILERS:
+                Config.profiler = data['profiler']
+            if 'progress' in data and data['progress'] in Config.PROGRESS_MODES:
+                Config.progress = data['progress']
+            if 'record' in data and type(data['record']) is str and data['record']:
+                Config.record = FileScanner.FileScanner.prepare_path(data['record'])
+            if 'replay' in data and type(data['replay']) is str and data['replay']:
+                Config.replay = FileScanner.FileScanner.prepare_path(data['replay'])
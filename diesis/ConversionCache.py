@@ -0,0 +1,155 @@
+from hashlib import md5
+from shutil import copyfile
+from typing import Optional, List, Tuple
+from diesis import Config, Logger
+import threading
+import os
+
+
+class ConversionCache:
+    CHUNK_SIZE: int = 1048576
+
+    __size: Optional[int] = None
+    __lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """
+        Returns if converted files should be cached.
+        :return: If a cache directory has been defined will be returned "True".
+        :rtype: bool
+        """
+        return Config.Config.get_cache_directory() is not None
+
+    @staticmethod
+    def get_key(path: str, conversion_format: str) -> str:
+        """
+        Generates the key that identifies the conversion of the given file into the given format.
+        :param path: A string containing the path to the source file.
+        :type path: str
+        :param conversion_format: A string containing the format the file is going to be converted into.
+        :type conversion_format: str
+        :return: A string containing the key made of source contents hash, target format and bitrate.
+        :rtype: str
+        """
+        digest = md5()
+        with open(path, 'rb') as source:
+            chunk: bytes = source.read(ConversionCache.CHUNK_SIZE)
+            while chunk:
+                digest.update(chunk)
+                chunk = source.read(ConversionCache.CHUNK_SIZE)
+        bitrate: Optional[int] = Config.Config.get_bitrate()
+        return digest.hexdigest() + '-' + conversion_format + '-' + str(bitrate if bitrate else 0)
+
+    @staticmethod
+    def __get_entry_path(key: str) -> str:
+        """
+        Returns the path to the cached file corresponding to the given key.
+        :param key: A string containing the key generated by the "get_key" method.
+        :type key: str
+        :return: A string containing the path to the cache entry.
+        :rtype: str
+        """
+        return Config.Config.get_cache_directory() + '/' + key
+
+    @staticmethod
+    def lookup(key: str) -> Optional[str]:
+        """
+        Returns the path to the cached file corresponding to the given key, the file should be used as read only.
+        :param key: A string containing the key generated by the "get_key" method.
+        :type key: str
+        :return: A string containing the path to the cached file or None if the key is not cached.
+        :rtype: Optional[str]
+        """
+        entry: str = ConversionCache.__get_entry_path(key)
+        try:
+            # The modification time is used to track the last access for eviction.
+            os.utime(entry)
+        except OSError:
+            return None
+        Logger.Logger.log('Converted file found in cache.')
+        return entry
+
+    @staticmethod
+    def fetch(key: str, destination: str) -> bool:
+        """
+        Copies the cached file corresponding to the given key to the given destination, if found.
+        :param key: A string containing the key generated by the "get_key" method.
+        :type key: str
+        :param destination: A string containing the path where the cached file should be copied to.
+        :type destination: str
+        :return: If the file was found in cache will be returned "True".
+        :rtype: bool
+        """
+        entry: str = ConversionCache.__get_entry_path(key)
+        try:
+            copyfile(entry, destination)
+            # The modification time is used to track the last access for eviction.
+            os.utime(entry)
+        except OSError:
+            return False
+        Logger.Logger.log('Converted file found in cache.')
+        return True
+
+    @staticmethod
+    def store(key: str, path: str) -> None:
+        """
+        Adds a converted file to the cache, least recently used entries are removed if the size limit is exceeded.
+        :param key: A string containing the key generated by the "get_key" method.
+        :type key: str
+        :param path: A string containing the path to the converted file.
+        :type path: str
+        """
+        directory: str = Config.Config.get_cache_directory()
+        entry: str = ConversionCache.__get_entry_path(key)
+        try:
+            if not os.path.exists(directory):
+                os.makedirs(directory, 0o777, True)
+            # Copy the file under a temporary name first, so that partial entries are never served.
+            copyfile(path, entry + '.tmp')
+            os.replace(entry + '.tmp', entry)
+        except OSError as ex:
+            Logger.Logger.log_error(str(ex))
+            return
+        with ConversionCache.__lock:
+            if ConversionCache.__size is None:
+                ConversionCache.__size = sum(size for size, _, _ in ConversionCache.__list_entries())
+            else:
+                ConversionCache.__size += os.path.getsize(entry)
+            if ConversionCache.__size > Config.Config.get_cache_size() * 1048576:
+                ConversionCache.__evict()
+
+    @staticmethod
+    def __list_entries() -> List[Tuple[int, float, str]]:
+        """
+        Lists all the files contained in the cache directory.
+        :return: A list of tuples containing size, last access time and path of each entry.
+        :rtype: List[Tuple[int, float, str]]
+        """
+        directory: str = Config.Config.get_cache_directory()
+        entries: List[Tuple[int, float, str]] = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat: os.stat_result = entry.stat()
+                entries.append((stat.st_size, stat.st_mtime, entry.path))
+        return entries
+
+    @staticmethod
+    def __evict() -> None:
+        """
+        Removes the least recently used entries until the cache size fits the configured limit.
+        """
+        limit: int = Config.Config.get_cache_size() * 1048576
+        entries: List[Tuple[int, float, str]] = ConversionCache.__list_entries()
+        size: int = sum(entry[0] for entry in entries)
+        # Oldest entries come first.
+        entries.sort(key=lambda entry: entry[1])
+        for entry in entries:
+            if size <= limit:
+                break
+            try:
+                os.remove(entry[2])
+                size -= entry[0]
+            except OSError:
+                pass
+        ConversionCache.__size = size
@@ -1,13 +1,266 @@
-from typing import Set, List, Optional
-from diesis import Song, Config
-from pydub import AudioSegment
+from typing import Set, List, Optional, Dict, Tuple, Any
+from diesis import Song, Config, Logger, ConversionCache, LoudnessAnalyzer, Metrics
+import subprocess
+import tempfile
+import shutil
+import json
+import time
+import os
 
 
 class Converter:
     SUPPORTED_FORMATS: Set[str] = {'m4a', 'mp3', 'alac', 'flac', 'aiff', 'aif', 'ogg'}
+    LOSSY_FORMATS: Set[str] = {'m4a', 'mp3', 'ogg'}
+    ENCODERS: Dict[str, str] = {
+        'm4a': 'aac',
+        'mp3': 'libmp3lame',
+        'alac': 'alac',
+        'flac': 'flac',
+        'aiff': 'pcm_s16be',
+        'aif': 'pcm_s16be',
+        'ogg': 'libvorbis'
+    }
+    MUXERS: Dict[str, str] = {
+        'm4a': 'ipod',
+        'mp3': 'mp3',
+        'alac': 'ipod',
+        'flac': 'flac',
+        'aiff': 'aiff',
+        'aif': 'aiff',
+        'ogg': 'ogg'
+    }
+    # Codecs that, once found in a source file, already satisfy the given target format.
+    TARGET_CODECS: Dict[str, Set[str]] = {
+        'm4a': {'aac', 'alac'},
+        'mp3': {'mp3'},
+        'alac': {'alac'},
+        'flac': {'flac'},
+        'aiff': {'pcm_s16be', 'pcm_s24be', 'pcm_s32be'},
+        'aif': {'pcm_s16be', 'pcm_s24be', 'pcm_s32be'},
+        'ogg': {'vorbis', 'opus'}
+    }
+
+    # Formats whose containers can hold the cover picture as an attached video stream.
+    COVER_FORMATS: Set[str] = {'m4a', 'mp3', 'alac', 'flac', 'aiff', 'aif'}
+
+    PIPE_CHUNK_SIZE: int = 1048576
+
+    __probe_cache: Dict[Tuple[str, int, int], Optional[Dict[str, Any]]] = {}
 
     song: Song.Song = None
 
+    @staticmethod
+    def __get_ffmpeg_path() -> str:
+        """
+        Returns the path to the ffmpeg executable used to convert the files.
+        :return: A string containing the path to the executable.
+        :rtype: str
+        :raise RuntimeError: If ffmpeg cannot be found in the system.
+        """
+        path: Optional[str] = shutil.which('ffmpeg')
+        if path is None:
+            raise RuntimeError('Unable to find ffmpeg, make sure it is installed and available in your PATH.')
+        return path
+
+    @staticmethod
+    def __run(arguments: List[str], analyzer: Optional[LoudnessAnalyzer.LoudnessAnalyzer] = None) -> None:
+        """
+        Runs ffmpeg using the given arguments, input and output files are streamed by ffmpeg itself.
+        :param arguments: A list containing the CLI arguments to pass to ffmpeg.
+        :type arguments: List[str]
+        :param analyzer: An instance of the class "LoudnessAnalyzer" fed with the samples ffmpeg writes to its stdout.
+        :type analyzer: Optional[LoudnessAnalyzer.LoudnessAnalyzer]
+        :raise RuntimeError: If ffmpeg exits with an error.
+        """
+        command: List[str] = [Converter.__get_ffmpeg_path(), '-nostdin', '-hide_banner', '-loglevel', 'error', '-y']
+        if analyzer is None:
+            process: subprocess.CompletedProcess = subprocess.run(
+                command + arguments,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+            if process.returncode != 0:
+                raise RuntimeError('Conversion failed: ' + process.stderr.decode('utf-8', 'replace').strip())
+            return
+        # Errors go to a file, a full stderr pipe would block ffmpeg while the samples are being read.
+        with tempfile.TemporaryFile() as errors:
+            with subprocess.Popen(
+                command + arguments,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=errors
+            ) as pipe:
+                # Samples are analyzed as they are decoded, the whole track is never held in memory.
+                chunk: bytes = pipe.stdout.read(Converter.PIPE_CHUNK_SIZE)
+                while chunk:
+                    analyzer.feed(chunk)
+                    chunk = pipe.stdout.read(Converter.PIPE_CHUNK_SIZE)
+            if pipe.returncode != 0:
+                errors.seek(0)
+                raise RuntimeError('Conversion failed: ' + errors.read().decode('utf-8', 'replace').strip())
+        analyzer.finish()
+
+    @staticmethod
+    def __create_analyzer(info: Optional[Dict[str, Any]]) -> Optional[LoudnessAnalyzer.LoudnessAnalyzer]:
+        """
+        Creates the object that measures the loudness of the audio stream described by the given probe information.
+        :param info: A dictionary containing the information returned by the "probe" method.
+        :type info: Optional[Dict[str, Any]]
+        :return: An instance of the class "LoudnessAnalyzer" or None if analysis is disabled or cannot be performed.
+        :rtype: Optional[LoudnessAnalyzer.LoudnessAnalyzer]
+        """
+        if not Config.Config.get_replaygain() or info is None or not info['sample_rate'] or not info['channels']:
+            return None
+        return LoudnessAnalyzer.LoudnessAnalyzer(info['sample_rate'], info['channels'])
+
+    @staticmethod
+    def __get_analysis_arguments() -> List[str]:
+        """
+        Returns the ffmpeg output options that write the decoded samples to stdout for the loudness analysis.
+        :return: A list containing the ffmpeg options.
+        :rtype: List[str]
+        """
+        return ['-map', '0:a:0', '-c:a', 'pcm_f32le', '-f', 'f32le', 'pipe:1']
+
+    @staticmethod
+    def __to_int(value: Any) -> Optional[int]:
+        """
+        Converts a numeric value returned by ffprobe into an integer number.
+        :param value: The value to convert, ffprobe returns numbers as strings.
+        :type value: Any
+        :return: The integer number or None if the value is missing or invalid.
+        :rtype: Optional[int]
+        """
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def probe(path: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns information about the audio stream of the given file, results are cached until the file changes.
+        :param path: A string containing the path to the audio file.
+        :type path: str
+        :return: A dictionary containing the codec, the bitrate in bps, the sample rate, the channels and the duration.
+        :rtype: Optional[Dict[str, Any]]
+        """
+        try:
+            stat: os.stat_result = os.stat(path)
+        except OSError:
+            return None
+        key: Tuple[str, int, int] = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if key in Converter.__probe_cache:
+            return Converter.__probe_cache[key]
+        ffprobe: Optional[str] = shutil.which('ffprobe')
+        if ffprobe is None:
+            return None
+        process: subprocess.CompletedProcess = subprocess.run([
+            ffprobe, '-v', 'error', '-select_streams', 'a:0', '-of', 'json',
+            '-show_entries', 'stream=codec_name,bit_rate,sample_rate,channels:format=bit_rate,duration', path
+        ], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        info: Optional[Dict[str, Any]] = None
+        if process.returncode == 0:
+            data: Any = json.loads(process.stdout.decode('utf-8'))
+            streams: List[Dict[str, Any]] = data.get('streams', [])
+            container: Dict[str, Any] = data.get('format', {})
+            if streams:
+                bit_rate: Optional[int] = Converter.__to_int(streams[0].get('bit_rate'))
+                if bit_rate is None:
+                    # Some containers, such as FLAC and OGG, only report the overall bitrate.
+                    bit_rate = Converter.__to_int(container.get('bit_rate'))
+                duration: Any = container.get('duration')
+                info = {
+                    'codec': streams[0].get('codec_name'),
+                    'bit_rate': bit_rate,
+                    'sample_rate': Converter.__to_int(streams[0].get('sample_rate')),
+                    'channels': Converter.__to_int(streams[0].get('channels')),
+                    'duration': float(duration) if duration is not None else None
+                }
+        Converter.__probe_cache[key] = info
+        return info
+
+    @staticmethod
+    def get_extension(conversion_format: str) -> str:
+        """
+        Returns the file extension used by files converted into the given format.
+        :param conversion_format: A string containing the conversion format.
+        :type conversion_format: str
+        :return: A string containing the extension without the leading dot.
+        :rtype: str
+        """
+        if conversion_format == 'alac':
+            # Apple ALAC files use the same container as AAC ones.
+            return 'm4a'
+        return conversion_format
+
+    @staticmethod
+    def __can_copy(info: Optional[Dict[str, Any]], conversion_format: str, bitrate: Optional[int]) -> bool:
+        """
+        Checks if the audio stream described by the given probe information can be kept as it is.
+        :param info: A dictionary containing the information returned by the "probe" method.
+        :type info: Optional[Dict[str, Any]]
+        :param conversion_format: A string containing the format the song must be converted into.
+        :type conversion_format: str
+        :param bitrate: An integer number representing the requested bitrate in kbps, if any.
+        :type bitrate: Optional[int]
+        :return: If the stream already uses the target codec and bitrate will be returned "True".
+        :rtype: bool
+        """
+        if info is None or info['codec'] not in Converter.TARGET_CODECS[conversion_format]:
+            return False
+        if not bitrate or bitrate <= 0 or conversion_format not in Converter.LOSSY_FORMATS:
+            return True
+        # Re-encoding is worth only when the requested bitrate is noticeably lower than the current one.
+        return info['bit_rate'] is not None and info['bit_rate'] <= bitrate * 1000 * 1.05
+
+    @staticmethod
+    def __get_encoder_arguments(conversion_format: str, bitrate: Optional[int]) -> List[str]:
+        """
+        Returns the ffmpeg output options required to encode the audio stream into the given format.
+        :param conversion_format: A string containing the format the song must be converted into.
+        :type conversion_format: str
+        :param bitrate: An integer number representing the requested bitrate in kbps, if any.
+        :type bitrate: Optional[int]
+        :return: A list containing the ffmpeg options.
+        :rtype: List[str]
+        """
+        arguments: List[str] = ['-c:a', Converter.ENCODERS[conversion_format]]
+        if bitrate and bitrate > 0 and conversion_format in Converter.LOSSY_FORMATS:
+            arguments += ['-b:a', str(bitrate) + 'k']
+        return arguments
+
+    @staticmethod
+    def __escape_metadata(value: str) -> str:
+        """
+        Escapes the characters that have a special meaning in ffmpeg metadata files.
+        :param value: A string containing the key or the value to escape.
+        :type value: str
+        :return: The escaped string.
+        :rtype: str
+        """
+        for character in ['\\', '=', ';', '#', '\n']:
+            value = value.replace(character, '\\' + character)
+        return value
+
+    def __write_metadata_file(self, conversion_format: str) -> str:
+        """
+        Writes the song properties into a temporary ffmpeg metadata file.
+        :param conversion_format: A string containing the format the song is going to be converted into.
+        :type conversion_format: str
+        :return: A string containing the path to the generated file.
+        :rtype: str
+        """
+        metadata: Dict[str, str] = self.song.get_tag_helper().get_ffmpeg_metadata(conversion_format)
+        lines: List[str] = [';FFMETADATA1']
+        for key, value in metadata.items():
+            lines.append(Converter.__escape_metadata(key) + '=' + Converter.__escape_metadata(value))
+        handle, path = tempfile.mkstemp('.txt')
+        with os.fdopen(handle, 'w', encoding='utf-8') as metadata_file:
+            metadata_file.write('\n'.join(lines) + '\n')
+        return path
+
     @staticmethod
     def get_supported_formats() -> Set[str]:
         """
@@ -41,11 +294,13 @@ class Converter:
         """
         return self.song
 
-    def convert(self, conversion_format: str) -> str:
+    def convert(self, conversion_format: str, destination: Optional[str] = None) -> str:
         """
         Convert the file contained within the given song object.
         :param conversion_format: A string containing the format the song must be converted into.
         :type conversion_format: str
+        :param destination: A string containing the path to the file to generate with song properties embedded in it.
+        :type destination: Optional[str]
         :return: A string containing the path to the converted file.
         :rtype: str
         :raise ValueError: If no song has been defined.
@@ -58,27 +313,163 @@ class Converter:
             raise ValueError('Unsupported format.')
         path: str = self.song.get_path()
         extension: str = self.song.get_extension()
-        if extension == conversion_format:
-            return path
-        arguments: List[str] = []
-        new_extension: str = conversion_format
-        if conversion_format == 'alac':
-            # Patches in CLI arguments based on this command sample:
-            # ffmpeg -i input.mp3 -vn -c:a alac output.m4a
-            # arguments = ['-vn', '-c:a', 'alac']
-            arguments = ['-acodec', 'alac']
-            conversion_format = 'aac'
-            new_extension = 'm4a'
-        elif conversion_format == 'aiff' or conversion_format == 'aif':
-            extension = 'aac'
-        index: int = path.rfind('.') + 1
-        new_path: str = path[:index] + new_extension
-        # Generate the object for conversion.
-        audio: AudioSegment = AudioSegment.from_file(path, extension)
-        # Convert and save the file.
+        new_extension: str = Converter.get_extension(conversion_format)
+        info: Optional[Dict[str, Any]] = Converter.probe(path)
         bitrate: Optional[int] = Config.Config.get_bitrate()
-        if bitrate and bitrate > 0:
-            audio.export(new_path, format=conversion_format, parameters=arguments, bitrate=bitrate)
+        copy: bool = Converter.__can_copy(info, conversion_format, bitrate)
+        embed: bool = destination is not None
+        if not embed and (copy or info is None) and extension == new_extension:
+            # The file is already in the requested format, nothing to do.
+            return path
+        if embed:
+            new_path: str = destination
+        else:
+            index: int = path.rfind('.') + 1
+            new_path: str = path[:index] + new_extension
+            if new_path == path:
+                # ffmpeg cannot read from and write to the same file.
+                new_path = path[:index - 1] + '-converted.' + new_extension
+        cache_key: Optional[str] = None
+        if not copy and ConversionCache.ConversionCache.is_enabled():
+            # Reuse the file encoded by a previous run, if the same source has been converted with the same settings.
+            cache_key = ConversionCache.ConversionCache.get_key(path, conversion_format)
+            start: float = time.monotonic()
+            if not embed:
+                if ConversionCache.ConversionCache.fetch(cache_key, new_path):
+                    Metrics.Metrics.record('conversion_cache', time.monotonic() - start, 'hit')
+                    return new_path
+                Metrics.Metrics.record('conversion_cache', time.monotonic() - start, 'miss')
+            else:
+                cached_path: Optional[str] = ConversionCache.ConversionCache.lookup(cache_key)
+                result: str = 'miss' if cached_path is None else 'hit'
+                Metrics.Metrics.record('conversion_cache', time.monotonic() - start, result)
+                if cached_path is not None:
+                    # The cached stream only needs to be copied along with the metadata.
+                    path = cached_path
+                    copy = True
+                    cache_key = None
+        arguments: List[str] = ['-i', path]
+        # Only the audio stream is kept, the cover picture is added back either here or while saving tags.
+        output_arguments: List[str] = ['-map', '0:a:0']
+        metadata_path: Optional[str] = None
+        if embed:
+            metadata_path = self.__write_metadata_file(conversion_format)
+            arguments += ['-f', 'ffmetadata', '-i', metadata_path]
+            output_arguments += ['-map_metadata', '1']
+            cover_path: Optional[str] = self.song.get_cover_path()
+            if cover_path is not None and conversion_format in Converter.COVER_FORMATS:
+                arguments += ['-i', cover_path]
+                output_arguments += ['-map', '2:v', '-c:v', 'copy', '-disposition:v:0', 'attached_pic']
+            if conversion_format == 'aiff' or conversion_format == 'aif':
+                output_arguments += ['-write_id3v2', '1']
         else:
-            audio.export(new_path, format=conversion_format, parameters=arguments)
+            output_arguments += ['-map_metadata', '0']
+        if copy:
+            # The stream already uses the target codec, just move it into the new container.
+            Logger.Logger.log('Source codec matches the target one, copying the audio stream...')
+            output_arguments += ['-c:a', 'copy']
+        else:
+            output_arguments += Converter.__get_encoder_arguments(conversion_format, bitrate)
+        output_arguments += ['-f', Converter.MUXERS[conversion_format], new_path]
+        analyzer: Optional[LoudnessAnalyzer.LoudnessAnalyzer] = Converter.__create_analyzer(info)
+        if analyzer is not None:
+            # Loudness is measured on the samples decoded for the conversion, the file is not read twice.
+            output_arguments += Converter.__get_analysis_arguments()
+        start: float = time.monotonic()
+        result: str = 'error'
+        try:
+            # Let ffmpeg decode and encode the file in a single streaming pass, memory usage does not grow with length.
+            Converter.__run(arguments + output_arguments, analyzer)
+            result = 'copy' if copy else 'encode'
+        finally:
+            Metrics.Metrics.record('conversion', time.monotonic() - start, result, {'format': conversion_format})
+            if metadata_path is not None:
+                os.remove(metadata_path)
+        if analyzer is not None:
+            self.song.set_loudness(analyzer)
+        if cache_key is not None:
+            ConversionCache.ConversionCache.store(cache_key, new_path)
         return new_path
+
+    def analyze(self) -> None:
+        """
+        Measures the loudness of the song without converting it, used when no conversion takes place.
+        :raise ValueError: If no song has been defined.
+        """
+        if self.song is None:
+            raise ValueError('No song has been defined.')
+        path: str = self.song.get_path()
+        analyzer: Optional[LoudnessAnalyzer.LoudnessAnalyzer] = Converter.__create_analyzer(Converter.probe(path))
+        if analyzer is None:
+            return
+        Logger.Logger.log('Analyzing song loudness...')
+        Converter.__run(['-i', path] + Converter.__get_analysis_arguments(), analyzer)
+        self.song.set_loudness(analyzer)
+
+    def convert_many(self, profiles: List[Dict[str, Any]], destinations: List[str], embed: bool = False) -> None:
+        """
+        Converts the song into several formats at once, the source file is decoded once and feeds all the encoders.
+        :param profiles: A list of dictionaries containing the "format" and "bitrate" of each file to generate.
+        :type profiles: List[Dict[str, Any]]
+        :param destinations: A list containing the path to the file to generate for each profile.
+        :type destinations: List[str]
+        :param embed: If set to "True", song properties and cover are embedded in the generated files.
+        :type embed: bool
+        :raise ValueError: If no song has been defined.
+        :raise ValueError: If an invalid or an unsupported format is given.
+        """
+        if self.song is None:
+            raise ValueError('No song has been defined.')
+        for profile in profiles:
+            if not profile['format'] or profile['format'] not in Converter.SUPPORTED_FORMATS:
+                raise ValueError('Unsupported format.')
+        path: str = self.song.get_path()
+        info: Optional[Dict[str, Any]] = Converter.probe(path)
+        arguments: List[str] = ['-i', path]
+        inputs: int = 1
+        cover_index: Optional[int] = None
+        if embed and self.song.get_cover_path() is not None:
+            arguments += ['-i', self.song.get_cover_path()]
+            cover_index = inputs
+            inputs += 1
+        output_arguments: List[str] = []
+        metadata_paths: List[str] = []
+        try:
+            for profile, destination in zip(profiles, destinations):
+                conversion_format: str = profile['format']
+                output_arguments += ['-map', '0:a:0']
+                if embed:
+                    # Each output gets its own metadata input as keys depend on the container.
+                    metadata_paths.append(self.__write_metadata_file(conversion_format))
+                    arguments += ['-f', 'ffmetadata', '-i', metadata_paths[-1]]
+                    output_arguments += ['-map_metadata', str(inputs)]
+                    inputs += 1
+                    if cover_index is not None and conversion_format in Converter.COVER_FORMATS:
+                        output_arguments += ['-map', str(cover_index) + ':v', '-c:v', 'copy']
+                        output_arguments += ['-disposition:v:0', 'attached_pic']
+                    if conversion_format == 'aiff' or conversion_format == 'aif':
+                        output_arguments += ['-write_id3v2', '1']
+                else:
+                    output_arguments += ['-map_metadata', '0']
+                if Converter.__can_copy(info, conversion_format, profile['bitrate']):
+                    output_arguments += ['-c:a', 'copy']
+                else:
+                    output_arguments += Converter.__get_encoder_arguments(conversion_format, profile['bitrate'])
+                output_arguments += ['-f', Converter.MUXERS[conversion_format], destination]
+            analyzer: Optional[LoudnessAnalyzer.LoudnessAnalyzer] = Converter.__create_analyzer(info)
+            if analyzer is not None:
+                output_arguments += Converter.__get_analysis_arguments()
+            Logger.Logger.log('Converting the song into ' + str(len(profiles)) + ' formats at once...')
+            # A single ffmpeg process decodes the source once and writes all the outputs.
+            start: float = time.monotonic()
+            try:
+                Converter.__run(arguments + output_arguments, analyzer)
+            except RuntimeError:
+                Metrics.Metrics.record('conversion', time.monotonic() - start, 'error', {'format': 'profiles'})
+                raise
+            Metrics.Metrics.record('conversion', time.monotonic() - start, 'encode', {'format': 'profiles'})
+            if analyzer is not None:
+                self.song.set_loudness(analyzer)
+        finally:
+            for metadata_path in metadata_paths:
+                os.remove(metadata_path)
@@ -1,16 +1,19 @@
 from hashlib import md5
 from shutil import copyfile
 from datetime import datetime
-from typing import Set, Optional, List
+from typing import Set, Optional, List, Dict, Any
 from pathlib import Path
-from diesis import Logger, Song, Config, TagHelper, Converter, Utils
+from diesis import Logger, Song, Config, TagHelper, Converter, Utils, LibraryIndex, LoudnessAnalyzer, LyricsCache
+from diesis import Metrics, Tracer, Profiler, Progress, HttpArchive
 import tempfile
+import time
 import os
 
 
 class FileScanner:
     source: str = None
     destination: str = None
+    albums: Dict[int, Dict[str, Any]] = None
 
     @staticmethod
     def prepare_path(path: Optional[str]) -> Optional[str]:
@@ -32,54 +35,78 @@ class FileScanner:
         :return: A set containing all the file extensions corresponding to the supported formats found.
         :rtype: Set[str]
         """
-        if not Config.Config.get_format():
+        if not Config.Config.get_format() and not Config.Config.get_profiles():
             # If file conversion is disabled, get only the formats supported by the "TagHelper" class.
             return TagHelper.TagHelper.get_supported_formats()
         return TagHelper.TagHelper.get_supported_formats() & Converter.Converter.get_supported_formats()
 
-    def __move(self, song: Song.Song) -> None:
+    def __move(self, song: Song.Song, destination: Optional[str] = None) -> str:
         """
         Renames the file corresponding to the given song using information fetched from iTunes as the new name.
         :param song: An object representing the song to rename.
         :type song: Song.Song
+        :param destination: A string containing the destination directory to use instead of the configured one.
+        :type destination: Optional[str]
+        :return: A string containing the path where the file has been moved to.
+        :rtype: str
         """
+        if destination is None:
+            destination = self.destination
+        start: float = time.monotonic()
         tmp_path: str = song.get_path()
         length: int = len(self.source) + 1
         original_base_path: str = song.get_original_path()[length:]
+        in_place: bool = not destination and tmp_path == song.get_original_path()
+        if in_place and not Config.Config.get_rename():
+            # The file has been edited in place and nothing asks for a new name, leave it as it is.
+            Metrics.Metrics.record('move', time.monotonic() - start, 'unchanged')
+            return tmp_path
         # Use temporary file extension because it contains the converted file extension (in case of conversion).
-        extension: str = os.path.splitext(tmp_path)[1].lower()
+        extension: str = os.path.splitext(tmp_path)[1]
+        if not in_place:
+            extension = extension.lower()
         filename: str = os.path.splitext(os.path.basename(original_base_path))[0]
         directory: str = ''
-        if self.destination and original_base_path.find('/') and not Config.Config.get_flatten():
+        if destination and original_base_path.find('/') and not Config.Config.get_flatten():
             # Recursive mode is enabled and original directory hierarchy must be reproduced in destination folder.
             directory = os.path.dirname(original_base_path) + '/'
         if Config.Config.get_rename():
             # New file must be renamed, building the name using information fetched from iTunes.
             filename = song.get_artist() + ' - ' + song.get_title()
-        if self.destination:
-            base_dir: str = self.destination + '/' + directory
+        if destination:
+            base_dir: str = destination + '/' + directory
+        elif in_place:
+            # The file has been edited in place, keep it in its own directory and the case of its extension.
+            base_dir: str = os.path.dirname(tmp_path) + '/'
         else:
             base_dir: str = self.source + '/'
         # Remove invalid characters from the user.
         filename = filename.replace('/', '-').replace('\\', '-')
         path: str = base_dir + filename + extension
+        if path == tmp_path:
+            # The file already has the right name and location.
+            Metrics.Metrics.record('move', time.monotonic() - start, 'unchanged')
+            return path
         # Check if existing file overwrite is allowed or if the new file name doesn't exists.
         if Config.Config.get_overwrite() and os.path.exists(path):
-            if directory and not os.path.exists(self.destination + '/' + directory):
+            if directory and not os.path.exists(destination + '/' + directory):
                 # The file is going to be moved, ensure the folder exists if directory hierarchy must be maintained.
-                os.makedirs(self.destination + '/' + directory, 0o777, True)
+                os.makedirs(destination + '/' + directory, 0o777, True)
             # Move temporary created file to its final destination folder.
             os.rename(tmp_path, path)
-            return
+            Metrics.Metrics.record('move', time.monotonic() - start, 'moved')
+            return path
         i: int = 1
         # Check if new file name exists, in this case, generate new names until a non-existing one is found.
         while os.path.exists(path):
             path = base_dir + filename + ' - ' + str(i) + extension
             i += 1
-        if directory and not os.path.exists(self.destination + '/' + directory):
-            os.makedirs(self.destination + '/' + directory, 0o777, True)
+        if directory and not os.path.exists(destination + '/' + directory):
+            os.makedirs(destination + '/' + directory, 0o777, True)
         # Move the file.
         os.rename(tmp_path, path)
+        Metrics.Metrics.record('move', time.monotonic() - start, 'moved')
+        return path
 
     def __load_eligible_files(self, recursive: bool, context: Optional[str] = None) -> Set[str]:
         """
@@ -120,21 +147,214 @@ class FileScanner:
                 file_list.add(context + file)
         return file_list
 
-    def __process_song(self, file: str) -> None:
+    def __is_in_place(self) -> bool:
+        """
+        Returns if the tags can be written directly into the source files, this requires no conversion nor destination.
+        :return: If source files are going to be edited in place will be returned "True".
+        :rtype: bool
+        """
+        if Config.Config.get_format() or Config.Config.get_profiles():
+            return False
+        return Config.Config.get_in_place() and not self.destination
+
+    def __backup_tags(self, song: Song.Song, file: str) -> bool:
+        """
+        Saves a copy of the tags of the given song before they get edited in place, if a backup directory is defined.
+        :param song: An object representing the song to back up.
+        :type song: Song.Song
+        :param file: A string containing the path to the song file relative to the source directory.
+        :type file: str
+        :return: If the backup has been saved, or no backup is needed, will be returned "True".
+        :rtype: bool
+        """
+        backup_directory: Optional[str] = Config.Config.get_tag_backup()
+        if not backup_directory:
+            return True
+        try:
+            song.get_tag_helper().backup(backup_directory + '/' + file + '.json')
+        except (OSError, ValueError) as ex:
+            Logger.Logger.log_error(str(ex))
+            Logger.Logger.log_error('Unable to back up tags for file: ' + file)
+            return False
+        return True
+
+    @staticmethod
+    def __generate_tmp_path(file: str, extension: str) -> str:
+        """
+        Generates a random and unique path for the temporary file where a song is processed.
+        :param file: A string containing the path to the song file relative to the source directory.
+        :type file: str
+        :param extension: A string containing the extension of the temporary file without the leading dot.
+        :type extension: str
+        :return: A string containing the path to the temporary file.
+        :rtype: str
+        """
+        time: int = datetime.now().microsecond
+        tmp_path: str = tempfile.gettempdir() + md5(file.encode('utf-8') + str(time).encode('utf-8')).hexdigest()
+        return tmp_path + '.' + extension
+
+    @staticmethod
+    def __analyze(song: Song.Song) -> None:
+        """
+        Measures the loudness of the given song, if required and not already done while converting it.
+        :param song: An object representing the song to analyze.
+        :type song: Song.Song
+        """
+        if not Config.Config.get_replaygain() or song.get_loudness() is not None:
+            return
+        start: float = time.monotonic()
+        try:
+            Converter.Converter(song).analyze()
+        except RuntimeError as ex:
+            Logger.Logger.log_error(str(ex))
+        Tracer.Tracer.record('analyze', start)
+
+    def __add_to_album(self, song: Song.Song, paths: List[str]) -> None:
+        """
+        Adds the loudness measured for the given song to the one of its album, album gain is written once scan ends.
+        :param song: An object representing the analyzed song.
+        :type song: Song.Song
+        :param paths: A list containing the paths to the files generated for the song.
+        :type paths: List[str]
+        """
+        loudness: Optional[LoudnessAnalyzer.LoudnessAnalyzer] = song.get_loudness()
+        if loudness is None or song.get_collection_id() is None:
+            return
+        album: Optional[Dict[str, Any]] = self.albums.get(song.get_collection_id())
+        if album is None:
+            self.albums[song.get_collection_id()] = {'loudness': loudness, 'paths': list(paths)}
+            return
+        album['loudness'].add(loudness)
+        album['paths'] += paths
+
+    def __save_album_gain(self) -> None:
+        """
+        Writes the album ReplayGain values into the files of each album that has been processed.
+        """
+        import mutagen
+        for album in self.albums.values():
+            gain: Optional[float] = album['loudness'].get_gain()
+            if gain is None:
+                continue
+            for path in album['paths']:
+                # Only the album values are written, there is no need to load the file tags.
+                song: Song.Song = Song.Song(None)
+                song.set_path(path, None, False)
+                song.set_album_gain(gain, album['loudness'].get_peak())
+                try:
+                    song.get_tag_helper().save_replaygain()
+                except (OSError, mutagen.MutagenError) as ex:
+                    Logger.Logger.log_error(str(ex))
+                    Logger.Logger.log_error('Unable to write album gain for file: ' + path)
+        self.albums = {}
+
+    def __is_single_pass(self) -> bool:
+        """
+        Returns if songs must be converted and tagged in a single pass once their information has been found.
+        :return: If the single pass mode is going to be used will be returned "True".
+        :rtype: bool
+        """
+        return Config.Config.get_single_pass() and Config.Config.get_format() is not None
+
+    def __process_song_single_pass(self, file: str) -> str:
+        """
+        Process a given file looking up its information first and then writing the converted and tagged file at once.
+        :param file: A string containing the path to the song file.
+        :type file: str
+        :return: A string containing the outcome, "matched" if song information has been found or "unmatched".
+        :rtype: str
+        """
+        convert_format: str = Config.Config.get_format()
+        # The source file is only read, its tags are used to look up song information.
+        song: Song.Song = Song.Song(self.source + '/' + file)
+        song.get_all_info()
+        if song.is_found():
+            tmp_path: str = FileScanner.__generate_tmp_path(file, Converter.Converter.get_extension(convert_format))
+            # Generate the converted file having song properties and cover already embedded.
+            song.convert(convert_format, tmp_path)
+            # Loudness is only known once the file has been converted, some properties cannot be written by ffmpeg.
+            song.get_tag_helper().save_unmapped()
+            self.__add_to_album(song, [self.__move(song)])
+            if Config.Config.get_remove_original():
+                try:
+                    os.remove(self.source + '/' + file)
+                except OSError:
+                    pass
+        Logger.Logger.log('Complete processing for file: ' + file + '\n')
+        return 'matched' if song.is_found() else 'unmatched'
+
+    def __process_song_profiles(self, file: str) -> str:
+        """
+        Process a given file converting it into all the configured profiles, information is looked up only once.
+        :param file: A string containing the path to the song file.
+        :type file: str
+        :return: A string containing the outcome, "matched" if song information has been found or "unmatched".
+        :rtype: str
+        """
+        profiles: List[Dict[str, Any]] = Config.Config.get_profiles()
+        single_pass: bool = Config.Config.get_single_pass()
+        # The source file is only read, its tags are used to look up song information.
+        song: Song.Song = Song.Song(self.source + '/' + file)
+        song.get_all_info()
+        if song.is_found():
+            tmp_paths: List[str] = []
+            for i in range(0, len(profiles)):
+                extension: str = Converter.Converter.get_extension(profiles[i]['format'])
+                tmp_paths.append(FileScanner.__generate_tmp_path(file + '/' + str(i), extension))
+            Converter.Converter(song).convert_many(profiles, tmp_paths, single_pass)
+            paths: List[str] = []
+            for i in range(0, len(profiles)):
+                # Apply the same information to every generated file.
+                song.set_path(tmp_paths[i], self.source + '/' + file, False)
+                if not single_pass:
+                    song.save()
+                else:
+                    song.get_tag_helper().save_unmapped()
+                paths.append(self.__move(song, profiles[i]['destination']))
+            self.__add_to_album(song, paths)
+            if Config.Config.get_remove_original():
+                try:
+                    os.remove(self.source + '/' + file)
+                except OSError:
+                    pass
+        Logger.Logger.log('Complete processing for file: ' + file + '\n')
+        return 'matched' if song.is_found() else 'unmatched'
+
+    def __process_song(self, file: str) -> str:
         """
         Process a given file converting it into a song object.
         :param file: A string containing the path to the song file.
         :type file: str
+        :return: A string containing the outcome, "matched", "unmatched", "skipped" if the file is already complete or
+        "failed" if its tags could not be backed up.
+        :rtype: str
         """
         Logger.Logger.log('Processing file: ' + file)
-        # Generate a random and unique name fo the temporary file copy.
-        time: int = datetime.now().microsecond
-        extension: str = os.path.splitext(file)[1].lower()
-        tmp_path: str = tempfile.gettempdir() + md5(file.encode('utf-8') + str(time).encode('utf-8')).hexdigest()
-        tmp_path = tmp_path + extension
-        # Create a copy of the original file where all edits will be made.
-        copyfile(self.source + '/' + file, tmp_path)
-        song: Song.Song = Song.Song(tmp_path, self.source + '/' + file)
+        if Config.Config.get_profiles():
+            return self.__process_song_profiles(file)
+        if self.__is_single_pass():
+            return self.__process_song_single_pass(file)
+        song: Optional[Song.Song] = None
+        if Config.Config.get_fill_missing() and not Config.Config.get_format() and not self.destination:
+            # Nothing would be looked up, converted nor copied, leave complete files as they are.
+            song = Song.Song(self.source + '/' + file)
+            if not song.get_missing_fields():
+                Logger.Logger.log('All the information is already embedded, skipping it...')
+                Logger.Logger.log('Complete processing for file: ' + file + '\n')
+                return 'skipped'
+        in_place: bool = self.__is_in_place()
+        tmp_path: str = self.source + '/' + file
+        if not in_place:
+            tmp_path = FileScanner.__generate_tmp_path(file, os.path.splitext(file)[1].lower()[1:])
+            start: float = time.monotonic()
+            # Create a copy of the original file where all edits will be made.
+            copyfile(self.source + '/' + file, tmp_path)
+            Tracer.Tracer.record('copy', start)
+        if song is None:
+            song = Song.Song(tmp_path, self.source + '/' + file)
+        elif not in_place:
+            # The song has already been read to check for missing information, keep it and move it onto the copy.
+            song.set_path(tmp_path, self.source + '/' + file, False)
         convert_format: Optional[str] = Config.Config.get_format()
         if convert_format:
             # Convert the song into the defined format before start precessing it.
@@ -142,21 +362,79 @@ class FileScanner:
         # Fetch song information from iTunes API.
         song.get_all_info()
         if song.is_found():
+            if in_place and not self.__backup_tags(song, file):
+                # Tags that could not be backed up are never overwritten.
+                Logger.Logger.log('Complete processing for file: ' + file + '\n')
+                return 'failed'
+            FileScanner.__analyze(song)
             # If information has been found save them.
             song.save()
-            self.__move(song)
-            if Config.Config.get_remove_original():
+            path: str = self.__move(song)
+            self.__add_to_album(song, [path])
+            if in_place:
+                # The source file has just been edited, refresh its index entry so that it stays valid.
+                LibraryIndex.LibraryIndex.store(path, song)
+            if Config.Config.get_remove_original() and not in_place:
                 try:
                     os.remove(self.source + '/' + file)
                 except OSError:
                     pass
             Logger.Logger.log('Complete processing for file: ' + file + '\n')
-            return
-        try:
-            os.remove(tmp_path)
-        except OSError:
-            pass
+            return 'matched'
+        if not in_place:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
         Logger.Logger.log('Complete processing for file: ' + file + '\n')
+        return 'unmatched'
+
+    def __scan(self) -> None:
+        """
+        Processes the file or the files contained within the source directory.
+        """
+        if not os.path.isdir(self.source):
+            # If a single file has been given instead of a whole directory, process it directly without looping.
+            directory: str = os.path.dirname(self.source)
+            filename: str = os.path.basename(self.source)
+            # Sets the directory where this file is contained as source directory, then process it.
+            self.source = directory
+            Logger.Logger.set_context({'file': filename})
+            start: float = time.monotonic()
+            result: str = self.__process_song(filename)
+            Metrics.Metrics.record('file', time.monotonic() - start, result)
+            Logger.Logger.clear_context()
+            return
+        Logger.Logger.log('Loading files in ' + Utils.Utils.str(self.source))
+        # Get the list of the files that are going to be processed.
+        recursive: bool = Config.Config.get_recursive()
+        file_list: Set[str] = self.__load_eligible_files(recursive)
+        if LibraryIndex.LibraryIndex.is_enabled():
+            # Drop index entries of the files that have been removed from the library since last scan.
+            paths: Set[str] = {self.source + '/' + file for file in file_list}
+            LibraryIndex.LibraryIndex.prune(self.source, paths, recursive)
+        if not file_list:
+            Logger.Logger.log('No eligible file found, exiting.')
+            return
+        if self.destination is not None:
+            # Check if the destination directory exists, otherwise create it.
+            if not os.path.exists(self.destination):
+                os.mkdir(self.destination)
+        for profile in Config.Config.get_profiles():
+            if profile['destination'] and not os.path.exists(profile['destination']):
+                os.makedirs(profile['destination'], 0o777, True)
+        if Config.Config.get_in_place() and not self.__is_in_place():
+            Logger.Logger.log('In-place mode cannot be used along with a destination or a format, copying files.')
+        Logger.Logger.log('Ready to process ' + str(len(file_list)) + ' files.')
+        Progress.Progress.start(len(file_list))
+        for file in file_list:
+            # Messages logged while processing the file carry its path.
+            Logger.Logger.set_context({'file': file})
+            start: float = time.monotonic()
+            result: str = self.__process_song(file)
+            Metrics.Metrics.record('file', time.monotonic() - start, result)
+            Progress.Progress.add_file(result)
+        Logger.Logger.clear_context()
 
     def __init__(self, directory: str = None):
         """
@@ -214,25 +492,18 @@ class FileScanner:
             self.destination = Config.Config.get_destination_directory()
         if self.source is None:
             raise ValueError('No source directory configured')
-        if not os.path.isdir(self.source):
-            # If a single file has been given instead of a whole directory, process it directly without looping.
-            directory: str = os.path.dirname(self.source)
-            filename: str = os.path.basename(self.source)
-            # Sets the directory where this file is contained as source directory, then process it.
-            self.source = directory
-            self.__process_song(filename)
-            return
-        Logger.Logger.log('Loading files in ' + Utils.Utils.str(self.source))
-        # Get the list of the files that are going to be processed.
-        recursive: bool = Config.Config.get_recursive()
-        file_list: Set[str] = self.__load_eligible_files(recursive)
-        if not file_list:
-            Logger.Logger.log('No eligible file found, exiting.')
-            return
-        if self.destination is not None:
-            # Check if the destination directory exists, otherwise create it.
-            if not os.path.exists(self.destination):
-                os.mkdir(self.destination)
-        Logger.Logger.log('Ready to process ' + str(len(file_list)) + ' files.')
-        for file in file_list:
-            self.__process_song(file)
+        self.albums = {}
+        Profiler.Profiler.start()
+        try:
+            self.__scan()
+            self.__save_album_gain()
+        finally:
+            LibraryIndex.LibraryIndex.close()
+            LyricsCache.LyricsCache.close()
+            HttpArchive.HttpArchive.close()
+            Metrics.Metrics.export()
+            Tracer.Tracer.close()
+            Profiler.Profiler.stop()
+            Progress.Progress.finish()
+            # Messages are written in background, make sure they are all out before returning.
+            Logger.Logger.flush()
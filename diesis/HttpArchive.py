@@ -0,0 +1,152 @@
+from typing import Optional, Tuple, Dict
+from diesis import Config
+import sqlite3
+import threading
+import zlib
+import time
+import os
+
+
+class HttpArchive:
+    SCHEMA_VERSION: int = 2
+    COMMIT_INTERVAL: int = 50
+    FILENAME: str = 'responses.sqlite'
+
+    __connection: Optional[sqlite3.Connection] = None
+    __lock: threading.Lock = threading.Lock()
+    __pending: int = 0
+    __sequences: Dict[Tuple[str, str], int] = {}
+
+    @staticmethod
+    def get_path(directory: str) -> str:
+        """
+        Returns the path to the archive stored in the given directory.
+        :param directory: A string containing the path to the directory the responses are recorded in.
+        :type directory: str
+        :return: A string containing the path to the archive file.
+        :rtype: str
+        """
+        return os.path.join(directory, HttpArchive.FILENAME)
+
+    @staticmethod
+    def __get_connection() -> Optional[sqlite3.Connection]:
+        """
+        Returns the connection to the archive, the archive is opened, and created when recording, on first use.
+        :return: The connection to the archive or None if neither recording nor replaying has been configured.
+        :rtype: Optional[sqlite3.Connection]
+        """
+        if HttpArchive.__connection is not None:
+            return HttpArchive.__connection
+        if Config.Config.get_replay():
+            # Replayed archives are never changed, so that runs can be repeated as many times as needed.
+            path: str = HttpArchive.get_path(Config.Config.get_replay())
+            connection: sqlite3.Connection = sqlite3.connect('file:' + path + '?mode=ro', uri=True,
+                                                             check_same_thread=False)
+            HttpArchive.__connection = connection
+            return connection
+        if not Config.Config.get_record():
+            return None
+        os.makedirs(Config.Config.get_record(), 0o777, True)
+        connection = sqlite3.connect(HttpArchive.get_path(Config.Config.get_record()), check_same_thread=False)
+        version: int = connection.execute('PRAGMA user_version').fetchone()[0]
+        if version != HttpArchive.SCHEMA_VERSION:
+            connection.execute('DROP TABLE IF EXISTS responses')
+        # Bodies are compressed, JSON results and HTML pages shrink to a fraction of their size.
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses (url TEXT NOT NULL, target TEXT NOT NULL, sequence INTEGER NOT NULL, '
+            'status INTEGER NOT NULL, body BLOB NOT NULL, recorded INTEGER NOT NULL, '
+            'PRIMARY KEY (url, target, sequence))'
+        )
+        connection.execute('PRAGMA user_version = ' + str(HttpArchive.SCHEMA_VERSION))
+        connection.commit()
+        HttpArchive.__connection = connection
+        return connection
+
+    @staticmethod
+    def is_recording() -> bool:
+        """
+        Returns if the responses received must be recorded.
+        :return: If a directory to record the responses in has been defined will be returned "True".
+        :rtype: bool
+        """
+        return Config.Config.get_record() is not None
+
+    @staticmethod
+    def is_replaying() -> bool:
+        """
+        Returns if the responses must be served from the archive instead of the network.
+        :return: If a directory to replay the responses from has been defined will be returned "True".
+        :rtype: bool
+        """
+        return Config.Config.get_replay() is not None
+
+    @staticmethod
+    def load(url: str, target: str) -> Optional[Tuple[int, bytes]]:
+        """
+        Returns the next response recorded for the given URL, the last one is returned again once all have been served.
+        :param url: A string containing the requested URL.
+        :type url: str
+        :param target: A string identifying the element the response has been truncated after, empty if it is whole.
+        :type target: str
+        :return: A tuple containing the HTTP status, 0 if the request failed without a response, and the body, or None.
+        :rtype: Optional[Tuple[int, bytes]]
+        """
+        connection: Optional[sqlite3.Connection] = HttpArchive.__get_connection()
+        if connection is None:
+            return None
+        with HttpArchive.__lock:
+            # The same URL may be requested more than once, such as the cover of an album, each request is replayed.
+            sequence: int = HttpArchive.__sequences.get((url, target), 0)
+            HttpArchive.__sequences[(url, target)] = sequence + 1
+            row: Optional[tuple] = connection.execute(
+                'SELECT status, body FROM responses WHERE url = ? AND target = ? AND sequence <= ? '
+                'ORDER BY sequence DESC LIMIT 1',
+                (url, target, sequence)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], zlib.decompress(row[1])
+
+    @staticmethod
+    def store(url: str, target: str, status: int, body: bytes) -> None:
+        """
+        Records the response received for the given URL, responses recorded by previous runs for it get replaced.
+        :param url: A string containing the requested URL.
+        :type url: str
+        :param target: A string identifying the element the response has been truncated after, empty if it is whole.
+        :type target: str
+        :param status: An integer number representing the HTTP status, 0 if the request failed without a response.
+        :type status: int
+        :param body: The response body, possibly truncated as it has been received.
+        :type body: bytes
+        """
+        connection: Optional[sqlite3.Connection] = HttpArchive.__get_connection()
+        if connection is None or not HttpArchive.is_recording():
+            return
+        with HttpArchive.__lock:
+            sequence: int = HttpArchive.__sequences.get((url, target), 0)
+            HttpArchive.__sequences[(url, target)] = sequence + 1
+            if sequence == 0:
+                connection.execute('DELETE FROM responses WHERE url = ? AND target = ?', (url, target))
+            connection.execute(
+                'INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (url, target, sequence, status, zlib.compress(body), int(time.time()))
+            )
+            HttpArchive.__pending += 1
+            if HttpArchive.__pending >= HttpArchive.COMMIT_INTERVAL:
+                connection.commit()
+                HttpArchive.__pending = 0
+
+    @staticmethod
+    def close() -> None:
+        """
+        Commits the recorded responses and closes the archive.
+        """
+        with HttpArchive.__lock:
+            if HttpArchive.__connection is None:
+                return
+            HttpArchive.__connection.commit()
+            HttpArchive.__connection.close()
+            HttpArchive.__connection = None
+            HttpArchive.__pending = 0
+            HttpArchive.__sequences = {}
@@ -0,0 +1,209 @@
+from typing import Optional, Any, Pattern, Dict, Tuple, List
+from diesis import Config, Logger, Tracer, Progress, HttpArchive
+import time
+import re
+
+
+class HttpClient:
+    CHUNK_SIZE: int = 16384
+    # Bytes already searched that are searched again once more arrive, in case a tag was split between two chunks.
+    OVERLAP: int = 1024
+
+    __hosts: Dict[str, str] = {}
+
+    @staticmethod
+    def set_host(host: str, address: Optional[str]) -> None:
+        """
+        Sends the requests for the given host to another address, such as a local server standing in for the service.
+        :param host: A string containing the host name, such as "itunes.apple.com".
+        :type host: str
+        :param address: A string containing the scheme, host and optional path prefix to use, None to remove it.
+        :type address: Optional[str]
+        """
+        if address is None:
+            HttpClient.__hosts.pop(host, None)
+            return
+        HttpClient.__hosts[host] = address.rstrip('/')
+
+    @staticmethod
+    def resolve(url: str) -> str:
+        """
+        Returns the URL the request must actually be sent to, according to the hosts that have been redirected.
+        :param url: A string containing the URL of the service.
+        :type url: str
+        :return: A string containing the URL to request.
+        :rtype: str
+        """
+        if not HttpClient.__hosts:
+            return url
+        for scheme in ['https://', 'http://']:
+            if url.startswith(scheme):
+                end: int = url.find('/', len(scheme))
+                host: str = url[len(scheme):end] if end >= 0 else url[len(scheme):]
+                address: Optional[str] = HttpClient.__hosts.get(host)
+                if address is not None:
+                    return address + (url[end:] if end >= 0 else '')
+        return url
+
+    @staticmethod
+    def __find_element_end(contents: bytearray, opening: Pattern, closing: Pattern, state: List[int]) -> int:
+        """
+        Looks for the end of the first element matching the given opening tag pattern, nested elements are skipped.
+        :param contents: The bytes received so far.
+        :type contents: bytearray
+        :param opening: A compiled pattern matching the opening tag of the element to find.
+        :type opening: Pattern
+        :param closing: A compiled pattern matching both opening and closing tags having the same name.
+        :type closing: Pattern
+        :param state: A list containing whether the opening tag has been found, the nesting depth and the offset to
+        search from, as left by the previous call for the same response, it is updated.
+        :type state: List[int]
+        :return: The offset right after the element closing tag or -1 if the element has not been fully received yet.
+        :rtype: int
+        """
+        if not state[0]:
+            match: Any = opening.search(contents, state[2])
+            if match is None:
+                state[2] = max(0, len(contents) - HttpClient.OVERLAP)
+                return -1
+            state[0] = 1
+            state[2] = match.start()
+        for tag in closing.finditer(contents, state[2]):
+            state[1] += -1 if tag.group(1) else 1
+            if state[1] == 0:
+                return tag.end()
+            state[2] = tag.end()
+        # Tags already counted end before the offset, so none of them is counted twice.
+        state[2] = max(state[2], len(contents) - HttpClient.OVERLAP)
+        return -1
+
+    @staticmethod
+    def __replay(url: str, target: str, start: float) -> Optional[bytes]:
+        """
+        Returns the response recorded for the given URL instead of sending the request.
+        :param url: A string containing the requested URL.
+        :type url: str
+        :param target: A string identifying the element the response is truncated after, empty if it is whole.
+        :type target: str
+        :param start: A floating point number representing the monotonic time the request started at.
+        :type start: float
+        :return: The recorded response body or None if the recorded request failed or no response has been recorded.
+        :rtype: Optional[bytes]
+        """
+        recorded: Optional[Tuple[int, bytes]] = HttpArchive.HttpArchive.load(url, target)
+        if recorded is not None and 200 <= recorded[0] < 300:
+            Tracer.Tracer.record('http_request', start, {
+                'url': url, 'bytes': len(recorded[1]), 'replayed': True
+            }, 'http')
+            return recorded[1]
+        if recorded is None:
+            error: str = 'No response recorded for this URL.'
+        elif recorded[0] > 0:
+            error = 'HTTP Error ' + str(recorded[0]) + ' (recorded)'
+        else:
+            error = 'The request failed when it was recorded.'
+        Tracer.Tracer.record('http_request', start, {'url': url, 'error': error, 'replayed': True}, 'http')
+        Logger.Logger.log_error(error)
+        Logger.Logger.log_error('Request failed for URL: ' + url)
+        return None
+
+    @staticmethod
+    def __request(url: str, service: str, timeout: Optional[int], opening: Optional[Pattern] = None,
+                  closing: Optional[Pattern] = None) -> Optional[bytes]:
+        """
+        Sends a GET request, or replays the recorded one, and returns the response body.
+        :param url: A string containing the URL to request.
+        :type url: str
+        :param service: A string containing the name of the service the request is counted for, such as "itunes".
+        :type service: str
+        :param timeout: An integer number representing the timeout in seconds, if None, the default one is used.
+        :type timeout: Optional[int]
+        :param opening: A compiled pattern matching the opening tag of the element the download stops after, if any.
+        :type opening: Optional[Pattern]
+        :param closing: A compiled pattern matching both opening and closing tags having the same name.
+        :type closing: Optional[Pattern]
+        :return: The response body, possibly truncated, or None if the request fails.
+        :rtype: Optional[bytes]
+        """
+        start: float = time.monotonic()
+        # Responses truncated after different elements are recorded separately.
+        target: str = opening.pattern.decode('latin-1') if opening is not None else ''
+        if HttpArchive.HttpArchive.is_replaying():
+            # Replayed runs never touch the network.
+            return HttpClient.__replay(url, target, start)
+        # urllib.request pulls in the whole HTTP and e-mail stack, import it only once a request is sent.
+        from urllib import request
+        Progress.Progress.add_request(service)
+        try:
+            req = request.Request(HttpClient.resolve(url), headers={
+                'User-Agent': Config.Config.get_user_agent()
+            })
+            # Chunks are appended in place and only the bytes just received are searched.
+            contents: bytearray = bytearray()
+            state: List[int] = [0, 0, 0]
+            response: Any = request.urlopen(req) if timeout is None else request.urlopen(req, timeout=timeout)
+            with response:
+                chunk: bytes = response.read(HttpClient.CHUNK_SIZE)
+                while chunk:
+                    contents += chunk
+                    if opening is not None:
+                        end: int = HttpClient.__find_element_end(contents, opening, closing, state)
+                        if end >= 0:
+                            # The rest of the page is not needed, stop downloading it.
+                            del contents[end:]
+                            break
+                    chunk = response.read(HttpClient.CHUNK_SIZE)
+        except OSError as ex:
+            # Failures are recorded as well, so that replayed runs take the same path.
+            HttpArchive.HttpArchive.store(url, target, getattr(ex, 'code', 0) or 0, b'')
+            Tracer.Tracer.record('http_request', start, {'url': url, 'error': str(ex)}, 'http')
+            Logger.Logger.log_error(str(ex))
+            Logger.Logger.log_error('Request failed for URL: ' + url)
+            return None
+        body: bytes = bytes(contents)
+        HttpArchive.HttpArchive.store(url, target, response.status, body)
+        Tracer.Tracer.record('http_request', start, {'url': url, 'bytes': len(body)}, 'http')
+        return body
+
+    @staticmethod
+    def get(url: str, service: str, timeout: Optional[int] = None) -> Optional[bytes]:
+        """
+        Loads the whole resource at the given URL, such as an API response or a picture.
+        :param url: A string containing the URL of the resource.
+        :type url: str
+        :param service: A string containing the name of the service the request is counted for, such as "itunes".
+        :type service: str
+        :param timeout: An integer number representing the timeout in seconds, if None, the default one is used.
+        :type timeout: Optional[int]
+        :return: The response body or None if the request fails.
+        :rtype: Optional[bytes]
+        """
+        return HttpClient.__request(url, service, timeout)
+
+    @staticmethod
+    def fetch(url: str, tag: Optional[str] = None, class_name: Optional[str] = None) -> Optional[str]:
+        """
+        Loads the page at the given URL, the download stops as soon as the element containing the needed data ends.
+        :param url: A string containing the URL of the page to load.
+        :type url: str
+        :param tag: A string containing the name of the element that contains the needed data, if any.
+        :type tag: Optional[str]
+        :param class_name: A string containing one of the CSS classes of such element.
+        :type class_name: Optional[str]
+        :return: A string containing the page contents, possibly truncated, or None if the request fails.
+        :rtype: Optional[str]
+        """
+        opening: Optional[Pattern] = None
+        closing: Optional[Pattern] = None
+        if tag is not None and class_name is not None:
+            name: bytes = re.escape(tag.encode('ascii'))
+            opening = re.compile(
+                b'<' + name + br'\s[^>]*class=["\'][^"\']*\b' + re.escape(class_name.encode('ascii')) + br'\b', re.I
+            )
+            closing = re.compile(b'<(/?)' + name + br'[\s>]', re.I)
+        contents: Optional[bytes] = HttpClient.__request(
+            url, 'lyrics', Config.Config.get_lyrics_timeout(), opening, closing
+        )
+        if contents is None:
+            return None
+        return contents.decode('utf-8', 'replace')
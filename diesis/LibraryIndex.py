@@ -0,0 +1,155 @@
+from typing import Optional, Dict, Any, List, Set
+from diesis import Config, Logger
+import sqlite3
+import threading
+import os
+
+
+class LibraryIndex:
+    SCHEMA_VERSION: int = 2
+    COMMIT_INTERVAL: int = 100
+    FIELDS: List[str] = [
+        'title', 'artist', 'album_artist', 'album', 'year', 'genre', 'track_number', 'lyrics_embedded', 'cover_embedded'
+    ]
+
+    __connection: Optional[sqlite3.Connection] = None
+    __lock: threading.Lock = threading.Lock()
+    __pending: int = 0
+
+    @staticmethod
+    def __get_connection() -> Optional[sqlite3.Connection]:
+        """
+        Returns the connection to the index database, the database is opened and set up on first use.
+        :return: The connection to the database or None if no index file has been configured.
+        :rtype: Optional[sqlite3.Connection]
+        """
+        if LibraryIndex.__connection is not None:
+            return LibraryIndex.__connection
+        path: Optional[str] = Config.Config.get_index_file()
+        if not path:
+            return None
+        connection: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        version: int = connection.execute('PRAGMA user_version').fetchone()[0]
+        if version != LibraryIndex.SCHEMA_VERSION:
+            # The index contains nothing but cached data, drop it whenever its layout changes.
+            connection.execute('DROP TABLE IF EXISTS files')
+        columns: str = ', '.join(LibraryIndex.FIELDS)
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL, '
+            'mtime INTEGER NOT NULL, format TEXT, duration REAL, ' + columns + ')'
+        )
+        connection.execute('PRAGMA user_version = ' + str(LibraryIndex.SCHEMA_VERSION))
+        connection.commit()
+        LibraryIndex.__connection = connection
+        return connection
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """
+        Returns if the library index has been configured.
+        :return: If an index file has been defined will be returned "True".
+        :rtype: bool
+        """
+        return Config.Config.get_index_file() is not None
+
+    @staticmethod
+    def get(path: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the indexed information of the given file, provided that the file has not changed since it was indexed.
+        :param path: A string containing the path to the audio file.
+        :type path: str
+        :return: A dictionary containing the indexed columns or None if the file is not indexed or it has changed.
+        :rtype: Optional[Dict[str, Any]]
+        """
+        connection: Optional[sqlite3.Connection] = LibraryIndex.__get_connection()
+        if connection is None:
+            return None
+        path = os.path.abspath(path)
+        try:
+            stat: os.stat_result = os.stat(path)
+        except OSError:
+            return None
+        with LibraryIndex.__lock:
+            cursor: sqlite3.Cursor = connection.execute('SELECT * FROM files WHERE path = ?', (path,))
+            row: Optional[tuple] = cursor.fetchone()
+            if row is None:
+                return None
+            entry: Dict[str, Any] = dict(zip([column[0] for column in cursor.description], row))
+        # Size and modification time are enough to tell if the file has been edited since last scan.
+        if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime_ns:
+            return None
+        return entry
+
+    @staticmethod
+    def store(path: str, song: Any) -> None:
+        """
+        Adds or refreshes the index entry for the given file using the information loaded in the given song.
+        :param path: A string containing the path to the audio file.
+        :type path: str
+        :param song: An instance of the class "Song" representing the audio file.
+        :type song: Song
+        """
+        connection: Optional[sqlite3.Connection] = LibraryIndex.__get_connection()
+        if connection is None:
+            return
+        path = os.path.abspath(path)
+        try:
+            stat: os.stat_result = os.stat(path)
+        except OSError as ex:
+            Logger.Logger.log_error(str(ex))
+            return
+        values: List[Any] = [path, stat.st_size, stat.st_mtime_ns, song.get_extension(), song.get_duration()]
+        for field in LibraryIndex.FIELDS:
+            values.append(getattr(song, 'get_' + field)())
+        placeholders: str = ', '.join(['?'] * len(values))
+        with LibraryIndex.__lock:
+            connection.execute('INSERT OR REPLACE INTO files VALUES (' + placeholders + ')', values)
+            LibraryIndex.__pending += 1
+            # Commit in batches, committing every single entry would make the first scan painfully slow.
+            if LibraryIndex.__pending >= LibraryIndex.COMMIT_INTERVAL:
+                connection.commit()
+                LibraryIndex.__pending = 0
+
+    @staticmethod
+    def prune(directory: str, paths: Set[str], recursive: bool) -> None:
+        """
+        Removes the entries of the files contained in the given directory that are no longer part of the library.
+        :param directory: A string containing the path to the scanned directory.
+        :type directory: str
+        :param paths: A set containing the paths of all the files found in the directory.
+        :type paths: Set[str]
+        :param recursive: If set to "True" entries contained in sub-directories will be considered as well.
+        :type recursive: bool
+        """
+        connection: Optional[sqlite3.Connection] = LibraryIndex.__get_connection()
+        if connection is None:
+            return
+        prefix: str = os.path.abspath(directory) + '/'
+        paths = {os.path.abspath(path) for path in paths}
+        with LibraryIndex.__lock:
+            cursor: sqlite3.Cursor = connection.execute(
+                'SELECT path FROM files WHERE substr(path, 1, ?) = ?', (len(prefix), prefix)
+            )
+            removed: List[tuple] = []
+            for row in cursor.fetchall():
+                if not recursive and '/' in row[0][len(prefix):]:
+                    # Sub-directories have not been scanned, their entries are still valid.
+                    continue
+                if row[0] not in paths:
+                    removed.append((row[0],))
+            if removed:
+                connection.executemany('DELETE FROM files WHERE path = ?', removed)
+                connection.commit()
+
+    @staticmethod
+    def close() -> None:
+        """
+        Commits pending changes and closes the connection to the index database.
+        """
+        with LibraryIndex.__lock:
+            if LibraryIndex.__connection is None:
+                return
+            LibraryIndex.__connection.commit()
+            LibraryIndex.__connection.close()
+            LibraryIndex.__connection = None
+            LibraryIndex.__pending = 0
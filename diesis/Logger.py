@@ -1,10 +1,164 @@
 from diesis import Config
-from typing import Optional
+from typing import Optional, Any, Dict, Tuple
 from datetime import datetime
+import threading
+import atexit
+import queue
+import json
+import time
+import sys
 
 
 class Logger:
+    # Seconds after which buffered lines are written to the log file even if messages keep coming.
+    FLUSH_INTERVAL: float = 1.0
+
     __log_fp = None
+    __log_failed: bool = False
+    __queue: Optional[queue.Queue] = None
+    __thread: Optional[threading.Thread] = None
+    __lock: threading.Lock = threading.Lock()
+    __context: threading.local = threading.local()
+
+    @staticmethod
+    def __start() -> queue.Queue:
+        """
+        Starts the background thread that writes the messages, messages are only queued by the calling threads.
+        :return: The queue the messages must be added to.
+        :rtype: queue.Queue
+        """
+        with Logger.__lock:
+            if Logger.__queue is None:
+                Logger.__queue = queue.Queue()
+                Logger.__thread = threading.Thread(target=Logger.__run, args=(Logger.__queue,), daemon=True)
+                Logger.__thread.start()
+                # Make sure that queued messages are written before the application exits.
+                atexit.register(Logger.close)
+            return Logger.__queue
+
+    @staticmethod
+    def __format(record: Tuple[str, float, str, Dict[str, Any]]) -> str:
+        """
+        Generates the line representing the given message in the log file.
+        :param record: A tuple containing level, time, text and context fields of the message.
+        :type record: Tuple[str, float, str, Dict[str, Any]]
+        :return: A string containing the line to write without the trailing new line.
+        :rtype: str
+        """
+        level, timestamp, message, context = record
+        if Config.Config.get_log_format() == 'json':
+            entry: Dict[str, Any] = {'time': datetime.fromtimestamp(timestamp).isoformat(), 'level': level}
+            entry.update(context)
+            entry['message'] = message
+            return json.dumps(entry, ensure_ascii=False)
+        date: str = time.strftime('%Y/%m/%d - %H:%M:%S', time.localtime(timestamp))
+        return '[' + date + ']: ' + message
+
+    @staticmethod
+    def __write(record: Tuple[str, float, str, Dict[str, Any]]) -> None:
+        """
+        Displays the given message and writes it to the log file, if any, lines are flushed periodically.
+        :param record: A tuple containing level, time, text and context fields of the message.
+        :type record: Tuple[str, float, str, Dict[str, Any]]
+        """
+        if Config.Config.is_verbose():
+            # Error messages are yellow colored.
+            print(record[2] if record[0] == 'info' else '\033[93m' + record[2] + '\033[0m')
+        log_file: Optional[str] = Config.Config.get_log_file()
+        if not log_file:
+            return
+        if not Logger.__log_fp and not Logger.__log_failed:
+            try:
+                # Open the log file if no file pointer has been found.
+                Logger.__log_fp = open(log_file, 'a', encoding='utf-8')
+            except OSError as ex:
+                # Report the problem once, then keep showing the messages on the console.
+                Logger.__log_failed = True
+                sys.stderr.write('Unable to open log file, messages are shown on the console: ' + str(ex) + '\n')
+        if Logger.__log_fp:
+            Logger.__log_fp.write(Logger.__format(record) + '\n')
+        elif not Config.Config.is_verbose():
+            print(record[2])
+
+    @staticmethod
+    def __report(error: Exception) -> None:
+        """
+        Reports a message that could not be written, the report itself may fail as well on a broken console.
+        :param error: The exception raised while writing the message.
+        :type error: Exception
+        """
+        try:
+            sys.stderr.write('Unable to write log message: ' + str(error) + '\n')
+        except Exception:
+            pass
+
+    @staticmethod
+    def __run(messages: queue.Queue) -> None:
+        """
+        Writes the queued messages until the logger gets closed.
+        :param messages: The queue containing the messages to write, "None" stops the thread.
+        :type messages: queue.Queue
+        """
+        flushed: float = time.monotonic()
+        while True:
+            try:
+                record: Optional[Tuple[str, float, str, Dict[str, Any]]] = messages.get(True, Logger.FLUSH_INTERVAL)
+            except queue.Empty:
+                record = None
+            else:
+                if record is None:
+                    messages.task_done()
+                    return
+            try:
+                if record is not None:
+                    Logger.__write(record)
+                # Flush once the burst is over or at regular intervals, a crash loses one interval at most.
+                if Logger.__log_fp and (messages.empty() or time.monotonic() - flushed >= Logger.FLUSH_INTERVAL):
+                    Logger.__log_fp.flush()
+                    flushed = time.monotonic()
+            except Exception as ex:
+                # The thread must survive any message, otherwise "flush" would wait for the queue forever.
+                Logger.__report(ex)
+            finally:
+                if record is not None:
+                    messages.task_done()
+
+    @staticmethod
+    def __enqueue(level: str, message: str) -> None:
+        """
+        Queues the given message along with the context fields of the calling thread.
+        :param level: A string containing the message level, "info" or "error".
+        :type level: str
+        :param message: A string containing the message.
+        :type message: str
+        """
+        messages: queue.Queue = Logger.__queue or Logger.__start()
+        messages.put((level, time.time(), message, getattr(Logger.__context, 'fields', {})))
+
+    @staticmethod
+    def set_context(fields: Dict[str, Any]) -> None:
+        """
+        Sets the fields added to the messages logged by the calling thread, such as the file being processed.
+        :param fields: A dictionary containing the field names and values, they are included in JSON lines only.
+        :type fields: Dict[str, Any]
+        """
+        Logger.__context.fields = dict(fields)
+
+    @staticmethod
+    def get_context() -> Dict[str, Any]:
+        """
+        Returns the fields added to the messages logged by the calling thread.
+        :return: A dictionary containing the field names and values.
+        :rtype: Dict[str, Any]
+        """
+        return getattr(Logger.__context, 'fields', {})
+
+    @staticmethod
+    def clear_context() -> None:
+        """
+        Removes the fields added to the messages logged by the calling thread.
+        """
+        Logger.__context.fields = {}
 
     @staticmethod
     def log(message: str) -> None:
@@ -13,17 +167,8 @@ class Logger:
         :param message: A string containing the message to show.
         :type message: str
         """
-        if message and Config.Config.is_verbose():
-            print(message)
-        log_file: Optional[str] = Config.Config.get_log_file()
-        if message and log_file:
-            if not Logger.__log_fp:
-                # Open the log file if no file pointer has been found.
-                Logger.__log_fp = open(log_file, 'a')
-            date: str = datetime.today().strftime('%Y/%m/%d - %H:%M:%S')
-            message = '[' + date + ']: ' + message + '\n'
-            # Write log message to file including current date.
-            Logger.__log_fp.write(message)
+        if message:
+            Logger.__enqueue('info', message)
 
     @staticmethod
     def log_error(message: str) -> None:
@@ -32,5 +177,33 @@ class Logger:
         :param message: A string containing the error message to show.
         :type message: str
         """
-        if message and Config.Config.is_verbose():
-            print('\033[93m' + message + '\033[0m')
+        if message:
+            Logger.__enqueue('error', message)
+
+    @staticmethod
+    def flush() -> None:
+        """
+        Waits until all the queued messages have been displayed and written to the log file.
+        """
+        messages: Optional[queue.Queue] = Logger.__queue
+        if messages is not None:
+            messages.join()
+
+    @staticmethod
+    def close() -> None:
+        """
+        Writes the queued messages, then stops the background thread and closes the log file.
+        """
+        with Logger.__lock:
+            messages: Optional[queue.Queue] = Logger.__queue
+            thread: Optional[threading.Thread] = Logger.__thread
+            Logger.__queue = None
+            Logger.__thread = None
+        if messages is None:
+            return
+        messages.put(None)
+        thread.join()
+        if Logger.__log_fp:
+            Logger.__log_fp.close()
+            Logger.__log_fp = None
+        Logger.__log_failed = False
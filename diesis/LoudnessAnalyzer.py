@@ -0,0 +1,207 @@
+from typing import Optional, List, Any
+import importlib.util
+import math
+
+# NumPy takes longer to import than the whole application, it is loaded along with the first analyzer.
+numpy: Any = None
+
+
+class LoudnessAnalyzer:
+    REFERENCE_LOUDNESS: float = -18.0
+    ABSOLUTE_GATE: float = -70.0
+    RELATIVE_GATE: float = -10.0
+    HISTOGRAM_MAX: float = 10.0
+    HISTOGRAM_STEP: float = 0.1
+    # Channel weights defined by ITU-R BS.1770 for the common 5.1 layout, LFE is ignored.
+    SURROUND_WEIGHTS: List[float] = [1.0, 1.0, 1.0, 0.0, 1.41, 1.41]
+
+    sample_rate: int = None
+    channels: int = None
+    peak: float = 0.0
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Checks if the loudness analysis can be performed, it requires NumPy to be installed.
+        :return: If NumPy is available will be returned "True".
+        :rtype: bool
+        """
+        return numpy is not None or importlib.util.find_spec('numpy') is not None
+
+    @staticmethod
+    def __get_response(sample_rate: int, size: int) -> Any:
+        """
+        Computes the squared magnitude of the K-weighting filter response for each bin of a real FFT.
+        :param sample_rate: An integer number representing the sample rate in Hz.
+        :type sample_rate: int
+        :param size: An integer number representing the number of samples transformed at once.
+        :type size: int
+        :return: A NumPy array containing the squared magnitude for each frequency bin.
+        :rtype: Any
+        """
+        # Pre-filter (high shelf) coefficients, computed for any sample rate as done by libebur128.
+        k: float = math.tan(math.pi * 1681.974450955533 / sample_rate)
+        q: float = 0.7071752369554196
+        vh: float = math.pow(10.0, 3.999843853973347 / 20.0)
+        vb: float = math.pow(vh, 0.4996667741545416)
+        a0: float = 1.0 + k / q + k * k
+        shelf_b: List[float] = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+        shelf_a: List[float] = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+        # RLB (high pass) filter coefficients.
+        k = math.tan(math.pi * 38.13547087602444 / sample_rate)
+        q = 0.5003270373238773
+        a0 = 1.0 + k / q + k * k
+        pass_b: List[float] = [1.0, -2.0, 1.0]
+        pass_a: List[float] = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+        z: Any = numpy.exp(-1j * 2.0 * numpy.pi * numpy.fft.rfftfreq(size))
+        response: Any = numpy.ones(len(z), dtype=complex)
+        for b, a in [(shelf_b, shelf_a), (pass_b, pass_a)]:
+            response *= (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+        return numpy.abs(response) ** 2
+
+    @staticmethod
+    def compute_loudness(counts: Any, energy: Any) -> Optional[float]:
+        """
+        Computes the gated integrated loudness from a histogram of block loudness values.
+        :param counts: A NumPy array containing the number of blocks falling in each histogram bin.
+        :type counts: Any
+        :param energy: A NumPy array containing the sum of the mean square values of the blocks in each bin.
+        :type energy: Any
+        :return: A floating point number representing the loudness in LUFS or None if the audio is silent.
+        :rtype: Optional[float]
+        """
+        total: float = float(counts.sum())
+        if total == 0:
+            return None
+        gate: float = -0.691 + 10.0 * math.log10(float(energy.sum()) / total) + LoudnessAnalyzer.RELATIVE_GATE
+        start: int = max(0, int(math.ceil((gate - LoudnessAnalyzer.ABSOLUTE_GATE) / LoudnessAnalyzer.HISTOGRAM_STEP)))
+        gated: float = float(counts[start:].sum())
+        if gated == 0:
+            return None
+        return -0.691 + 10.0 * math.log10(float(energy[start:].sum()) / gated)
+
+    def __init__(self, sample_rate: int, channels: int):
+        """
+        The class constructor.
+        :param sample_rate: An integer number representing the sample rate of the audio to analyze in Hz.
+        :type sample_rate: int
+        :param channels: An integer number representing the number of interleaved channels.
+        :type channels: int
+        :raise RuntimeError: If NumPy is not installed.
+        """
+        global numpy
+        if numpy is None:
+            try:
+                import numpy
+            except ImportError:
+                raise RuntimeError('NumPy is required to analyze loudness.')
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.peak = 0.0
+        # Audio is processed in 100 ms sub-blocks, four of them make a 400 ms gating block.
+        self.__size: int = int(round(sample_rate * 0.1))
+        self.__pending: bytes = b''
+        self.__buffer: Any = numpy.zeros((0, channels), dtype=numpy.float32)
+        self.__previous: Any = numpy.zeros(0)
+        weights: List[float] = [1.0] * channels
+        if channels == len(LoudnessAnalyzer.SURROUND_WEIGHTS):
+            weights = LoudnessAnalyzer.SURROUND_WEIGHTS
+        self.__weights: Any = numpy.array(weights)
+        # Parseval's theorem on a real FFT: inner bins stand for both positive and negative frequencies.
+        parseval: Any = numpy.full(self.__size // 2 + 1, 2.0)
+        parseval[0] = 1.0
+        if self.__size % 2 == 0:
+            parseval[-1] = 1.0
+        self.__response: Any = LoudnessAnalyzer.__get_response(sample_rate, self.__size) * parseval
+        span: float = LoudnessAnalyzer.HISTOGRAM_MAX - LoudnessAnalyzer.ABSOLUTE_GATE
+        bins: int = int(round(span / LoudnessAnalyzer.HISTOGRAM_STEP))
+        self.counts: Any = numpy.zeros(bins)
+        self.energy: Any = numpy.zeros(bins)
+
+    def __add_blocks(self, blocks: Any) -> None:
+        """
+        Adds the mean square values of some gating blocks to the loudness histogram, silent blocks are discarded.
+        :param blocks: A NumPy array containing the channel weighted mean square value of each block.
+        :type blocks: Any
+        """
+        blocks = blocks[blocks > 0]
+        loudness: Any = -0.691 + 10.0 * numpy.log10(blocks)
+        audible: Any = loudness > LoudnessAnalyzer.ABSOLUTE_GATE
+        indexes: Any = ((loudness[audible] - LoudnessAnalyzer.ABSOLUTE_GATE) / LoudnessAnalyzer.HISTOGRAM_STEP)
+        indexes = numpy.clip(indexes.astype(int), 0, len(self.counts) - 1)
+        numpy.add.at(self.counts, indexes, 1)
+        numpy.add.at(self.energy, indexes, blocks[audible])
+
+    def feed(self, data: bytes) -> None:
+        """
+        Analyzes a chunk of decoded audio.
+        :param data: Interleaved 32 bit float little endian samples, chunks don't need to be aligned to frames.
+        :type data: bytes
+        """
+        data = self.__pending + data
+        usable: int = len(data) - len(data) % (4 * self.channels)
+        self.__pending = data[usable:]
+        samples: Any = numpy.frombuffer(data[:usable], dtype='<f4').reshape(-1, self.channels)
+        if len(samples) == 0:
+            return
+        self.peak = max(self.peak, float(numpy.max(numpy.abs(samples))))
+        self.__buffer = numpy.concatenate((self.__buffer, samples))
+        count: int = len(self.__buffer) // self.__size
+        if count == 0:
+            return
+        sub_blocks: Any = self.__buffer[:count * self.__size].reshape(count, self.__size, self.channels)
+        self.__buffer = self.__buffer[count * self.__size:]
+        # K-weighting is applied in the frequency domain, the filtered mean square is taken from the spectrum.
+        spectrum: Any = numpy.abs(numpy.fft.rfft(sub_blocks, axis=1)) ** 2
+        mean_square: Any = (spectrum * self.__response[None, :, None]).sum(axis=1) / (self.__size * self.__size)
+        series: Any = numpy.concatenate((self.__previous, mean_square.dot(self.__weights)))
+        if len(series) >= 4:
+            # Gating blocks are 400 ms long and overlap by 75%.
+            self.__add_blocks(numpy.convolve(series, numpy.ones(4) / 4.0, mode='valid'))
+        self.__previous = series[-3:]
+
+    def finish(self) -> None:
+        """
+        Releases the buffers used during the analysis, only the histogram and the peak are kept.
+        """
+        self.__pending = b''
+        self.__buffer = None
+        self.__previous = None
+        self.__response = None
+
+    def add(self, analyzer: 'LoudnessAnalyzer') -> None:
+        """
+        Merges the results of another analysis into this one, used to compute the loudness of a whole album.
+        :param analyzer: An instance of this class containing the results to merge.
+        :type analyzer: LoudnessAnalyzer
+        """
+        self.counts = self.counts + analyzer.counts
+        self.energy = self.energy + analyzer.energy
+        self.peak = max(self.peak, analyzer.peak)
+
+    def get_loudness(self) -> Optional[float]:
+        """
+        Returns the integrated loudness of the analyzed audio.
+        :return: A floating point number representing the loudness in LUFS or None if the audio is silent.
+        :rtype: Optional[float]
+        """
+        return LoudnessAnalyzer.compute_loudness(self.counts, self.energy)
+
+    def get_gain(self) -> Optional[float]:
+        """
+        Returns the ReplayGain 2.0 gain, that is the difference between the reference level and the loudness.
+        :return: A floating point number representing the gain in dB or None if the audio is silent.
+        :rtype: Optional[float]
+        """
+        loudness: Optional[float] = self.get_loudness()
+        if loudness is None:
+            return None
+        return LoudnessAnalyzer.REFERENCE_LOUDNESS - loudness
+
+    def get_peak(self) -> float:
+        """
+        Returns the highest absolute sample value found.
+        :return: A floating point number representing the peak where 1.0 means full scale.
+        :rtype: float
+        """
+        return self.peak
@@ -0,0 +1,132 @@
+from typing import Optional, Tuple
+from diesis import Config, Utils
+import sqlite3
+import threading
+import time
+
+
+class LyricsCache:
+    SCHEMA_VERSION: int = 1
+    COMMIT_INTERVAL: int = 100
+
+    __connection: Optional[sqlite3.Connection] = None
+    __lock: threading.Lock = threading.Lock()
+    __pending: int = 0
+
+    @staticmethod
+    def __get_connection() -> Optional[sqlite3.Connection]:
+        """
+        Returns the connection to the lyrics database, the database is opened and set up on first use.
+        :return: The connection to the database or None if no lyrics cache file has been configured.
+        :rtype: Optional[sqlite3.Connection]
+        """
+        if LyricsCache.__connection is not None:
+            return LyricsCache.__connection
+        path: Optional[str] = Config.Config.get_lyrics_cache()
+        if not path:
+            return None
+        connection: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        version: int = connection.execute('PRAGMA user_version').fetchone()[0]
+        if version != LyricsCache.SCHEMA_VERSION:
+            connection.execute('DROP TABLE IF EXISTS lyrics')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS lyrics (artist TEXT NOT NULL, title TEXT NOT NULL, lyrics TEXT NOT NULL, '
+            'lyrics_writer TEXT, created INTEGER NOT NULL, accessed INTEGER NOT NULL, PRIMARY KEY (artist, title))'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS lyrics_accessed ON lyrics (accessed)')
+        connection.execute('PRAGMA user_version = ' + str(LyricsCache.SCHEMA_VERSION))
+        connection.commit()
+        LyricsCache.__connection = connection
+        return connection
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """
+        Returns if the lyrics cache has been configured.
+        :return: If a lyrics cache file has been defined will be returned "True".
+        :rtype: bool
+        """
+        return Config.Config.get_lyrics_cache() is not None
+
+    @staticmethod
+    def get(artist: str, title: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Returns the lyrics stored for the given song, provided that they have not expired.
+        :param artist: A string containing the song artist.
+        :type artist: str
+        :param title: A string containing the song title.
+        :type title: str
+        :return: A tuple containing the lyrics and its author(s) or None if no valid entry is found.
+        :rtype: Optional[Tuple[str, Optional[str]]]
+        """
+        connection: Optional[sqlite3.Connection] = LyricsCache.__get_connection()
+        if connection is None:
+            return None
+        key: Tuple[str, str] = (Utils.Utils.normalize(artist), Utils.Utils.normalize(title))
+        if not key[0] or not key[1]:
+            # Songs whose names are made of punctuation only would all share the same entry.
+            return None
+        now: int = int(time.time())
+        expiration: int = now - Config.Config.get_lyrics_cache_ttl() * 86400
+        with LyricsCache.__lock:
+            row: Optional[tuple] = connection.execute(
+                'SELECT lyrics, lyrics_writer FROM lyrics WHERE artist = ? AND title = ? AND created >= ?',
+                key + (expiration,)
+            ).fetchone()
+            if row is None:
+                return None
+            # Keep track of the last access, least recently used entries are the first to be removed.
+            connection.execute('UPDATE lyrics SET accessed = ? WHERE artist = ? AND title = ?', (now,) + key)
+            LyricsCache.__pending += 1
+            # Commit in batches, access times are not worth a disk sync for every file.
+            if LyricsCache.__pending >= LyricsCache.COMMIT_INTERVAL:
+                connection.commit()
+                LyricsCache.__pending = 0
+        return row[0], row[1]
+
+    @staticmethod
+    def store(artist: str, title: str, lyrics: str, lyrics_writer: Optional[str]) -> None:
+        """
+        Stores the lyrics found for the given song, least recently used entries are removed if the cache is full.
+        :param artist: A string containing the song artist.
+        :type artist: str
+        :param title: A string containing the song title.
+        :type title: str
+        :param lyrics: A string containing the song lyrics.
+        :type lyrics: str
+        :param lyrics_writer: A string containing the author(s) of the lyrics, if any.
+        :type lyrics_writer: Optional[str]
+        """
+        connection: Optional[sqlite3.Connection] = LyricsCache.__get_connection()
+        if connection is None or not lyrics:
+            return
+        now: int = int(time.time())
+        values: tuple = (Utils.Utils.normalize(artist), Utils.Utils.normalize(title), lyrics, lyrics_writer, now, now)
+        if not values[0] or not values[1]:
+            return
+        with LyricsCache.__lock:
+            connection.execute('INSERT OR REPLACE INTO lyrics VALUES (?, ?, ?, ?, ?, ?)', values)
+            count: int = connection.execute('SELECT COUNT(*) FROM lyrics').fetchone()[0]
+            limit: int = Config.Config.get_lyrics_cache_size()
+            if count > limit:
+                connection.execute(
+                    'DELETE FROM lyrics WHERE rowid IN (SELECT rowid FROM lyrics ORDER BY accessed LIMIT ?)',
+                    (count - limit,)
+                )
+            connection.commit()
+            LyricsCache.__pending = 0
+
+    @staticmethod
+    def close() -> None:
+        """
+        Removes the expired entries and closes the connection to the lyrics database.
+        """
+        with LyricsCache.__lock:
+            if LyricsCache.__connection is None:
+                return
+            expiration: int = int(time.time()) - Config.Config.get_lyrics_cache_ttl() * 86400
+            LyricsCache.__connection.execute('DELETE FROM lyrics WHERE created < ?', (expiration,))
+            LyricsCache.__connection.commit()
+            LyricsCache.__connection.close()
+            LyricsCache.__connection = None
+            LyricsCache.__pending = 0
@@ -1,32 +1,110 @@
-from typing import Optional, Tuple, Any
-from diesis import Song, Logger
-from diesis.scrapers import AZLyrics, MusixMatch
+from typing import Optional, Tuple, Any, List, Set, Dict
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from diesis import Song, Logger, Config, ProviderRegistry, Metrics
+from diesis.scrapers import LocalLyrics
+import time
 
 
 class LyricsFinder:
+    STRATEGIES: Set[str] = {'first', 'priority', 'adaptive'}
+
     lyrics: str = None
     lyrics_writer: str = None
     song: Song = None
 
-    def __scrape(self, provider: int) -> Tuple[Optional[str], Optional[str]]:
+    @staticmethod
+    def get_supported_strategies() -> Set[str]:
+        """
+        Returns the names of the strategies that can be used to pick the lyrics among the providers' results.
+        :return: A set containing the strategy names.
+        :rtype: Set[str]
+        """
+        return LyricsFinder.STRATEGIES
+
+    def __scrape(self, scraper: Any, provider: str, context: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
         """
         Finds and fetches the song lyrics by scraping the given provider's website.
-        :param provider: An integer number that allows to select the provider to scrape (1: Azlyrics, 2: MusixMatch).
-        :type provider: int
+        :param scraper: An instance of the scraper class corresponding to the provider.
+        :type scraper: Any
+        :param provider: A string containing the name of the provider to scrape.
+        :type provider: str
+        :param context: A dictionary containing the log context fields of the thread the lookup has been started from.
+        :type context: Dict[str, Any]
         :return: A tuple containing both the lyrics and its author(s) or both None if no lyrics is found.
         :rtype: Tuple[Optional[str], Optional[str]]
         """
-        scraper: Any = None
-        if provider == 1:
-            Logger.Logger.log('Querying "Azlyrics"...')
-            scraper: AZLyrics.AZLyrics = AZLyrics.AZLyrics()
-        if provider == 2:
-            Logger.Logger.log('Querying "MusixMatch"...')
-            scraper: MusixMatch.MusixMatch = MusixMatch.MusixMatch()
-        if scraper is not None:
+        # Scrapers may run in worker threads, messages must still refer to the song being processed.
+        Logger.Logger.set_context(context)
+        name: str = ProviderRegistry.ProviderRegistry.get_name(provider)
+        Logger.Logger.log('Querying "' + name + '"...')
+        start: float = time.monotonic()
+        try:
             scraper.set_query(self.song.get_query(False), self.song.get_query(True))
             scraper.fetch()
-            return scraper.get_lyrics(), scraper.get_lyrics_writer()
+        except OSError as ex:
+            # Only transport errors tell that the provider is unreachable, HTTP errors are reported by "has_failed".
+            ProviderRegistry.ProviderRegistry.record(provider, False, True, time.monotonic() - start)
+            Metrics.Metrics.record('lyrics_provider', time.monotonic() - start, 'error', {'provider': provider})
+            Logger.Logger.log_error('Unable to query "' + name + '": ' + str(ex))
+            return None, None
+        except Exception as ex:
+            # A page having an unexpected layout means no lyrics from this provider, it must not stop the scan.
+            ProviderRegistry.ProviderRegistry.record(provider, False, False, time.monotonic() - start)
+            Metrics.Metrics.record('lyrics_provider', time.monotonic() - start, 'miss', {'provider': provider})
+            Logger.Logger.log_error('Unable to read the lyrics from "' + name + '": ' + repr(ex))
+            return None, None
+        if scraper.is_cancelled() and not scraper.has_failed():
+            # The lookup has been interrupted, its outcome tells nothing about the provider.
+            ProviderRegistry.ProviderRegistry.release(provider)
+            result: str = 'cancelled'
+        else:
+            found: bool = bool(scraper.get_lyrics())
+            ProviderRegistry.ProviderRegistry.record(provider, found, scraper.has_failed(), time.monotonic() - start)
+            result: str = 'error' if scraper.has_failed() else ('hit' if found else 'miss')
+        Metrics.Metrics.record('lyrics_provider', time.monotonic() - start, result, {'provider': provider})
+        return scraper.get_lyrics(), scraper.get_lyrics_writer()
+
+    @staticmethod
+    def __get_result(future: Future) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns the lyrics fetched by a completed scraping task, failures are logged and treated as no lyrics found.
+        :param future: The object representing the completed task.
+        :type future: Future
+        :return: A tuple containing both the lyrics and its author(s) or both None if no lyrics is found.
+        :rtype: Tuple[Optional[str], Optional[str]]
+        """
+        try:
+            return future.result()
+        except Exception as ex:
+            Logger.Logger.log_error(str(ex))
+            return None, None
+
+    @staticmethod
+    def __pick(futures: List[Future], strategy: str, expired: bool) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """
+        Picks the lyrics to use among the results returned so far by the providers.
+        :param futures: A list containing the scraping tasks sorted by provider priority.
+        :type futures: List[Future]
+        :param strategy: A string containing the name of the strategy to use, "first" or "priority".
+        :type strategy: str
+        :param expired: If set to "True" no more results are going to be waited, the best available one is returned.
+        :type expired: bool
+        :return: The tuple containing lyrics and author(s) picked or None if more results should be waited for.
+        :rtype: Optional[Tuple[Optional[str], Optional[str]]]
+        """
+        pending: bool = False
+        for future in futures:
+            if not future.done():
+                if strategy == 'priority' and not expired:
+                    # A provider having a higher priority may still return the lyrics.
+                    return None
+                pending = True
+                continue
+            lyrics: Tuple[Optional[str], Optional[str]] = LyricsFinder.__get_result(future)
+            if lyrics[0]:
+                return lyrics
+        if pending and not expired:
+            return None
         return None, None
 
     def set_song(self, song: Song) -> None:
@@ -53,19 +131,87 @@ class LyricsFinder:
         """
         self.song = song
 
+    def __fetch_sequentially(self, providers: List[str]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Queries the given providers one at a time, best expected payoff first, until the lyrics are found.
+        :param providers: A list containing the names of the providers to query.
+        :type providers: List[str]
+        :return: A tuple containing both the lyrics and its author(s) or both None if no lyrics is found.
+        :rtype: Tuple[Optional[str], Optional[str]]
+        """
+        for provider in ProviderRegistry.ProviderRegistry.sort(providers):
+            try:
+                lyrics: Tuple[Optional[str], Optional[str]] = self.__scrape(
+                    ProviderRegistry.ProviderRegistry.create(provider), provider, Logger.Logger.get_context()
+                )
+            except Exception as ex:
+                # The provider has not been queried, the next lookup may probe it again.
+                ProviderRegistry.ProviderRegistry.release(provider)
+                Logger.Logger.log_error(str(ex))
+                continue
+            if lyrics[0]:
+                return lyrics
+        return None, None
+
+    def __fetch_concurrently(self, providers: List[str], strategy: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Queries all the given providers at once and picks the lyrics according to the given strategy.
+        :param providers: A list containing the names of the providers to query, sorted by priority.
+        :type providers: List[str]
+        :param strategy: A string containing the name of the strategy to use, "first" or "priority".
+        :type strategy: str
+        :return: A tuple containing both the lyrics and its author(s) or both None if no lyrics is found.
+        :rtype: Tuple[Optional[str], Optional[str]]
+        """
+        deadline: float = time.monotonic() + Config.Config.get_lyrics_timeout()
+        scrapers: List[Any] = [ProviderRegistry.ProviderRegistry.create(provider) for provider in providers]
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max(len(scrapers), 1))
+        lyrics: Optional[Tuple[Optional[str], Optional[str]]] = None
+        try:
+            # Query all the providers at once, lyrics latency is bounded by the fastest one rather than their sum.
+            futures: List[Future] = []
+            for scraper, provider in zip(scrapers, providers):
+                futures.append(executor.submit(self.__scrape, scraper, provider, Logger.Logger.get_context()))
+            while lyrics is None:
+                remaining: float = deadline - time.monotonic()
+                lyrics = LyricsFinder.__pick(futures, strategy, remaining <= 0)
+                if lyrics is None:
+                    wait([future for future in futures if not future.done()], remaining, FIRST_COMPLETED)
+        finally:
+            # Tell the remaining scrapers to stop before sending further requests, they are not waited for.
+            for scraper in scrapers:
+                scraper.cancel()
+            executor.shutdown(False)
+        return lyrics
+
     def fetch(self) -> None:
         """
-        Fetches the lyrics of the defined song by scraping all the available providers.
+        Fetches the lyrics of the defined song by scraping the available providers.
         :raise RuntimeError: If no song has been defined.
         """
         if self.song is None:
             raise RuntimeError('No song defined.')
-        lyrics: Tuple[Optional[str], Optional[str]] = (None, None)
-        provider: int = 1
-        # Start fetching the lyrics from the first provider and go on to other ones until found.
-        while not lyrics[0] and provider <= 2:
-            lyrics = self.__scrape(provider)
-            provider += 1
+        start: float = time.monotonic()
+        if Config.Config.get_lyrics_directory():
+            # Lyrics stored locally are looked up first, providers are queried only if they are missing.
+            local: LocalLyrics.LocalLyrics = LocalLyrics.LocalLyrics()
+            local.set_song(self.song.get_artist(), self.song.get_title())
+            local.fetch()
+            Metrics.Metrics.record('lyrics_local', time.monotonic() - start, 'hit' if local.get_lyrics() else 'miss')
+            if local.get_lyrics():
+                Logger.Logger.log('Song lyrics found in the lyrics directory.')
+                self.lyrics = local.get_lyrics()
+                self.lyrics_writer = local.get_lyrics_writer()
+                Metrics.Metrics.record('lyrics_lookup', time.monotonic() - start, 'hit')
+                return
+        # Providers failing repeatedly are skipped until a probe shows they have recovered.
+        providers: List[str] = ProviderRegistry.ProviderRegistry.get_available(Config.Config.get_lyrics_providers())
+        strategy: str = Config.Config.get_lyrics_strategy()
+        if strategy == 'adaptive':
+            lyrics: Tuple[Optional[str], Optional[str]] = self.__fetch_sequentially(providers)
+        else:
+            lyrics: Tuple[Optional[str], Optional[str]] = self.__fetch_concurrently(providers, strategy)
+        Metrics.Metrics.record('lyrics_lookup', time.monotonic() - start, 'hit' if lyrics[0] else 'miss')
         if lyrics[0]:
             Logger.Logger.log('Song lyrics found and saved.')
         self.lyrics = lyrics[0]
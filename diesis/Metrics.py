@@ -0,0 +1,156 @@
+from typing import Optional, Dict, Any, List, Tuple
+from diesis import Config, Logger, Tracer, Profiler
+import threading
+import time
+import json
+import os
+
+
+class Metrics:
+    # Upper bounds of the latency histogram buckets in seconds, the last bucket holds everything else.
+    BUCKETS: List[float] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0]
+    DURATION_METRIC: str = 'diesis_stage_duration_seconds'
+    RESULTS_METRIC: str = 'diesis_stage_results_total'
+
+    __stages: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Dict[str, Any]] = {}
+    __lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def record(stage: str, elapsed: float, result: Optional[str] = None, labels: Dict[str, str] = None) -> None:
+        """
+        Records the duration and the outcome of a processing stage, it is traced and profiled as well, if enabled.
+        :param stage: A string containing the stage name, such as "itunes_lookup" or "conversion".
+        :type stage: str
+        :param elapsed: A floating point number representing the stage duration in seconds.
+        :type elapsed: float
+        :param result: A string containing the outcome, "hit" and "miss" are used to compute the hit rate.
+        :type result: Optional[str]
+        :param labels: A dictionary containing additional labels, such as the lyrics provider name.
+        :type labels: Dict[str, str]
+        """
+        if Tracer.Tracer.is_enabled():
+            args: Dict[str, str] = dict(labels or {})
+            if result is not None:
+                args['result'] = result
+            Tracer.Tracer.record(stage, time.monotonic() - elapsed, args)
+        # Stage boundaries are where memory usage is sampled when profiling memory.
+        Profiler.Profiler.checkpoint(stage)
+        key: Tuple[str, Tuple[Tuple[str, str], ...]] = (stage, tuple(sorted((labels or {}).items())))
+        index: int = len(Metrics.BUCKETS)
+        for i in range(0, len(Metrics.BUCKETS)):
+            if elapsed <= Metrics.BUCKETS[i]:
+                index = i
+                break
+        with Metrics.__lock:
+            entry: Optional[Dict[str, Any]] = Metrics.__stages.get(key)
+            if entry is None:
+                entry = {'count': 0, 'sum': 0.0, 'buckets': [0] * (len(Metrics.BUCKETS) + 1), 'results': {}}
+                Metrics.__stages[key] = entry
+            entry['count'] += 1
+            entry['sum'] += elapsed
+            entry['buckets'][index] += 1
+            if result is not None:
+                entry['results'][result] = entry['results'].get(result, 0) + 1
+
+    @staticmethod
+    def get_stages() -> List[Dict[str, Any]]:
+        """
+        Returns the metrics collected so far for each stage.
+        :return: A list of dictionaries containing count, durations, cumulative buckets, results and hit rate by stage.
+        :rtype: List[Dict[str, Any]]
+        """
+        stages: List[Dict[str, Any]] = []
+        with Metrics.__lock:
+            for key in sorted(Metrics.__stages.keys()):
+                entry: Dict[str, Any] = Metrics.__stages[key]
+                buckets: Dict[str, int] = {}
+                total: int = 0
+                for i in range(0, len(entry['buckets'])):
+                    total += entry['buckets'][i]
+                    buckets['+Inf' if i == len(Metrics.BUCKETS) else repr(Metrics.BUCKETS[i])] = total
+                stage: Dict[str, Any] = {
+                    'stage': key[0],
+                    'labels': dict(key[1]),
+                    'count': entry['count'],
+                    'sum': entry['sum'],
+                    'mean': entry['sum'] / entry['count'],
+                    'buckets': buckets,
+                    'results': dict(entry['results'])
+                }
+                if 'hit' in entry['results'] or 'miss' in entry['results']:
+                    stage['hit_rate'] = entry['results'].get('hit', 0) / sum(entry['results'].values())
+                stages.append(stage)
+        return stages
+
+    @staticmethod
+    def __format_labels(labels: Dict[str, str]) -> str:
+        """
+        Formats the given labels as required by the Prometheus text format.
+        :param labels: A dictionary containing label names and values.
+        :type labels: Dict[str, str]
+        :return: A string containing the labels enclosed in braces.
+        :rtype: str
+        """
+        pairs: List[str] = []
+        for name, value in labels.items():
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            pairs.append(name + '="' + value + '"')
+        return '{' + ','.join(pairs) + '}'
+
+    @staticmethod
+    def to_prometheus() -> str:
+        """
+        Returns the metrics collected so far in the Prometheus text format, as read by the textfile collector.
+        :return: A string containing the metrics.
+        :rtype: str
+        """
+        stages: List[Dict[str, Any]] = Metrics.get_stages()
+        lines: List[str] = [
+            '# HELP ' + Metrics.DURATION_METRIC + ' Time spent in each processing stage.',
+            '# TYPE ' + Metrics.DURATION_METRIC + ' histogram'
+        ]
+        for stage in stages:
+            labels: Dict[str, str] = dict(stage['labels'], stage=stage['stage'])
+            for bound, count in stage['buckets'].items():
+                bucket: str = Metrics.__format_labels(dict(labels, le=bound))
+                lines.append(Metrics.DURATION_METRIC + '_bucket' + bucket + ' ' + str(count))
+            suffix: str = Metrics.__format_labels(labels)
+            lines.append(Metrics.DURATION_METRIC + '_sum' + suffix + ' ' + repr(stage['sum']))
+            lines.append(Metrics.DURATION_METRIC + '_count' + suffix + ' ' + str(stage['count']))
+        lines.append('# HELP ' + Metrics.RESULTS_METRIC + ' Outcomes of each processing stage.')
+        lines.append('# TYPE ' + Metrics.RESULTS_METRIC + ' counter')
+        for stage in stages:
+            for result, count in sorted(stage['results'].items()):
+                labels: Dict[str, str] = dict(stage['labels'], stage=stage['stage'], result=result)
+                lines.append(Metrics.RESULTS_METRIC + Metrics.__format_labels(labels) + ' ' + str(count))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def __write(path: str, contents: str) -> None:
+        """
+        Writes the given contents into a file, the file is replaced at once so readers never see a partial file.
+        :param path: A string containing the path to the file.
+        :type path: str
+        :param contents: A string containing the contents to write.
+        :type contents: str
+        """
+        tmp_path: str = path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(contents)
+            os.replace(tmp_path, path)
+        except OSError as ex:
+            Logger.Logger.log_error(str(ex))
+            Logger.Logger.log_error('Unable to write metrics file: ' + path)
+
+    @staticmethod
+    def export() -> None:
+        """
+        Writes the metrics collected during the run into the configured JSON and Prometheus files, if any.
+        """
+        path: Optional[str] = Config.Config.get_metrics_file()
+        if path:
+            Metrics.__write(path, json.dumps({'stages': Metrics.get_stages()}, indent=4))
+        path = Config.Config.get_metrics_textfile()
+        if path:
+            Metrics.__write(path, Metrics.to_prometheus())
@@ -0,0 +1,145 @@
+from typing import Optional, Dict, Any, List
+from diesis import Config, Logger
+import threading
+import time
+import io
+import os
+
+
+class Profiler:
+    # Number of frames stored for each memory allocation and number of entries written in the reports.
+    FRAMES: int = 10
+    TOP_ENTRIES: int = 50
+
+    __prefix: str = None
+    __profile: Any = None
+    __snapshot: Any = None
+    __stages: Dict[str, Dict[str, int]] = {}
+    __lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def __get_prefix() -> str:
+        """
+        Generates the path the report files start with, reports are written next to the log file, if any.
+        :return: A string containing the log file path without extension or a name based on the current time.
+        :rtype: str
+        """
+        log_file: Optional[str] = Config.Config.get_log_file()
+        if log_file:
+            return os.path.splitext(log_file)[0]
+        return 'diesis-' + time.strftime('%Y%m%d-%H%M%S')
+
+    @staticmethod
+    def start() -> None:
+        """
+        Starts the configured profiler, if any, it covers the whole scan.
+        """
+        profiler: Optional[str] = Config.Config.get_profiler()
+        Profiler.__prefix = Profiler.__get_prefix()
+        if profiler == 'cpu':
+            # cProfile is part of the standard library, import it only when profiling is requested.
+            import cProfile
+            Profiler.__profile = cProfile.Profile()
+            Profiler.__profile.enable()
+        elif profiler == 'mem':
+            import tracemalloc
+            tracemalloc.start(Profiler.FRAMES)
+            Profiler.__stages = {}
+            Profiler.__snapshot = tracemalloc.take_snapshot()
+
+    @staticmethod
+    def checkpoint(stage: str) -> None:
+        """
+        Records the memory traced at the end of the given stage and the peak reached since the previous stage ended.
+        :param stage: A string containing the stage name, such as "conversion".
+        :type stage: str
+        """
+        if Profiler.__snapshot is None:
+            return
+        import tracemalloc
+        with Profiler.__lock:
+            current, peak = tracemalloc.get_traced_memory()
+            if hasattr(tracemalloc, 'reset_peak'):
+                # Measure the peak of each stage separately whenever supported (Python 3.9+).
+                tracemalloc.reset_peak()
+            entry: Optional[Dict[str, int]] = Profiler.__stages.get(stage)
+            if entry is None:
+                entry = {'count': 0, 'current': 0, 'peak': 0}
+                Profiler.__stages[stage] = entry
+            entry['count'] += 1
+            entry['current'] = max(entry['current'], current)
+            entry['peak'] = max(entry['peak'], peak)
+
+    @staticmethod
+    def __write(path: str, contents: str) -> None:
+        """
+        Writes a report file.
+        :param path: A string containing the path to the report file.
+        :type path: str
+        :param contents: A string containing the report.
+        :type contents: str
+        """
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(contents)
+            Logger.Logger.log('Profiling report written to: ' + path)
+        except OSError as ex:
+            Logger.Logger.log_error(str(ex))
+            Logger.Logger.log_error('Unable to write profiling report: ' + path)
+
+    @staticmethod
+    def __stop_cpu() -> None:
+        """
+        Stops the CPU profiler, then writes the raw pstats file and a summary sorted by cumulative time.
+        """
+        profile: Any = Profiler.__profile
+        Profiler.__profile = None
+        profile.disable()
+        import pstats
+        path: str = Profiler.__prefix + '.pstats'
+        try:
+            profile.dump_stats(path)
+        except OSError as ex:
+            Logger.Logger.log_error(str(ex))
+            Logger.Logger.log_error('Unable to write profiling report: ' + path)
+        output: io.StringIO = io.StringIO()
+        stats: pstats.Stats = pstats.Stats(profile, stream=output)
+        stats.sort_stats('cumulative').print_stats(Profiler.TOP_ENTRIES)
+        Profiler.__write(Profiler.__prefix + '.cpu.txt', output.getvalue())
+
+    @staticmethod
+    def __stop_mem() -> None:
+        """
+        Stops tracing memory allocations, then writes the peak memory by stage and the top allocations.
+        """
+        import tracemalloc
+        first: Any = Profiler.__snapshot
+        last: Any = tracemalloc.take_snapshot()
+        current: int = tracemalloc.get_traced_memory()[0]
+        Profiler.__snapshot = None
+        tracemalloc.stop()
+        lines: List[str] = ['Memory traced at exit: %.1f KiB' % (current / 1024), '', 'Memory by stage (KiB):']
+        lines.append('%-24s %10s %14s %14s' % ('stage', 'count', 'max at end', 'max peak'))
+        for stage, entry in sorted(Profiler.__stages.items()):
+            lines.append('%-24s %10d %14.1f %14.1f' % (
+                stage, entry['count'], entry['current'] / 1024, entry['peak'] / 1024
+            ))
+        # Allocations still alive at the end of the run, compared with the beginning, point to leaks and caches.
+        lines += ['', 'Top allocations grown during the run:']
+        for stat in last.compare_to(first, 'lineno')[:Profiler.TOP_ENTRIES]:
+            lines.append(str(stat))
+        lines += ['', 'Top allocations at exit:']
+        for stat in last.statistics('lineno')[:Profiler.TOP_ENTRIES]:
+            lines.append(str(stat))
+        Profiler.__stages = {}
+        Profiler.__write(Profiler.__prefix + '.mem.txt', '\n'.join(lines) + '\n')
+
+    @staticmethod
+    def stop() -> None:
+        """
+        Stops the running profiler, if any, and writes its reports.
+        """
+        if Profiler.__profile is not None:
+            Profiler.__stop_cpu()
+        if Profiler.__snapshot is not None:
+            Profiler.__stop_mem()
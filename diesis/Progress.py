@@ -0,0 +1,195 @@
+from typing import Optional, Dict, Any, List
+from collections import deque
+from diesis import Config
+import threading
+import shutil
+import json
+import time
+import sys
+
+
+class Progress:
+    # Requests per minute allowed by the iTunes Search API, shown along with the current request rate.
+    ITUNES_RATE_LIMIT: int = 20
+    # Minimum number of seconds between two updates, the terminal can be redrawn more often than lines get printed.
+    BAR_INTERVAL: float = 0.2
+    JSON_INTERVAL: float = 5.0
+    BAR_WIDTH: int = 20
+
+    __mode: Optional[str] = None
+    __total: int = 0
+    __counters: Dict[str, int] = {}
+    __requests: Dict[str, deque] = {}
+    __started: float = 0.0
+    __rendered: float = 0.0
+    __lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def __get_mode() -> Optional[str]:
+        """
+        Returns how progress must be shown according to the configured mode and to the output stream.
+        :return: A string containing "bar" for the terminal display, "json" for JSON lines or None if disabled.
+        :rtype: Optional[str]
+        """
+        mode: str = Config.Config.get_progress()
+        if mode == 'off':
+            return None
+        if mode != 'auto':
+            return mode
+        if Config.Config.is_verbose():
+            # Log messages are already printed line by line, a redrawn line would get mixed with them.
+            return None
+        # Scripted and scheduled runs keep their output unchanged, JSON lines must be asked for.
+        return 'bar' if sys.stderr.isatty() else None
+
+    @staticmethod
+    def start(total: int) -> None:
+        """
+        Starts reporting the progress of the scan.
+        :param total: An integer number representing how many files are going to be processed.
+        :type total: int
+        """
+        with Progress.__lock:
+            Progress.__mode = Progress.__get_mode()
+            Progress.__total = total
+            Progress.__counters = {'matched': 0, 'skipped': 0, 'unmatched': 0, 'failed': 0}
+            Progress.__requests = {}
+            Progress.__started = time.monotonic()
+            Progress.__rendered = 0.0
+
+    @staticmethod
+    def add_file(result: str) -> None:
+        """
+        Counts a processed file and updates the display, if enough time has passed since last update.
+        :param result: A string containing the outcome of the file processing, "matched", "skipped", "unmatched" or
+        "failed".
+        :type result: str
+        """
+        if Progress.__mode is None:
+            return
+        with Progress.__lock:
+            Progress.__counters[result] = Progress.__counters.get(result, 0) + 1
+            Progress.__render(False)
+
+    @staticmethod
+    def add_request(service: str) -> None:
+        """
+        Counts a request sent to a remote service, only the requests of the last minute are kept.
+        :param service: A string containing the service name, such as "itunes", "cover" or "lyrics".
+        :type service: str
+        """
+        if Progress.__mode is None:
+            return
+        now: float = time.monotonic()
+        with Progress.__lock:
+            requests: Optional[deque] = Progress.__requests.get(service)
+            if requests is None:
+                requests = deque()
+                Progress.__requests[service] = requests
+            requests.append(now)
+            # Long files may take a while, keep the display alive while their information is looked up.
+            Progress.__render(False)
+
+    @staticmethod
+    def __get_requests_per_minute(service: Optional[str] = None) -> int:
+        """
+        Returns how many requests have been sent during the last minute.
+        :param service: A string containing the name of the service to count the requests of, if None, all are counted.
+        :type service: Optional[str]
+        :return: An integer number representing the number of requests.
+        :rtype: int
+        """
+        limit: float = time.monotonic() - 60
+        count: int = 0
+        for name, requests in Progress.__requests.items():
+            while requests and requests[0] < limit:
+                requests.popleft()
+            if service is None or name == service:
+                count += len(requests)
+        return count
+
+    @staticmethod
+    def __get_status() -> Dict[str, Any]:
+        """
+        Returns the current progress figures.
+        :return: A dictionary containing counters, rates and the estimated remaining time in seconds, if known.
+        :rtype: Dict[str, Any]
+        """
+        elapsed: float = time.monotonic() - Progress.__started
+        done: int = sum(Progress.__counters.values())
+        eta: Optional[float] = None
+        rate: float = 0.0
+        if done > 0 and elapsed >= 1:
+            # Rates computed over the first second are meaningless.
+            rate = done * 60 / elapsed
+            eta = (Progress.__total - done) * elapsed / done
+        return {
+            'done': done,
+            'total': Progress.__total,
+            'matched': Progress.__counters['matched'],
+            'skipped': Progress.__counters['skipped'],
+            'unmatched': Progress.__counters['unmatched'],
+            'failed': Progress.__counters['failed'],
+            'elapsed': round(elapsed, 1),
+            'files_per_minute': round(rate, 1),
+            'requests_per_minute': Progress.__get_requests_per_minute(),
+            'itunes_requests_per_minute': Progress.__get_requests_per_minute('itunes'),
+            'itunes_rate_limit': Progress.ITUNES_RATE_LIMIT,
+            'eta': round(eta, 1) if eta is not None else None
+        }
+
+    @staticmethod
+    def __format_duration(seconds: Optional[float]) -> str:
+        """
+        Formats the given duration as hours, minutes and seconds.
+        :param seconds: A floating point number representing the duration in seconds, if known.
+        :type seconds: Optional[float]
+        :return: A string containing the formatted duration or "--:--:--" if it is unknown.
+        :rtype: str
+        """
+        if seconds is None:
+            return '--:--:--'
+        seconds = int(seconds)
+        return '%02d:%02d:%02d' % (seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+    @staticmethod
+    def __render(final: bool) -> None:
+        """
+        Shows the current progress, updates are skipped if the previous one has been shown too recently.
+        :param final: If set to "True" the progress is shown anyway and the terminal line is terminated.
+        :type final: bool
+        """
+        now: float = time.monotonic()
+        interval: float = Progress.BAR_INTERVAL if Progress.__mode == 'bar' else Progress.JSON_INTERVAL
+        if not final and now - Progress.__rendered < interval:
+            return
+        Progress.__rendered = now
+        status: Dict[str, Any] = Progress.__get_status()
+        if Progress.__mode == 'json':
+            sys.stderr.write(json.dumps(dict(status, event='progress')) + '\n')
+            sys.stderr.flush()
+            return
+        filled: int = Progress.BAR_WIDTH * status['done'] // max(status['total'], 1)
+        parts: List[str] = [
+            '[' + '#' * filled + '-' * (Progress.BAR_WIDTH - filled) + '] ' + str(status['done']) + '/' +
+            str(status['total']),
+            str(status['matched']) + ' matched, ' + str(status['skipped']) + ' skipped',
+            str(status['files_per_minute']) + ' files/min',
+            'iTunes ' + str(status['itunes_requests_per_minute']) + '/' + str(Progress.ITUNES_RATE_LIMIT) + ' req/min',
+            'ETA ' + Progress.__format_duration(status['eta'])
+        ]
+        # Never wrap the line, otherwise it could not be redrawn.
+        width: int = shutil.get_terminal_size().columns - 1
+        sys.stderr.write('\r' + ' | '.join(parts)[:width].ljust(width) + ('\n' if final else ''))
+        sys.stderr.flush()
+
+    @staticmethod
+    def finish() -> None:
+        """
+        Shows the final progress and stops reporting.
+        """
+        if Progress.__mode is None:
+            return
+        with Progress.__lock:
+            Progress.__render(True)
+            Progress.__mode = None
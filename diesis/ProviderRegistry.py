@@ -0,0 +1,169 @@
+from typing import Dict, Any, List, Set
+from diesis import Logger
+import importlib
+import threading
+import time
+
+
+class ProviderRegistry:
+    # Scraper classes by provider, their modules are imported on first use as they depend on BeautifulSoup.
+    PROVIDERS: Dict[str, str] = {
+        'azlyrics': 'AZLyrics',
+        'musixmatch': 'MusixMatch'
+    }
+    PROVIDER_NAMES: Dict[str, str] = {
+        'azlyrics': 'Azlyrics',
+        'musixmatch': 'MusixMatch'
+    }
+    # Consecutive failed requests after which a provider is no longer queried.
+    FAILURE_THRESHOLD: int = 3
+    # Seconds to wait before letting a single request probe if a provider has recovered.
+    COOLDOWN: int = 60
+    # Weight of the last request in the average latency.
+    LATENCY_WEIGHT: float = 0.2
+    # Latency assumed for providers that have never been queried, in seconds.
+    DEFAULT_LATENCY: float = 1.0
+
+    __stats: Dict[str, Dict[str, Any]] = {}
+    __lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def __get_stats(provider: str) -> Dict[str, Any]:
+        """
+        Returns the statistics collected for the given provider, the caller must hold the lock.
+        :param provider: A string containing the provider name.
+        :type provider: str
+        :return: A dictionary containing attempts, successes, latency and circuit breaker state of the provider.
+        :rtype: Dict[str, Any]
+        """
+        if provider not in ProviderRegistry.__stats:
+            ProviderRegistry.__stats[provider] = {
+                'attempts': 0,
+                'successes': 0,
+                'latency': None,
+                'failures': 0,
+                'opened_at': None,
+                'probing': False
+            }
+        return ProviderRegistry.__stats[provider]
+
+    @staticmethod
+    def get_supported_providers() -> Set[str]:
+        """
+        Returns the names of all the supported lyrics providers.
+        :return: A set containing the provider names.
+        :rtype: Set[str]
+        """
+        return set(ProviderRegistry.PROVIDERS.keys())
+
+    @staticmethod
+    def get_name(provider: str) -> str:
+        """
+        Returns the human readable name of the given provider.
+        :param provider: A string containing the provider name.
+        :type provider: str
+        :return: A string containing the name to display.
+        :rtype: str
+        """
+        return ProviderRegistry.PROVIDER_NAMES[provider]
+
+    @staticmethod
+    def create(provider: str) -> Any:
+        """
+        Creates the scraper for the given provider.
+        :param provider: A string containing the provider name.
+        :type provider: str
+        :return: An instance of the scraper class registered for the provider.
+        :rtype: Any
+        """
+        name: str = ProviderRegistry.PROVIDERS[provider]
+        return getattr(importlib.import_module('diesis.scrapers.' + name), name)()
+
+    @staticmethod
+    def get_available(providers: List[str]) -> List[str]:
+        """
+        Filters out the providers whose circuit breaker is open, a single probe is let through once cooldown expires.
+        :param providers: A list containing the provider names.
+        :type providers: List[str]
+        :return: A list containing the providers that can be queried, in the same order.
+        :rtype: List[str]
+        """
+        available: List[str] = []
+        now: float = time.monotonic()
+        with ProviderRegistry.__lock:
+            for provider in providers:
+                stats: Dict[str, Any] = ProviderRegistry.__get_stats(provider)
+                if stats['opened_at'] is None:
+                    available.append(provider)
+                elif not stats['probing'] and now - stats['opened_at'] >= ProviderRegistry.COOLDOWN:
+                    # Half-open: this request tells if the provider is back, others keep skipping it meanwhile.
+                    stats['probing'] = True
+                    available.append(provider)
+        return available
+
+    @staticmethod
+    def sort(providers: List[str]) -> List[str]:
+        """
+        Sorts the given providers by expected payoff, that is their success rate divided by their average latency.
+        :param providers: A list containing the provider names, ties keep this order.
+        :type providers: List[str]
+        :return: A list containing the sorted provider names.
+        :rtype: List[str]
+        """
+        payoffs: Dict[str, float] = {}
+        with ProviderRegistry.__lock:
+            for provider in providers:
+                stats: Dict[str, Any] = ProviderRegistry.__get_stats(provider)
+                # Smooth the rate so that a few early results don't rule out a provider.
+                rate: float = (stats['successes'] + 1) / (stats['attempts'] + 2)
+                latency: float = stats['latency'] if stats['latency'] is not None else ProviderRegistry.DEFAULT_LATENCY
+                payoffs[provider] = rate / max(latency, 0.001)
+        return sorted(providers, key=lambda provider: -payoffs[provider])
+
+    @staticmethod
+    def release(provider: str) -> None:
+        """
+        Marks the probe of the given provider as not completed, so that the next lookup probes it again.
+        :param provider: A string containing the provider name.
+        :type provider: str
+        """
+        with ProviderRegistry.__lock:
+            ProviderRegistry.__get_stats(provider)['probing'] = False
+
+    @staticmethod
+    def record(provider: str, found: bool, failed: bool, elapsed: float) -> None:
+        """
+        Records the outcome of a lookup, the circuit breaker is opened after too many consecutive failed requests.
+        :param provider: A string containing the provider name.
+        :type provider: str
+        :param found: If set to "True" the provider returned the lyrics.
+        :type found: bool
+        :param failed: If set to "True" a request to the provider failed, a lookup with no results is not a failure.
+        :type failed: bool
+        :param elapsed: A floating point number representing the lookup duration in seconds.
+        :type elapsed: float
+        """
+        with ProviderRegistry.__lock:
+            stats: Dict[str, Any] = ProviderRegistry.__get_stats(provider)
+            stats['attempts'] += 1
+            if found:
+                stats['successes'] += 1
+            if stats['latency'] is None:
+                stats['latency'] = elapsed
+            else:
+                weight: float = ProviderRegistry.LATENCY_WEIGHT
+                stats['latency'] = weight * elapsed + (1 - weight) * stats['latency']
+            probing: bool = stats['probing']
+            stats['probing'] = False
+            if not failed:
+                if stats['opened_at'] is not None:
+                    Logger.Logger.log('"' + ProviderRegistry.get_name(provider) + '" is back, querying it again.')
+                stats['failures'] = 0
+                stats['opened_at'] = None
+                return
+            stats['failures'] += 1
+            if probing or stats['failures'] >= ProviderRegistry.FAILURE_THRESHOLD:
+                stats['opened_at'] = time.monotonic()
+                cooldown: str = str(ProviderRegistry.COOLDOWN)
+                name: str = ProviderRegistry.get_name(provider)
+                Logger.Logger.log('Too many failures from "' + name + '", skipping it for ' + cooldown + ' seconds.')
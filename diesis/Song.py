@@ -1,13 +1,14 @@
-from urllib import request, parse
-from urllib.error import HTTPError
+from urllib import parse
 from datetime import *
 from hashlib import md5
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Set
 import json
+import time
 import re
 import os
 import tempfile
-from diesis import LyricsFinder, Logger, Config, TagHelper, Converter, Utils
+from diesis import LyricsFinder, Logger, Config, TagHelper, Converter, Utils, LibraryIndex, LoudnessAnalyzer
+from diesis import LyricsCache, Metrics, Tracer, HttpClient
 
 
 class Song:
@@ -42,15 +43,52 @@ class Song:
     lyrics: str = None
     lyrics_writer: str = None
     found: bool = False
+    duration: float = None
+    collection_id: int = None
+    loudness: LoudnessAnalyzer.LoudnessAnalyzer = None
+    album_gain: float = None
+    album_peak: float = None
+    cover_embedded: bool = False
+    lyrics_embedded: bool = False
+    # Converted files differ from the original one in format and duration, they are not indexed in its place.
+    converted: bool = False
 
     def __load_tags(self) -> None:
         """
         Loads the song title and author embedded in file tags.
         :raise ValueError: If an unsupported file has been defined.
         """
-        self.tags = TagHelper.TagHelper.generate_tag_object(self)
+        self.tags = None
+        self.duration = None
+        self.cover_embedded = False
+        self.lyrics_embedded = False
         self.tag_helper = TagHelper.TagHelper(self)
+        entry: Optional[Dict[str, Any]] = None
+        if not self.converted:
+            entry = LibraryIndex.LibraryIndex.get(self.original_path)
+        if entry is not None:
+            # The file has not changed since it was indexed, use cached tags rather than opening it.
+            self.duration = entry['duration']
+            if entry['title']:
+                self.set_title(entry['title'])
+            if entry['artist']:
+                self.set_artist(entry['artist'])
+            if not Config.Config.get_fill_missing():
+                return
+            self.album_artist = entry['album_artist']
+            self.album = entry['album']
+            self.year = entry['year']
+            self.genre = entry['genre']
+            self.track_number = entry['track_number']
+            self.lyrics_embedded = bool(entry['lyrics_embedded'])
+            self.cover_embedded = bool(entry['cover_embedded'])
+            if not self.get_missing_fields():
+                return
+            # The file is going to be completed, all its tags are required in order not to lose any of them.
+        self.tags = TagHelper.TagHelper.generate_tag_object(self)
         self.tag_helper.fetch()
+        if not self.converted:
+            LibraryIndex.LibraryIndex.store(self.original_path, self)
 
     @staticmethod
     def __filter_itunes_results(data: List[Dict[str, str]], query: str) -> int:
@@ -93,6 +131,17 @@ class Song:
             i += 1
         return index
 
+    def __fill(self, name: str, value: Any) -> None:
+        """
+        Sets the given property to a value found online, values read from the file win when filling missing ones only.
+        :param name: A string containing the name of the property to set.
+        :type name: str
+        :param value: The value found.
+        :type value: Any
+        """
+        if not Config.Config.get_fill_missing() or not getattr(self, name):
+            setattr(self, name, value)
+
     def __set_info_from_itunes(self, data: Any, query: str) -> None:
         """
         Loads information about this track from the most eligible result returned by the iTunes API.
@@ -110,18 +159,19 @@ class Song:
             index = Song.__filter_itunes_results(data['results'], query)
         data = data['results'][index]
         # Add support for album artist and composer.
-        self.title = data['trackName']
-        self.artist = data['artistName']
-        self.album_artist = data['artistName']
-        self.genre = data['primaryGenreName']
-        self.album = data['collectionName']
+        self.__fill('title', data['trackName'])
+        self.__fill('artist', data['artistName'])
+        self.__fill('album_artist', data['artistName'])
+        self.__fill('genre', data['primaryGenreName'])
+        self.__fill('album', data['collectionName'])
+        self.collection_id = data['collectionId']
         release_date: datetime = datetime.strptime(data['releaseDate'], '%Y-%m-%dT%H:%M:%SZ')
-        self.year = release_date.year
+        self.__fill('year', release_date.year)
         self.cover_url = data['artworkUrl100'].replace('100x100bb.jpg', '1000x1000bb.jpg')
-        self.disc_count = data['discCount']
-        self.disc_number = data['discNumber']
-        self.track_count = data['trackCount']
-        self.track_number = data['trackNumber']
+        self.__fill('disc_count', data['discCount'])
+        self.__fill('disc_number', data['discNumber'])
+        self.__fill('track_count', data['trackCount'])
+        self.__fill('track_number', data['trackNumber'])
         # TODO: Currently iTunes doesn't support information about group and composer.
         # self.group = data['artistName']
         # self.composer = data['artistName']
@@ -129,8 +179,8 @@ class Song:
             self.explicit = True
         else:
             self.explicit = False
-        self.album_url = data['artistViewUrl']
-        self.track_url = data['trackViewUrl']
+        self.__fill('album_url', data['artistViewUrl'])
+        self.__fill('track_url', data['trackViewUrl'])
 
     def __get_filter_regex(self) -> str:
         """
@@ -179,19 +229,52 @@ class Song:
 
     def get_tag_object(self) -> Any:
         """
-        Returns the object that manages the song's tags.
+        Returns the object that manages the song's tags, the file is opened on first use.
         :return: An instance of the class that changes according to the audio file type.
         :rtype: Any
         """
+        if self.tags is None and self.path:
+            self.tags = TagHelper.TagHelper.generate_tag_object(self)
         return self.tags
 
-    def set_path(self, path: str, original_path: Optional[str] = None) -> None:
+    def set_duration(self, duration: Optional[float]) -> None:
+        """
+        Sets the song duration, as found while reading the file.
+        :param duration: A floating point number representing the duration in seconds or None if it is unknown.
+        :type duration: Optional[float]
+        """
+        self.duration = duration
+
+    def get_duration(self) -> Optional[float]:
+        """
+        Returns the song duration.
+        :return: A floating point number representing the duration in seconds or None if it cannot be determined.
+        :rtype: Optional[float]
+        """
+        if self.duration is None and self.tag_helper is not None:
+            # Loading the tags of MP3 files records their duration, other formats expose it through the tag object.
+            self.get_tag_object()
+            if self.duration is None:
+                self.duration = self.tag_helper.get_duration()
+        return self.duration
+
+    def get_tag_helper(self) -> TagHelper.TagHelper:
+        """
+        Returns the helper object used to read and write the song's tags.
+        :return: An instance of the class "TagHelper" bound to this song.
+        :rtype: TagHelper.TagHelper
+        """
+        return self.tag_helper
+
+    def set_path(self, path: str, original_path: Optional[str] = None, load_tags: bool = True) -> None:
         """
         Sets the path to the song file.
         :param path: A string containing the path to the song file.
         :type path: str
         :param original_path: A string containing the original path, if the file has been moved.
         :type original_path: Optional[str]
+        :param load_tags: If set to "False" song properties are kept as they are instead of being loaded from the file.
+        :type load_tags: bool
         :raise ValueError: If an empty path is given.
         """
         if not path:
@@ -202,6 +285,12 @@ class Song:
         else:
             self.original_path = path
         self.extension = os.path.splitext(path)[1].lower()[1:]
+        if not load_tags:
+            # The tag object is bound to the previous file, it will be generated again on first use.
+            self.tags = None
+            if self.tag_helper is None:
+                self.tag_helper = TagHelper.TagHelper(self)
+            return
         # Reload tags according to new file.
         self.__load_tags()
         self.__generate_search_query()
@@ -554,6 +643,99 @@ class Song:
         """
         return self.track_number
 
+    def get_collection_id(self) -> Optional[int]:
+        """
+        Returns the iTunes identifier of the album where this song is contained in.
+        :return: An integer number representing the identifier or None if no information was found.
+        :rtype: Optional[int]
+        """
+        return self.collection_id
+
+    def set_loudness(self, loudness: LoudnessAnalyzer.LoudnessAnalyzer) -> None:
+        """
+        Sets the results of the loudness analysis performed on this song.
+        :param loudness: An instance of the class "LoudnessAnalyzer" containing the analysis results.
+        :type loudness: LoudnessAnalyzer.LoudnessAnalyzer
+        """
+        self.loudness = loudness
+
+    def get_loudness(self) -> Optional[LoudnessAnalyzer.LoudnessAnalyzer]:
+        """
+        Returns the results of the loudness analysis performed on this song.
+        :return: An instance of the class "LoudnessAnalyzer" or None if the song has not been analyzed.
+        :rtype: Optional[LoudnessAnalyzer.LoudnessAnalyzer]
+        """
+        return self.loudness
+
+    def set_album_gain(self, gain: float, peak: float) -> None:
+        """
+        Sets the ReplayGain values computed for the whole album where this song is contained in.
+        :param gain: A floating point number representing the album gain in dB.
+        :type gain: float
+        :param peak: A floating point number representing the highest sample value found in the album.
+        :type peak: float
+        """
+        self.album_gain = gain
+        self.album_peak = peak
+
+    def get_album_gain(self) -> Optional[float]:
+        """
+        Returns the ReplayGain gain computed for the whole album where this song is contained in.
+        :return: A floating point number representing the gain in dB or None if it has not been computed.
+        :rtype: Optional[float]
+        """
+        return self.album_gain
+
+    def get_album_peak(self) -> Optional[float]:
+        """
+        Returns the highest sample value found in the whole album where this song is contained in.
+        :return: A floating point number where 1.0 means full scale or None if it has not been computed.
+        :rtype: Optional[float]
+        """
+        return self.album_peak
+
+    def set_cover_embedded(self, cover_embedded: bool) -> None:
+        """
+        Sets if the file already contains a cover picture.
+        :param cover_embedded: If set to "True" the file tags contain a picture.
+        :type cover_embedded: bool
+        """
+        self.cover_embedded = cover_embedded
+
+    def get_cover_embedded(self) -> bool:
+        """
+        Returns if the file contains a cover picture, either already embedded or going to be.
+        :return: If the song has a cover picture will be returned "True".
+        :rtype: bool
+        """
+        return self.cover_embedded or self.cover_path is not None
+
+    def get_lyrics_embedded(self) -> bool:
+        """
+        Returns if the file contains the song lyrics, either already embedded or going to be.
+        :return: If the song has lyrics will be returned "True".
+        :rtype: bool
+        """
+        return self.lyrics_embedded or bool(self.lyrics)
+
+    def get_missing_fields(self) -> Set[str]:
+        """
+        Returns the groups of information that must be looked up for this song.
+        :return: A set containing "info" (iTunes metadata), "cover" and "lyrics", all of them unless filling gaps only.
+        :rtype: Set[str]
+        """
+        if not Config.Config.get_fill_missing():
+            return {'info', 'cover', 'lyrics'}
+        missing: Set[str] = set()
+        for value in [self.title, self.artist, self.album_artist, self.album, self.year, self.genre, self.track_number]:
+            if not value:
+                missing.add('info')
+        if not self.get_cover_embedded():
+            missing.add('cover')
+        if not self.get_lyrics_embedded():
+            missing.add('lyrics')
+        return missing
+
     def is_found(self) -> bool:
         """
         Checks if online information for this song have been found or not.
@@ -584,17 +766,10 @@ class Song:
         :rtype: Any
         """
         song_information: Any = None
-        try:
-            # Send the request and load the returned contents.
-            req = request.Request(url, headers={
-                'User-Agent': Config.Config.get_user_agent()
-            })
-            response = request.urlopen(req)
-            contents: str = response.read().decode('utf-8')
-        except (HTTPError, TimeoutError) as ex:
-            Logger.Logger.log_error(str(ex))
-            Logger.Logger.log_error('Request failed for URL: ' + url)
-            return
+        # Send the request and load the returned contents.
+        contents: Optional[bytes] = HttpClient.HttpClient.get(url, 'itunes')
+        if contents is None:
+            return None
         # Parse the response from the endpoint as a JSON encoded string
         data: Any = json.loads(contents)
         # Check if response contains at least one result, otherwise return "None".
@@ -613,6 +788,8 @@ class Song:
         query: str = self.get_query(minimal)
         if not query:
             raise RuntimeError('No song has been defined.')
+        start: float = time.monotonic()
+        labels: Dict[str, str] = {'query': 'minimal' if minimal else 'full'}
         # Prepare the API call.
         data: Any = None
         # Generate a list of english countries as alternatives to US to use whenever no result for a song is found.
@@ -620,14 +797,20 @@ class Song:
         for country in countries:
             params: str = 'country=' + country + '&entity=song&limit=100&version=2&explicit=Yes&media=music'
             url: str = 'https://itunes.apple.com/search?term=' + parse.quote_plus(query) + '&' + params
+            request_start: float = time.monotonic()
             # Load results from iTunes API endpoint.
             data = Song.__fetch_from_url(url)
+            Tracer.Tracer.record('itunes_request', request_start, {
+                'url': url, 'country': country, 'query': labels['query'], 'results': data['resultCount'] if data else 0
+            }, 'http')
             if data:
                 break
         if not data:
+            Metrics.Metrics.record('itunes_lookup', time.monotonic() - start, 'miss', labels)
             title: str = Utils.Utils.str(self.title)
             Logger.Logger.log('Song ' + title + ' not found (query: ' + Utils.Utils.str(self.query) + ').')
             return
+        Metrics.Metrics.record('itunes_lookup', time.monotonic() - start, 'hit', labels)
         # Update the song properties according to information returned by iTunes.
         self.__set_info_from_itunes(data, query)
         self.found = True
@@ -646,13 +829,21 @@ class Song:
         Logger.Logger.log('Retrieving cover picture from iTunes...')
         url_hash: str = md5(self.cover_url.encode('utf-8')).hexdigest()
         filename: str = tempfile.gettempdir() + url_hash + '.jpg'
+        start: float = time.monotonic()
+        contents: Optional[bytes] = HttpClient.HttpClient.get(self.cover_url, 'cover')
+        if contents is None:
+            Metrics.Metrics.record('cover_download', time.monotonic() - start, 'error')
+            return
         try:
-            request.urlretrieve(self.cover_url, filename)
-            self.cover_path = filename
-        except (HTTPError, TimeoutError) as ex:
+            with open(filename, 'wb') as file:
+                file.write(contents)
+        except OSError as ex:
+            Metrics.Metrics.record('cover_download', time.monotonic() - start, 'error')
             Logger.Logger.log_error(str(ex))
-            Logger.Logger.log_error('Request failed for URL: ' + Utils.Utils.str(self.cover_url))
-            self.cover_path = None
+            Logger.Logger.log_error('Unable to save cover picture: ' + filename)
+            return
+        self.cover_path = filename
+        Metrics.Metrics.record('cover_download', time.monotonic() - start, 'success')
 
     def fetch_lyrics(self) -> None:
         """
@@ -660,6 +851,15 @@ class Song:
         """
         if self.artist is None or self.title is None:
             return
+        start: float = time.monotonic()
+        cached: Optional[Tuple[str, Optional[str]]] = LyricsCache.LyricsCache.get(self.artist, self.title)
+        if LyricsCache.LyricsCache.is_enabled():
+            Metrics.Metrics.record('lyrics_cache', time.monotonic() - start, 'miss' if cached is None else 'hit')
+        if cached is not None:
+            # The same song has already been processed, no need to scrape the providers again.
+            Logger.Logger.log('Song lyrics found in cache.')
+            self.lyrics, self.lyrics_writer = cached
+            return
         Logger.Logger.log('Looking for song lyrics...')
         finder = LyricsFinder.LyricsFinder(self)
         finder.fetch()
@@ -667,36 +867,64 @@ class Song:
         self.lyrics_writer = finder.get_lyrics_writer()
         if not self.lyrics:
             Logger.Logger.log('No lyrics found for this song.')
+            return
+        LyricsCache.LyricsCache.store(self.artist, self.title, self.lyrics, self.lyrics_writer)
+
+    def __fetch_missing(self, missing: Set[str]) -> None:
+        """
+        Fetches the given information, the cover picture and the lyrics are looked up only once the song is found.
+        :param missing: A set containing the information to look up, "info", "cover" and "lyrics".
+        :type missing: Set[str]
+        """
+        # The cover picture URL is returned by iTunes as well.
+        if 'info' in missing or 'cover' in missing:
+            self.fetch_info(False)
+            if not self.found and not Config.Config.get_strict_meta():
+                Logger.Logger.log('No iTunes data found using full song name, retrying using a shorter version...')
+                self.fetch_info(True)
+        if not self.found:
+            if 'info' in missing:
+                Logger.Logger.log('No available data for this song, skipping it...')
+                return
+            # Tags are already complete, the song can still be saved with the information found.
+            self.found = True
+        if 'cover' in missing:
+            self.fetch_cover()
+        if 'lyrics' in missing:
+            self.fetch_lyrics()
 
     def get_all_info(self) -> None:
         """
         Fetches information about meta tags, cover picture and lyrics based on the song defined.
         """
-        self.fetch_info(False)
-        if not self.found and not Config.Config.get_strict_meta():
-            Logger.Logger.log('No iTunes data found using full song name, retrying using a shorter version...')
-            self.fetch_info(True)
-        if not self.found:
-            Logger.Logger.log('No available data for this song, skipping it...')
-            return
-        self.fetch_cover()
-        self.fetch_lyrics()
+        start: float = time.monotonic()
+        missing: Set[str] = self.get_missing_fields()
+        self.__fetch_missing(missing)
+        Tracer.Tracer.record('lookup', start, {'missing': sorted(missing), 'found': self.found})
 
-    def convert(self, conversion_format: str) -> None:
+    def convert(self, conversion_format: str, destination: Optional[str] = None) -> None:
         """
         Converts the song into the given format.
         :param conversion_format: A string containing the format the song must be converted into.
         :type conversion_format: str
+        :param destination: A string containing the path to the file to generate with song properties embedded in it.
+        :type destination: Optional[str]
         """
-        if self.extension == conversion_format:
-            return
         Logger.Logger.log('Converting the song into ' + conversion_format)
         converter: Converter.Converter = Converter.Converter(self)
         # Convert the file into the given format.
-        new_path: str = converter.convert(conversion_format)
+        new_path: str = converter.convert(conversion_format, destination)
+        if new_path == self.path:
+            # The file was already in the given format.
+            return
+        if destination is not None:
+            # Properties have been written during conversion and the source file must be left untouched.
+            self.set_path(new_path, self.original_path, False)
+            return
         if os.path.exists(self.path):
             os.remove(self.path)
         # Update the path and reload tags according to new file generated.
+        self.converted = True
         self.set_path(new_path, self.original_path)
 
     def save(self) -> None:
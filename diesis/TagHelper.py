@@ -1,15 +1,29 @@
-from typing import Set, Any
-from mutagen.mp4 import MP4, MP4Cover
-from mutagen.id3 import ID3, TIT2, TPE1, TALB, TYER, TCON, USLT, TPOS, TRCK, APIC, COMM, TPE2, WOAF, PictureType, TEXT
-from mutagen.flac import FLAC, Picture
-from mutagen.aiff import AIFF
-from diesis import Song, Config
-import mutagen
+from typing import Set, Any, Dict, Optional, Tuple, List
+from diesis import Song, Config, Metrics
 import base64
+import json
+import time
+import os
+import re
 
 
 class TagHelper:
     SUPPORTED_FORMATS: Set[str] = {'m4a', 'mp3', 'flac', 'aiff', 'aif', 'ogg'}
+    # Tag names used for each song property, numbers and pictures are read apart.
+    MP4_FIELDS: Dict[str, str] = {
+        'title': '©nam', 'artist': '©ART', 'album_artist': 'aART', 'album': '©alb', 'year': '©day', 'genre': '©gen',
+        'composer': '©wrt', 'group': '©grp', 'lyrics': '©lyr'
+    }
+    ID3_FIELDS: Dict[str, str] = {
+        'title': 'TIT2', 'artist': 'TPE1', 'album_artist': 'TPE2', 'album': 'TALB', 'year': 'TDRC', 'genre': 'TCON',
+        'composer': 'TCOM', 'lyrics': 'USLT', 'lyrics_writer': 'TEXT', 'track_url': 'WOAF', 'disc': 'TPOS',
+        'track': 'TRCK'
+    }
+    VORBIS_FIELDS: Dict[str, str] = {
+        'title': 'title', 'artist': 'artist', 'album_artist': 'albumartist', 'album': 'album', 'year': 'year',
+        'genre': 'genre', 'composer': 'composer', 'group': 'grouping', 'lyrics': 'lyrics', 'lyrics_writer': 'lyricist',
+        'track_url': 'wwwaudiofile', 'album_url': 'wwwartist', 'disc': 'discnumber', 'track': 'tracknumber'
+    }
 
     song: Song = None
 
@@ -26,10 +40,264 @@ class TagHelper:
             return ''
         return str(value)
 
+    @staticmethod
+    def __serialize(value: Any) -> Any:
+        """
+        Converts a given tag value into a representation that can be encoded as JSON, binary data is Base64 encoded.
+        ID3 frames are stored in their readable version, FLAC pictures as raw data so that they can be rebuilt.
+        :param value: The tag value to convert.
+        :type value: Any
+        :return: The JSON compatible representation of the given value.
+        :rtype: Any
+        """
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, bytes):
+            return base64.b64encode(value).decode('ascii')
+        if isinstance(value, (list, tuple)):
+            return [TagHelper.__serialize(item) for item in value]
+        from mutagen.id3 import Frame
+        from mutagen.flac import Picture
+        if isinstance(value, Frame):
+            # The readable version starts with the frame name, the whole tag is stored as raw data along with frames.
+            return {
+                'frame': value.FrameID,
+                'text': value.pprint().partition('=')[2]
+            }
+        if isinstance(value, Picture):
+            return {
+                'type': int(value.type),
+                'mime': value.mime,
+                'description': value.desc,
+                'data': base64.b64encode(value.write()).decode('ascii')
+            }
+        # Other binary values expose their contents through the "data" attribute.
+        data: Any = getattr(value, 'data', None)
+        if isinstance(data, bytes):
+            return base64.b64encode(data).decode('ascii')
+        return str(value)
+
+    @staticmethod
+    def __read_id3_block(path: str, extension: str) -> Optional[bytes]:
+        """
+        Reads the ID3 tag embedded in the given file as it is written, header and footer included.
+        :param path: A string containing the path to the audio file.
+        :type path: str
+        :param extension: A string containing the file extension, used to locate the tag within the file.
+        :type extension: str
+        :return: The bytes the tag is made of or None if the file contains no ID3 tag.
+        :rtype: Optional[bytes]
+        """
+        with open(path, 'rb') as file:
+            if extension == 'aif' or extension == 'aiff':
+                # AIFF files keep the tag in a chunk of its own, chunks follow the 12 bytes long form header.
+                file.seek(12)
+                while True:
+                    chunk: bytes = file.read(8)
+                    if len(chunk) < 8:
+                        return None
+                    if chunk[:4] == b'ID3 ' or chunk[:4] == b'id3 ':
+                        break
+                    length: int = int.from_bytes(chunk[4:], 'big')
+                    # Chunks are padded to an even number of bytes.
+                    file.seek(length + length % 2, os.SEEK_CUR)
+            header: bytes = file.read(10)
+            if len(header) < 10 or header[:3] != b'ID3':
+                return None
+            # The tag size is a synchsafe integer, seven bits per byte, that leaves out the header and the footer.
+            size: int = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+            if header[5] & 0x10:
+                size += 10
+            return header + file.read(size)
+
+    @staticmethod
+    def __parse_position(value: Any) -> Tuple[int, int]:
+        """
+        Parses a disc or track position stored either as a "number/count" string or as a tuple.
+        :param value: The tag value to parse.
+        :type value: Any
+        :return: A tuple containing the number and the count, zero is used for the missing parts.
+        :rtype: Tuple[int, int]
+        """
+        if isinstance(value, tuple):
+            return int(value[0] or 0), (int(value[1] or 0) if len(value) > 1 else 0)
+        parts: List[str] = re.findall(r'[0-9]+', TagHelper.__str(value))
+        number: int = int(parts[0]) if len(parts) > 0 else 0
+        count: int = int(parts[1]) if len(parts) > 1 else 0
+        return number, count
+
+    @staticmethod
+    def __read_mp4(tags: Any) -> Tuple[Dict[str, Any], bool]:
+        """
+        Reads the values of all the managed properties from the given M4A tags.
+        :param tags: The object representing the file tags.
+        :type tags: Any
+        :return: A tuple containing the values found by property name and if a cover picture is embedded.
+        :rtype: Tuple[Dict[str, Any], bool]
+        """
+        values: Dict[str, Any] = {}
+        for field, key in TagHelper.MP4_FIELDS.items():
+            if key in tags and len(tags[key]) > 0:
+                values[field] = tags[key][0]
+        if 'disk' in tags and len(tags['disk']) > 0:
+            values['disc'] = tags['disk'][0]
+        if 'trkn' in tags and len(tags['trkn']) > 0:
+            values['track'] = tags['trkn'][0]
+        if 'rtng' in tags and len(tags['rtng']) > 0:
+            values['explicit'] = tags['rtng'][0] == 1
+        return values, 'covr' in tags and len(tags['covr']) > 0
+
+    @staticmethod
+    def __read_id3(tags: Any) -> Tuple[Dict[str, Any], bool]:
+        """
+        Reads the values of all the managed properties from the given ID3 tags, used by MP3 and AIFF files.
+        :param tags: The object representing the file tags.
+        :type tags: Any
+        :return: A tuple containing the values found by property name and if a cover picture is embedded.
+        :rtype: Tuple[Dict[str, Any], bool]
+        """
+        from mutagen.id3 import ID3
+        # AIFF objects wrap the ID3 tags rather than being the tags themselves.
+        frames: Any = tags if isinstance(tags, ID3) else tags.tags
+        if frames is None:
+            return {}, False
+        values: Dict[str, Any] = {}
+        for field, key in TagHelper.ID3_FIELDS.items():
+            found: List[Any] = frames.getall(key)
+            if not found and key == 'TDRC':
+                # Older files may still use the ID3v2.3 frame.
+                found = frames.getall('TYER')
+            if not found:
+                continue
+            if key == 'USLT':
+                values[field] = found[0].text
+            elif key == 'WOAF':
+                values[field] = found[0].url
+            else:
+                values[field] = str(found[0])
+        return values, len(frames.getall('APIC')) > 0
+
+    @staticmethod
+    def __read_vorbis(tags: Any) -> Tuple[Dict[str, Any], bool]:
+        """
+        Reads the values of all the managed properties from the given Vorbis comments, used by FLAC and OGG files.
+        :param tags: The object representing the file tags.
+        :type tags: Any
+        :return: A tuple containing the values found by property name and if a cover picture is embedded.
+        :rtype: Tuple[Dict[str, Any], bool]
+        """
+        values: Dict[str, Any] = {}
+        for field, key in TagHelper.VORBIS_FIELDS.items():
+            if key in tags and len(tags[key]) > 0:
+                values[field] = tags[key][0]
+        # FLAC files store pictures in their own blocks, OGG files as a comment.
+        cover: bool = bool(getattr(tags, 'pictures', None)) or 'metadata_block_picture' in tags
+        return values, cover
+
+    def __fetch_all(self, tags: Any, extension: str) -> None:
+        """
+        Loads all the managed properties from the given tags, so that only missing information gets looked up.
+        :param tags: The object representing the file tags.
+        :type tags: Any
+        :param extension: A string containing the file extension.
+        :type extension: str
+        """
+        if extension == 'm4a':
+            values, cover = TagHelper.__read_mp4(tags)
+        elif extension == 'mp3' or extension == 'aif' or extension == 'aiff':
+            values, cover = TagHelper.__read_id3(tags)
+        else:
+            values, cover = TagHelper.__read_vorbis(tags)
+        # Empty values are the ones written for properties that were not found, treat them as missing.
+        values = {field: value for field, value in values.items() if value != '' and value is not None}
+        if 'title' in values:
+            self.song.set_title(str(values['title']))
+        if 'artist' in values:
+            self.song.set_artist(str(values['artist']))
+        self.song.set_album_artist(values.get('album_artist'))
+        self.song.set_album(values.get('album'))
+        self.song.set_genre(values.get('genre'))
+        self.song.set_composer(values.get('composer'))
+        self.song.set_group(values.get('group'))
+        self.song.set_lyrics(values.get('lyrics'))
+        self.song.set_lyrics_writer(values.get('lyrics_writer'))
+        self.song.set_track_url(values.get('track_url'))
+        self.song.set_album_url(values.get('album_url'))
+        self.song.set_explicit(values.get('explicit', False))
+        # Dates may be complete, only the year is used.
+        year: Optional[Any] = re.match(r'[0-9]{4}', TagHelper.__str(values.get('year')))
+        if year is not None:
+            self.song.set_year(int(year.group(0)))
+        if 'disc' in values:
+            self.song.set_disk(*TagHelper.__parse_position(values['disc']))
+        if 'track' in values:
+            self.song.set_track(*TagHelper.__parse_position(values['track']))
+        self.song.set_cover_embedded(cover)
+
+    def __generate_picture(self) -> Any:
+        """
+        Generates the FLAC picture block representing the song cover image.
+        :return: An instance of the class "Picture" containing the cover image.
+        :rtype: Any
+        """
+        from mutagen.flac import Picture
+        from mutagen.id3 import PictureType
+        with open(self.song.get_cover_path(), 'rb') as cover:
+            # Generate the picture object representing the cover image.
+            picture = Picture()
+            picture.data = cover.read()
+            picture.type = PictureType.COVER_FRONT
+            picture.mime = u'image/jpeg'
+            picture.width = 1000
+            picture.height = 1000
+            picture.depth = 16
+        return picture
+
+    def __get_replaygain(self) -> Dict[str, str]:
+        """
+        Returns the ReplayGain values computed for the song, formatted as expected by players.
+        :return: A dictionary containing the lower case ReplayGain tag names and their values.
+        :rtype: Dict[str, str]
+        """
+        values: Dict[str, str] = {}
+        loudness: Any = self.song.get_loudness()
+        gain: Optional[float] = loudness.get_gain() if loudness is not None else None
+        if gain is not None:
+            values['replaygain_track_gain'] = '%.2f dB' % gain
+            values['replaygain_track_peak'] = '%.6f' % loudness.get_peak()
+        if self.song.get_album_gain() is not None:
+            values['replaygain_album_gain'] = '%.2f dB' % self.song.get_album_gain()
+            values['replaygain_album_peak'] = '%.6f' % self.song.get_album_peak()
+        return values
+
+    def __set_replaygain(self) -> bool:
+        """
+        Sets the ReplayGain values computed for the song into the file tags, tags are not saved.
+        :return: If at least one value has been set will be returned "True".
+        :rtype: bool
+        """
+        from mutagen.mp4 import MP4FreeForm
+        from mutagen.id3 import TXXX
+        values: Dict[str, str] = self.__get_replaygain()
+        if not values:
+            return False
+        tags: Any = self.song.get_tag_object()
+        extension: str = self.song.get_extension()
+        for key, value in values.items():
+            if extension == 'm4a':
+                # Use the freeform atoms written by the other ReplayGain scanners.
+                tags['----:com.apple.iTunes:' + key] = [MP4FreeForm(value.encode('utf-8'))]
+            elif extension == 'mp3' or extension == 'aif' or extension == 'aiff':
+                tags['TXXX:' + key.upper()] = TXXX(encoding=3, desc=key.upper(), text=value)
+            else:
+                tags[key] = [value]
+        return True
+
     def __save_m4a(self) -> None:
         """
         Sets the file tags according to song properties using the format required by M4A files.
         """
+        from mutagen.mp4 import MP4Cover
         tags: Any = self.song.get_tag_object()
         # Set the tags value according to song properties.
         tags['©nam'] = [TagHelper.__str(self.song.get_title())]
@@ -74,6 +342,7 @@ class TagHelper:
         """
         Sets the file tags according to song properties using the ID3 format.
         """
+        from mutagen.id3 import TIT2, TPE1, TPE2, TALB, TYER, TCON, TCOM, WOAF, USLT, TEXT, TPOS, TRCK, APIC, COMM
         tags: Any = self.song.get_tag_object()
         # Set the tags value according to song properties.
         tags['TIT2'] = TIT2(encoding=3, text=TagHelper.__str(self.song.get_title()))
@@ -82,8 +351,8 @@ class TagHelper:
         tags['TALB'] = TALB(encoding=3, text=TagHelper.__str(self.song.get_album()))
         tags['TYER'] = TYER(encoding=3, text=TagHelper.__str(self.song.get_year()))
         tags['TCON'] = TCON(encoding=3, text=TagHelper.__str(self.song.get_genre()))
-        tags['TCOM'] = TCON(encoding=3, text=TagHelper.__str(self.song.get_composer()))
-        tags['WOAF'] = WOAF(encoding=3, text=TagHelper.__str(self.song.get_track_url()))
+        tags['TCOM'] = TCOM(encoding=3, text=TagHelper.__str(self.song.get_composer()))
+        tags['WOAF'] = WOAF(url=TagHelper.__str(self.song.get_track_url()))
         tags['USLT'] = USLT(encoding=3, text=TagHelper.__str(self.song.get_lyrics()))
         tags['TEXT'] = TEXT(encoding=3, text=TagHelper.__str(self.song.get_lyrics_writer()))
         # TODO: Currently not supported song's properties: explicit, album_url, group
@@ -137,19 +406,11 @@ class TagHelper:
         tags['grouping'] = [TagHelper.__str(self.song.get_group())]
         # TODO: Currently not supported song's properties: explicit
         if self.song.get_cover_path() is not None:
-            with open(self.song.get_cover_path(), 'rb') as cover:
-                # Generate the picture object representing the cover image.
-                picture = Picture()
-                picture.data = cover.read()
-                picture.type = PictureType.COVER_FRONT
-                picture.mime = u'image/jpeg'
-                picture.width = 1000
-                picture.height = 1000
-                picture.depth = 16
-                # Remove all the pictures from this file.
-                tags.clear_pictures()
-                # Add the picture that has been found.
-                tags.add_picture(picture)
+            picture: Any = self.__generate_picture()
+            # Remove all the pictures from this file.
+            tags.clear_pictures()
+            # Add the picture that has been found.
+            tags.add_picture(picture)
         if Config.Config.get_watermark():
             # Add the application watermark.
             tags['comment'] = [Config.Config.get_watermark_text()]
@@ -224,17 +485,31 @@ class TagHelper:
         path: str = song.get_path()
         if not extension or not path:
             return None
+        # Mutagen modules are imported on first use, loading all the formats would slow start-up down.
+        import mutagen
         if extension == 'm4a':
             # Generate the object to process some MPEG based files such as Apple ALAC.
+            from mutagen.mp4 import MP4
             return MP4(path)
         if extension == 'mp3':
-            # Generate the object to process MP3 and similar formats.
-            return ID3(path)
+            # Generate the object to process MP3 and similar formats, the stream information is read along with the
+            # tags so that the duration is known without parsing the file again.
+            from mutagen.mp3 import MP3
+            from mutagen.id3 import ID3NoHeaderError
+            audio: Any = MP3(path)
+            if audio.tags is None:
+                raise ID3NoHeaderError(path + ' doesn\'t start with an ID3 tag')
+            song.set_duration(audio.info.length)
+            # Tags read through the file object don't know their file, it is required in order to save them.
+            audio.tags.filename = path
+            return audio.tags
         elif extension == 'flac':
             # Generate the object to process FLAC encoded files.
+            from mutagen.flac import FLAC
             return FLAC(path)
         elif extension == 'aif' or extension == 'aiff':
             # Generate the object to process AIFF encoded files.
+            from mutagen.aiff import AIFF
             return AIFF(path)
         elif extension == 'ogg':
             # Generate the object to process OGG files.
@@ -276,6 +551,12 @@ class TagHelper:
             raise ValueError('No song has been defined.')
         tags: Any = self.song.get_tag_object()
         extension: str = self.song.get_extension()
+        if extension not in TagHelper.SUPPORTED_FORMATS:
+            raise ValueError('Unsupported file type.')
+        if Config.Config.get_fill_missing():
+            # Existing information must be known in order to look up only what is missing.
+            self.__fetch_all(tags, extension)
+            return
         # Load the song title and artists required to build the search query used by iTunes API and lyrics look up.
         if extension == 'm4a':
             if '©nam' in tags and len(tags['©nam']) > 0:
@@ -305,6 +586,115 @@ class TagHelper:
         else:
             raise ValueError('Unsupported file type.')
 
+    def get_ffmpeg_metadata(self, conversion_format: str) -> Dict[str, str]:
+        """
+        Returns the song properties as metadata entries that ffmpeg can embed while converting the file.
+        :param conversion_format: A string containing the format the song is going to be converted into.
+        :type conversion_format: str
+        :return: A dictionary containing the metadata keys and values, cover is included for OGG files only, properties
+        ffmpeg cannot map are left to "save_unmapped".
+        :rtype: Dict[str, str]
+        :raise ValueError: If no song has been defined.
+        """
+        if self.song is None:
+            raise ValueError('No song has been defined.')
+        disc: str = ''
+        if self.song.get_disc_number() > 0 and self.song.get_disc_count() > 0:
+            disc = TagHelper.__str(self.song.get_disc_number()) + '/' + TagHelper.__str(self.song.get_disc_count())
+        track: str = ''
+        if self.song.get_track_number() > 0 and self.song.get_track_count() > 0:
+            track = TagHelper.__str(self.song.get_track_number()) + '/' + TagHelper.__str(self.song.get_track_count())
+        if conversion_format == 'flac' or conversion_format == 'ogg':
+            # Vorbis comments are written as they are, use the same names used when saving tags.
+            metadata: Dict[str, str] = {
+                'title': TagHelper.__str(self.song.get_title()),
+                'artist': TagHelper.__str(self.song.get_artist()),
+                'albumartist': TagHelper.__str(self.song.get_album_artist()),
+                'album': TagHelper.__str(self.song.get_album()),
+                'year': TagHelper.__str(self.song.get_year()),
+                'genre': TagHelper.__str(self.song.get_genre()),
+                'composer': TagHelper.__str(self.song.get_composer()),
+                'wwwaudiofile': TagHelper.__str(self.song.get_track_url()),
+                'wwwartist': TagHelper.__str(self.song.get_album_url()),
+                'discnumber': disc,
+                'tracknumber': track,
+                'lyrics': TagHelper.__str(self.song.get_lyrics()),
+                'lyricist': TagHelper.__str(self.song.get_lyrics_writer()),
+                'grouping': TagHelper.__str(self.song.get_group())
+            }
+            if conversion_format == 'ogg' and self.song.get_cover_path() is not None:
+                # ffmpeg cannot attach pictures to OGG files, the picture block must be passed as a comment.
+                picture: Any = self.__generate_picture()
+                metadata['METADATA_BLOCK_PICTURE'] = base64.b64encode(picture.write()).decode('ascii')
+        else:
+            # Generic keys are mapped by ffmpeg to the right atoms or frames according to the container.
+            metadata: Dict[str, str] = {
+                'title': TagHelper.__str(self.song.get_title()),
+                'artist': TagHelper.__str(self.song.get_artist()),
+                'album_artist': TagHelper.__str(self.song.get_album_artist()),
+                'album': TagHelper.__str(self.song.get_album()),
+                'date': TagHelper.__str(self.song.get_year()),
+                'genre': TagHelper.__str(self.song.get_genre()),
+                'composer': TagHelper.__str(self.song.get_composer()),
+                'disc': disc,
+                'track': track
+            }
+            if conversion_format == 'm4a' or conversion_format == 'alac':
+                metadata['lyrics'] = TagHelper.__str(self.song.get_lyrics())
+                metadata['grouping'] = TagHelper.__str(self.song.get_group())
+            else:
+                # ffmpeg would write lyrics as a "TXXX" frame, they are saved as "USLT" by "save_unmapped" instead.
+                # Keys named after ID3 text frames are written by ffmpeg as they are.
+                metadata['TEXT'] = TagHelper.__str(self.song.get_lyrics_writer())
+        if Config.Config.get_watermark():
+            # Add the application watermark.
+            metadata['comment'] = Config.Config.get_watermark_text()
+        return {key: value for key, value in metadata.items() if value}
+
+    def get_duration(self) -> Optional[float]:
+        """
+        Returns the duration of the audio file defined.
+        :return: A floating point number representing the duration in seconds or None if it cannot be determined.
+        :rtype: Optional[float]
+        :raise ValueError: If no song has been defined.
+        """
+        if self.song is None:
+            raise ValueError('No song has been defined.')
+        # The duration of MP3 files is recorded when their tags are read, ID3 objects carry no stream information.
+        info: Any = getattr(self.song.get_tag_object(), 'info', None)
+        if info is None:
+            return None
+        return info.length
+
+    def backup(self, path: str) -> None:
+        """
+        Writes all the tags currently embedded in the audio file into a JSON file, audio data is not included.
+        :param path: A string containing the path to the JSON file to generate.
+        :type path: str
+        :raise ValueError: If no song has been defined.
+        """
+        if self.song is None:
+            raise ValueError('No song has been defined.')
+        tags: Any = self.song.get_tag_object()
+        data: Dict[str, Any] = {}
+        for key in tags.keys():
+            data[key] = TagHelper.__serialize(tags[key])
+        # FLAC files store pictures outside of the Vorbis comment block.
+        pictures: Any = getattr(tags, 'pictures', None)
+        if pictures:
+            data['pictures'] = [TagHelper.__serialize(picture) for picture in pictures]
+        extension: str = self.song.get_extension()
+        if extension == 'mp3' or extension == 'aif' or extension == 'aiff':
+            # Frames are only stored in their readable version, the tag is kept as written in order to be restored.
+            block: Optional[bytes] = TagHelper.__read_id3_block(self.song.get_path(), extension)
+            if block is not None:
+                data['id3'] = base64.b64encode(block).decode('ascii')
+        directory: str = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, 0o777, True)
+        with open(path, 'w', encoding='utf-8') as backup:
+            json.dump(data, backup, ensure_ascii=False, indent=4)
+
     def save(self) -> None:
         """
         Sets the file tags according to song properties.
@@ -312,6 +702,9 @@ class TagHelper:
         if self.song is None:
             raise ValueError('No song has been defined.')
         extension: str = self.song.get_extension()
+        start: float = time.monotonic()
+        # ReplayGain values are written along with the other tags, if the song has been analyzed.
+        self.__set_replaygain()
         if extension == 'm4a':
             self.__save_m4a()
         elif extension == 'mp3':
@@ -324,3 +717,39 @@ class TagHelper:
             self.__save_ogg()
         else:
             raise ValueError('Unsupported file type.')
+        Metrics.Metrics.record('tag_save', time.monotonic() - start, None, {'format': extension})
+
+    def save_unmapped(self) -> None:
+        """
+        Writes the properties ffmpeg cannot embed while converting, along with the ReplayGain values, if computed.
+        Lyrics and track URL need frames of their own in ID3 tags, the explicit flag is an atom ffmpeg does not know.
+        :raise ValueError: If no song has been defined.
+        """
+        from mutagen.id3 import WOAF, USLT
+        if self.song is None:
+            raise ValueError('No song has been defined.')
+        extension: str = self.song.get_extension()
+        tags: Any = self.song.get_tag_object()
+        changed: bool = self.__set_replaygain()
+        if extension == 'mp3' or extension == 'aif' or extension == 'aiff':
+            if self.song.get_lyrics():
+                tags['USLT'] = USLT(encoding=3, text=TagHelper.__str(self.song.get_lyrics()))
+                changed = True
+            if self.song.get_track_url():
+                tags['WOAF'] = WOAF(url=TagHelper.__str(self.song.get_track_url()))
+                changed = True
+        elif extension == 'm4a':
+            tags['rtng'] = [1 if self.song.get_explicit() else 2]
+            changed = True
+        if changed:
+            tags.save()
+
+    def save_replaygain(self) -> None:
+        """
+        Writes the ReplayGain values computed for the song leaving all the other tags untouched.
+        :raise ValueError: If no song has been defined.
+        """
+        if self.song is None:
+            raise ValueError('No song has been defined.')
+        if self.__set_replaygain():
+            self.song.get_tag_object().save()
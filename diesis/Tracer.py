@@ -0,0 +1,114 @@
+from typing import Optional, Dict, Any, List, Set
+from diesis import Config, Logger
+import threading
+import json
+import time
+import os
+
+
+class Tracer:
+    # Number of events kept in memory before being appended to the trace file.
+    BUFFER_SIZE: int = 1000
+
+    __events: List[str] = []
+    __threads: Set[int] = set()
+    __file: Any = None
+    __written: int = 0
+    __failed: bool = False
+    __origin: float = time.monotonic()
+    __lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """
+        Returns if spans are being recorded, a trace file must be defined.
+        :return: If tracing is enabled will be returned "True".
+        :rtype: bool
+        """
+        return bool(Config.Config.get_trace_file()) and not Tracer.__failed
+
+    @staticmethod
+    def __write(events: List[str]) -> None:
+        """
+        Appends the given events to the trace file, the file is opened on first write.
+        :param events: A list containing the events encoded as JSON objects.
+        :type events: List[str]
+        """
+        try:
+            if Tracer.__file is None:
+                Tracer.__file = open(Config.Config.get_trace_file(), 'w', encoding='utf-8')
+                Tracer.__file.write('[\n')
+            for event in events:
+                # Events are comma separated, the trace stays readable even if the closing bracket is missing.
+                Tracer.__file.write((',\n' if Tracer.__written else '') + event)
+                Tracer.__written += 1
+        except OSError as ex:
+            Tracer.__failed = True
+            Logger.Logger.log_error(str(ex))
+            Logger.Logger.log_error('Unable to write trace file: ' + Config.Config.get_trace_file())
+
+    @staticmethod
+    def record(name: str, start: float, args: Optional[Dict[str, Any]] = None, category: str = 'stage') -> None:
+        """
+        Records a span that started at the given time and ends now, the span is bound to the calling thread.
+        :param name: A string containing the span name, such as "itunes_request" or "conversion".
+        :type name: str
+        :param start: A floating point number representing the start time as returned by "time.monotonic".
+        :type start: float
+        :param args: A dictionary containing details shown along with the span, such as the URL requested.
+        :type args: Optional[Dict[str, Any]]
+        :param category: A string containing the span category, such as "file", "stage" or "http".
+        :type category: str
+        """
+        if not Tracer.is_enabled():
+            return
+        end: float = time.monotonic()
+        thread: threading.Thread = threading.current_thread()
+        # Spans carry the log context fields, such as the file being processed, even in worker threads.
+        fields: Dict[str, Any] = dict(Logger.Logger.get_context())
+        if args:
+            fields.update(args)
+        event: Dict[str, Any] = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round((start - Tracer.__origin) * 1000000, 1),
+            'dur': round((end - start) * 1000000, 1),
+            'pid': os.getpid(),
+            'tid': thread.ident,
+            'args': fields
+        }
+        with Tracer.__lock:
+            if thread.ident not in Tracer.__threads:
+                # Name the thread once so that workers can be told apart in the viewer.
+                Tracer.__threads.add(thread.ident)
+                Tracer.__events.append(json.dumps({
+                    'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': thread.ident,
+                    'args': {'name': thread.name}
+                }))
+            Tracer.__events.append(json.dumps(event, ensure_ascii=False, default=str))
+            if len(Tracer.__events) >= Tracer.BUFFER_SIZE:
+                Tracer.__write(Tracer.__events)
+                Tracer.__events = []
+
+    @staticmethod
+    def close() -> None:
+        """
+        Writes the buffered events and completes the trace file, it can be loaded in chrome://tracing or Perfetto.
+        """
+        if not Config.Config.get_trace_file():
+            return
+        with Tracer.__lock:
+            if Tracer.__events and not Tracer.__failed:
+                Tracer.__write(Tracer.__events)
+            Tracer.__events = []
+            Tracer.__threads = set()
+            if Tracer.__file is None:
+                return
+            try:
+                Tracer.__file.write('\n]\n')
+                Tracer.__file.close()
+            except OSError as ex:
+                Logger.Logger.log_error(str(ex))
+            Tracer.__file = None
+            Tracer.__written = 0
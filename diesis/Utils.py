@@ -1,7 +1,15 @@
 from typing import Any
+import unicodedata
+import re
 
 
 class Utils:
+    # Version tags naming the same recording, other texts in brackets, such as "(Live)" or "(Part 2)", tell songs apart.
+    VERSION_TAGS: str = (
+        r'[(\[][^)\]]*\bremaster(?:ed)?\b[^)\]]*[)\]]|[(\[]\s*radio\s+edit\s*[)\]]|'
+        r'[(\[]\s*(?:feat|ft)\.?\s[^)\]]*[)\]]|\s-\s[^-]*\bremaster(?:ed)?\b[^-]*$'
+    )
+
     @staticmethod
     def str(value: Any) -> str:
         """
@@ -14,3 +22,24 @@ class Utils:
         if value is None:
             return ''
         return str(value)
+
+    @staticmethod
+    def normalize(value: Any) -> str:
+        """
+        Normalizes a song title or artist name so that different spellings of the same song produce the same string.
+        :param value: The title or the artist name to normalize.
+        :type value: Any
+        :return: The lower case string without accents, punctuation and version tags, such as "(Remastered)".
+        :rtype: str
+        """
+        value = Utils.str(value).lower()
+        # Decompose accented letters and drop their marks.
+        value = unicodedata.normalize('NFKD', value)
+        value = ''.join([character for character in value if not unicodedata.combining(character)])
+        # Drop remasters, radio edits and featured artists.
+        value = re.sub(Utils.VERSION_TAGS, ' ', value)
+        value = re.sub(r'\s(feat|ft)\.?\s.*$', ' ', value)
+        value = value.replace('&', ' and ')
+        value = re.sub(r'[\'\u2019]', '', value)
+        value = re.sub(r'[^\w\s]', ' ', value)
+        return ' '.join(value.split())
@@ -1,40 +1,22 @@
 from diesis.scrapers import LyricsScraper
-from urllib import parse, request
-from urllib.error import HTTPError
-from http.client import RemoteDisconnected
+from urllib import parse
 from bs4 import BeautifulSoup
-from diesis import Config, Logger
+from diesis import Config, Logger, HttpClient
 from typing import Tuple, Optional
 
 
 class AZLyrics(LyricsScraper.LyricsScraper):
-    def __search(self, minimal: bool = False) -> str:
+    @staticmethod
+    def __find_link(contents: str) -> str:
         """
-        Finds the URL where the song lyrics is available at based on the song's query string.
-        :param minimal: If set to "True", a shorter version of the song query will be used instead of the complete one.
-        :type minimal: bool
+        Finds the link to the lyrics page among the search results.
+        :param contents: A string containing the search results page.
+        :type contents: str
         :return: A string containing the URL found, if no URL is found, and empty string will be returned instead.
         :rtype: str
-        :raise ValueError: If no search query has been defined for current song.
         """
-        query: str = self.get_query(minimal)
-        if not query:
-            raise ValueError('No query defined for this song.')
-        query = parse.quote(query)
-        url: str = 'https://search.azlyrics.com/search.php?q=' + query
-        try:
-            # Send the request to the provider website.
-            req = request.Request(url, headers={
-                'User-Agent': Config.Config.get_user_agent()
-            })
-            response = request.urlopen(req)
-            contents: str = response.read().decode('utf-8')
-        except (HTTPError, RemoteDisconnected, TimeoutError) as ex:
-            Logger.Logger.log_error(str(ex))
-            Logger.Logger.log_error('Request failed for URL: ' + url)
-            return ''
-        # Parse the HTML page loaded.
-        document: BeautifulSoup = BeautifulSoup(contents, 'html.parser')
+        # Parse the results table only.
+        document: BeautifulSoup = LyricsScraper.LyricsScraper.parse(contents, 'table', 'table-condensed')
         main = document.select_one('table.table-condensed')
         if main is None:
             return ''
@@ -48,31 +30,16 @@ class AZLyrics(LyricsScraper.LyricsScraper):
         return result.get('href').strip()
 
     @staticmethod
-    def __load(url: str) -> Tuple[Optional[str], Optional[str]]:
+    def __extract(contents: str) -> Tuple[Optional[str], Optional[str]]:
         """
-        Extracts the song lyrics from the page that has been found in look up phase, then it will return it as a string.
-        :param url: A string containing the URL where the song lyrics is located at.
-        :type url: str
+        Extracts the song lyrics and its author(s) from the lyrics page.
+        :param contents: A string containing the lyrics page.
+        :type contents: str
         :return: A tuple containing both the lyrics and its author(s) or both None if no lyrics is found.
         :rtype: Tuple[Optional[str], Optional[str]]
-        :raise ValueError: If an empty URL is given.
         """
-        if not str:
-            raise ValueError('URL cannot be empty.')
-        try:
-            # Send the request to the page.
-            req = request.Request(url, headers={
-                'User-Agent': Config.Config.get_user_agent()
-            })
-            response = request.urlopen(req)
-            # Load the HTML page contents.
-            contents: str = response.read().decode('utf-8')
-        except (HTTPError, RemoteDisconnected, TimeoutError) as ex:
-            Logger.Logger.log_error(str(ex))
-            Logger.Logger.log_error('Request failed for URL: ' + url)
-            return None, None
-        # Parse the HTML page.
-        document: BeautifulSoup = BeautifulSoup(contents, 'html.parser')
+        # Parse the main block only, it contains both the lyrics and their authors.
+        document: BeautifulSoup = LyricsScraper.LyricsScraper.parse(contents, 'div', 'main-page')
         main = document.select_one('div.main-page')
         if main is None:
             return None, None
@@ -95,15 +62,58 @@ class AZLyrics(LyricsScraper.LyricsScraper):
             return lyrics, lyrics_writer
         return None, None
 
+    def __search(self, minimal: bool = False) -> str:
+        """
+        Finds the URL where the song lyrics is available at based on the song's query string.
+        :param minimal: If set to "True", a shorter version of the song query will be used instead of the complete one.
+        :type minimal: bool
+        :return: A string containing the URL found, if no URL is found, and empty string will be returned instead.
+        :rtype: str
+        :raise ValueError: If no search query has been defined for current song.
+        """
+        query: str = self.get_query(minimal)
+        if not query:
+            raise ValueError('No query defined for this song.')
+        query = parse.quote(query)
+        url: str = 'https://search.azlyrics.com/search.php?q=' + query
+        # Send the request to the provider website, the download stops once search results have been received.
+        contents: Optional[str] = HttpClient.HttpClient.fetch(url, 'table', 'table-condensed')
+        if contents is None:
+            self.failed = True
+            return ''
+        return AZLyrics.__find_link(contents)
+
+    def __load(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Extracts the song lyrics from the page that has been found in look up phase, then it will return it as a string.
+        :param url: A string containing the URL where the song lyrics is located at.
+        :type url: str
+        :return: A tuple containing both the lyrics and its author(s) or both None if no lyrics is found.
+        :rtype: Tuple[Optional[str], Optional[str]]
+        :raise ValueError: If an empty URL is given.
+        """
+        if not str:
+            raise ValueError('URL cannot be empty.')
+        # Load the HTML page contents, the download stops once the lyrics have been received.
+        contents: Optional[str] = HttpClient.HttpClient.fetch(url, 'div', 'main-page')
+        if contents is None:
+            self.failed = True
+            return None, None
+        return AZLyrics.__extract(contents)
+
     def fetch(self) -> None:
         """
         Searches and fetches the lyrics for the song defined.
         """
         lyrics: Tuple[Optional[str], Optional[str]] = (None, None)
+        self.failed = False
         if self.query is not None:
             # If a search query for this song has been defined, search the lyrics using it.
             alternative: bool = False
             url: str = self.__search(False)
+            if self.cancelled:
+                # Another provider has already returned the lyrics.
+                return
             if not url and self.minimal_query is not None and not Config.Config.get_strict_lyrics():
                 # If no lyrics has been found using the normal search query, retry using a shorter and simpler one.
                 Logger.Logger.log('No lyrics found using full song name, retrying using a shorter version...')
@@ -112,17 +122,17 @@ class AZLyrics(LyricsScraper.LyricsScraper):
                 url = self.__search(True)
                 if not url:
                     Logger.Logger.log('No lyrics found in anyway.')
-            if url:
-                lyrics = AZLyrics.__load(url)
-                if not lyrics and not alternative and not Config.Config.get_strict_lyrics():
+            if url and not self.cancelled:
+                lyrics = self.__load(url)
+                if not lyrics and not alternative and not Config.Config.get_strict_lyrics() and not self.cancelled:
                     if self.minimal_query is not None:
                         # Lyrics were found but its page was empty, retry searching it using the shorter query version.
                         Logger.Logger.log('No lyrics found using full song name, retrying using a shorter version...')
                         # Repeat the search telling the method to use the shorter query version.
                         url = self.__search(True)
-                        if url:
+                        if url and not self.cancelled:
                             # Try again to fetch the song lyrics.
-                            lyrics = AZLyrics.__load(url)
+                            lyrics = self.__load(url)
                         else:
                             Logger.Logger.log('No lyrics found in anyway.')
         self.lyrics = lyrics[0]
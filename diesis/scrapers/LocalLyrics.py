@@ -0,0 +1,221 @@
+from diesis.scrapers import LyricsScraper
+from diesis import Config, Logger, Utils
+from typing import Optional, Dict, Any, List
+import threading
+import json
+import os
+import re
+
+
+class LocalLyrics(LyricsScraper.LyricsScraper):
+    EXTENSIONS: List[str] = ['.lrc', '.txt']
+    INDEX_FILENAME: str = '.diesis_lyrics_index.json'
+    INDEX_VERSION: int = 1
+    # Header lines of LRC files, other lines in brackets, such as "[Chorus: Artist]", are part of the lyrics.
+    LRC_HEADER: str = r'^\s*\[(?:ar|ti|al|au|by|offset|length|re|ve):.*\]\s*$'
+
+    artist: str = None
+    title: str = None
+
+    __index: Optional[Dict[str, str]] = None
+    __lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def __get_key(artist: Any, title: Any) -> Optional[str]:
+        """
+        Generates the key used to look up the lyrics of a song in the index.
+        :param artist: The song artist.
+        :type artist: Any
+        :param title: The song title.
+        :type title: Any
+        :return: A string containing the normalized artist and title or None if any of them is missing.
+        :rtype: Optional[str]
+        """
+        artist = Utils.Utils.normalize(artist)
+        title = Utils.Utils.normalize(title)
+        if not artist or not title:
+            return None
+        return artist + '\t' + title
+
+    @staticmethod
+    def __read_key(path: str, relative_path: str) -> Optional[str]:
+        """
+        Finds out the song the given lyrics file belongs to, LRC headers are preferred over the file name.
+        :param path: A string containing the path to the lyrics file.
+        :type path: str
+        :param relative_path: A string containing the path to the file relative to the lyrics directory.
+        :type relative_path: str
+        :return: A string containing the index key or None if the song cannot be determined.
+        :rtype: Optional[str]
+        """
+        name: str = os.path.splitext(os.path.basename(relative_path))[0]
+        if path.lower().endswith('.lrc'):
+            try:
+                with open(path, 'r', encoding='utf-8-sig', errors='replace') as file:
+                    contents: str = file.read()
+            except OSError as ex:
+                Logger.Logger.log_error(str(ex))
+                return None
+            artist: Any = re.search(r'^\s*\[ar:(.*)\]\s*$', contents, re.M | re.I)
+            title: Any = re.search(r'^\s*\[ti:(.*)\]\s*$', contents, re.M | re.I)
+            if artist is not None and title is not None:
+                return LocalLyrics.__get_key(artist.group(1), title.group(1))
+        if ' - ' in name:
+            # Files are usually named as "Artist - Title".
+            parts: List[str] = name.split(' - ', 1)
+            return LocalLyrics.__get_key(parts[0], parts[1])
+        # Otherwise files are expected to be grouped by artist, such as "Artist/Title.lrc".
+        return LocalLyrics.__get_key(os.path.basename(os.path.dirname(relative_path)), name)
+
+    @staticmethod
+    def __load_index(path: str) -> Dict[str, List[Any]]:
+        """
+        Loads the index saved by a previous run.
+        :param path: A string containing the path to the index file.
+        :type path: str
+        :return: A dictionary containing modification time, size and key of each file by relative path.
+        :rtype: Dict[str, List[Any]]
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data: Any = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if type(data) is not dict or data.get('version') != LocalLyrics.INDEX_VERSION:
+            return {}
+        files: Any = data.get('files')
+        return files if type(files) is dict else {}
+
+    @staticmethod
+    def __save_index(path: str, files: Dict[str, List[Any]]) -> None:
+        """
+        Saves the index so that the next runs only have to read new and changed files.
+        :param path: A string containing the path to the index file.
+        :type path: str
+        :param files: A dictionary containing modification time, size and key of each file by relative path.
+        :type files: Dict[str, List[Any]]
+        """
+        tmp_path: str = path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': LocalLyrics.INDEX_VERSION, 'files': files}, file, ensure_ascii=False)
+            # Replace the previous index at once, an interrupted run cannot leave it truncated.
+            os.replace(tmp_path, path)
+        except OSError as ex:
+            Logger.Logger.log_error(str(ex))
+            Logger.Logger.log_error('Unable to save the lyrics index: ' + path)
+
+    @staticmethod
+    def __build_index(directory: str) -> Dict[str, str]:
+        """
+        Scans the lyrics directory and refreshes the saved index, only new and changed files are read.
+        :param directory: A string containing the path to the lyrics directory.
+        :type directory: str
+        :return: A dictionary containing the path to the lyrics file of each song by index key.
+        :rtype: Dict[str, str]
+        """
+        index_path: str = os.path.join(directory, LocalLyrics.INDEX_FILENAME)
+        previous: Dict[str, List[Any]] = LocalLyrics.__load_index(index_path)
+        files: Dict[str, List[Any]] = {}
+        changed: bool = False
+        for root, directories, filenames in os.walk(directory):
+            directories.sort()
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() not in LocalLyrics.EXTENSIONS:
+                    continue
+                path: str = os.path.join(root, filename)
+                relative_path: str = os.path.relpath(path, directory)
+                try:
+                    stat: os.stat_result = os.stat(path)
+                except OSError:
+                    continue
+                entry: Optional[List[Any]] = previous.get(relative_path)
+                if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                    # The file has not changed since it was indexed.
+                    files[relative_path] = entry
+                    continue
+                files[relative_path] = [stat.st_mtime_ns, stat.st_size, LocalLyrics.__read_key(path, relative_path)]
+                changed = True
+        if changed or len(files) != len(previous):
+            LocalLyrics.__save_index(index_path, files)
+        index: Dict[str, str] = {}
+        for relative_path, entry in files.items():
+            # Keep the first file found whenever the same song has several lyrics files.
+            if entry[2] is not None and entry[2] not in index:
+                index[entry[2]] = os.path.join(directory, relative_path)
+        return index
+
+    @staticmethod
+    def get_index() -> Dict[str, str]:
+        """
+        Returns the index of the configured lyrics directory, the directory is scanned on first use.
+        :return: A dictionary containing the path to the lyrics file of each song by index key.
+        :rtype: Dict[str, str]
+        """
+        with LocalLyrics.__lock:
+            if LocalLyrics.__index is None:
+                directory: Optional[str] = Config.Config.get_lyrics_directory()
+                LocalLyrics.__index = LocalLyrics.__build_index(directory) if directory else {}
+            return LocalLyrics.__index
+
+    @staticmethod
+    def __clean(contents: str, lrc: bool) -> Optional[str]:
+        """
+        Removes timestamps and headers from the given LRC lyrics, plain text lyrics are returned as they are.
+        :param contents: A string containing the file contents.
+        :type contents: str
+        :param lrc: If set to "True" the contents are handled as LRC lyrics, otherwise as plain text.
+        :type lrc: bool
+        :return: A string containing the lyrics or None if the file contains no lyrics.
+        :rtype: Optional[str]
+        """
+        if not lrc:
+            lyrics: str = contents.strip()
+            return lyrics if lyrics else None
+        lines: List[str] = []
+        for line in contents.splitlines():
+            if re.match(LocalLyrics.LRC_HEADER, line, re.I):
+                # Header lines, such as "[ar:Artist]", are not part of the lyrics.
+                continue
+            lines.append(re.sub(r'\[[0-9]+:[0-9]+(?:[.:][0-9]+)?\]|<[0-9]+:[0-9]+(?:[.:][0-9]+)?>', '', line).strip())
+        lyrics = '\n'.join(lines).strip()
+        return lyrics if lyrics else None
+
+    def set_song(self, artist: str, title: str) -> None:
+        """
+        Sets the song whose lyrics must be looked up, local files are matched by artist and title.
+        :param artist: A string containing the song artist.
+        :type artist: str
+        :param title: A string containing the song title.
+        :type title: str
+        """
+        self.artist = artist
+        self.title = title
+
+    def fetch(self) -> None:
+        """
+        Looks up the lyrics of the song defined in the configured lyrics directory.
+        """
+        self.lyrics = None
+        self.lyrics_writer = None
+        self.failed = False
+        key: Optional[str] = LocalLyrics.__get_key(self.artist, self.title)
+        if key is None:
+            return
+        path: Optional[str] = LocalLyrics.get_index().get(key)
+        if path is None:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8-sig', errors='replace') as file:
+                contents: str = file.read()
+        except OSError as ex:
+            Logger.Logger.log_error(str(ex))
+            return
+        lrc: bool = path.lower().endswith('.lrc')
+        self.lyrics = LocalLyrics.__clean(contents, lrc)
+        if not lrc:
+            return
+        # LRC files may contain the author of the lyrics as well.
+        writer: Any = re.search(r'^\s*\[au:(.*)\]\s*$', contents, re.M | re.I)
+        if writer is not None and writer.group(1).strip():
+            self.lyrics_writer = writer.group(1).strip()
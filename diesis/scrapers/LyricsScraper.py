@@ -1,4 +1,7 @@
-from typing import Optional
+from typing import Optional, Any, Pattern
+from diesis import Config
+import importlib.util
+import re
 
 
 class LyricsScraper:
@@ -6,6 +9,47 @@ class LyricsScraper:
     minimal_query: str = None
     lyrics: str = None
     lyrics_writer: str = None
+    cancelled: bool = False
+    failed: bool = False
+
+    __parser: Optional[str] = None
+
+    @staticmethod
+    def get_parser() -> str:
+        """
+        Returns the name of the parser BeautifulSoup should use, lxml is preferred when installed unless configured.
+        :return: A string containing the parser name.
+        :rtype: str
+        """
+        if LyricsScraper.__parser is None:
+            parser: str = Config.Config.get_html_parser()
+            if parser == 'auto':
+                # lxml is written in C and parses pages several times faster than the built-in parser.
+                parser = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+            LyricsScraper.__parser = parser
+        return LyricsScraper.__parser
+
+    @staticmethod
+    def parse(contents: str, tag: str, class_name: Any) -> Any:
+        """
+        Parses the given HTML page keeping only the elements having the given name and CSS class, and their children.
+        :param contents: A string containing the HTML page.
+        :type contents: str
+        :param tag: A string containing the name of the elements to keep.
+        :type tag: str
+        :param class_name: A string containing the CSS class of the elements to keep, or a list of alternative classes.
+        :type class_name: Any
+        :return: An instance of the class "BeautifulSoup" representing the parsed document.
+        :rtype: Any
+        """
+        # BeautifulSoup is imported on first use only, the local lyrics directory and the cache don't need it.
+        from bs4 import BeautifulSoup, SoupStrainer
+        if type(class_name) is str:
+            class_name = [class_name]
+        # Attributes are not split into classes yet while parsing, match any of the classes in the whole value.
+        pattern: Pattern = re.compile(r'(^|\s)(' + '|'.join([re.escape(name) for name in class_name]) + r')(\s|$)')
+        # Only the given subtree is built, the rest of the page is skipped.
+        return BeautifulSoup(contents, LyricsScraper.get_parser(), parse_only=SoupStrainer(tag, class_=pattern))
 
     def set_query(self, query: str, minimal_query: str) -> None:
         """
@@ -49,3 +93,25 @@ class LyricsScraper:
         :rtype: Optional[str]
         """
         return self.lyrics_writer
+
+    def cancel(self) -> None:
+        """
+        Asks the scraper to stop, no further requests are sent once the current one completes.
+        """
+        self.cancelled = True
+
+    def is_cancelled(self) -> bool:
+        """
+        Returns if the scraper has been asked to stop.
+        :return: If the scraper has been cancelled will be returned "True".
+        :rtype: bool
+        """
+        return self.cancelled
+
+    def has_failed(self) -> bool:
+        """
+        Returns if a request to the provider failed during the last lookup, finding no lyrics is not a failure.
+        :return: If a request failed will be returned "True".
+        :rtype: bool
+        """
+        return self.failed
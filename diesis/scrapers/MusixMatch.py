@@ -1,41 +1,22 @@
 from diesis.scrapers import LyricsScraper
-from urllib import parse, request
-from urllib.error import HTTPError
-from http.client import RemoteDisconnected
+from urllib import parse
 from bs4 import BeautifulSoup
-from diesis import Config, Logger
+from diesis import Config, Logger, HttpClient
 from typing import Tuple, Optional
 
 
 class MusixMatch(LyricsScraper.LyricsScraper):
-    def __search(self, minimal: bool = False) -> str:
+    @staticmethod
+    def __find_link(contents: str) -> str:
         """
-        Finds the URL where the song lyrics is available at based on the song's query string.
-        :param minimal: If set to "True", a shorter version of the song query will be used instead of the complete one.
-        :type minimal: bool
+        Finds the link to the lyrics page among the search results.
+        :param contents: A string containing the search results page.
+        :type contents: str
         :return: A string containing the URL found, if no URL is found, and empty string will be returned instead.
         :rtype: str
-        :raise ValueError: If no search query has been defined for current song.
         """
-        query: str = self.get_query(minimal)
-        if not query:
-            raise ValueError('No query defined for this song.')
-        query = parse.quote(query)
-        query = query.replace('%28', '(').replace('%29', ')')
-        url: str = 'https://www.musixmatch.com/it/search/' + query
-        try:
-            # Send the request to the provider website.
-            req = request.Request(url, headers={
-                'User-Agent': Config.Config.get_user_agent()
-            })
-            response = request.urlopen(req)
-            contents: str = response.read().decode('utf-8')
-        except (HTTPError, RemoteDisconnected, TimeoutError) as ex:
-            Logger.Logger.log_error(str(ex))
-            Logger.Logger.log_error('Request failed for URL: ' + url)
-            return ''
-        # Parse the HTML page loaded.
-        document = BeautifulSoup(contents, 'html.parser')
+        # Parse the results panel only.
+        document: BeautifulSoup = LyricsScraper.LyricsScraper.parse(contents, 'div', 'main-panel')
         main = document.select_one('div.main-panel')
         if main is None:
             return ''
@@ -50,31 +31,18 @@ class MusixMatch(LyricsScraper.LyricsScraper):
         return 'https://www.musixmatch.com' + link.get('href')
 
     @staticmethod
-    def __load(url: str) -> Tuple[Optional[str], Optional[str]]:
+    def __extract(contents: str) -> Tuple[Optional[str], Optional[str]]:
         """
-        Extracts the song lyrics from the page that has been found in look up phase, then it will return it as a string.
-        :param url: A string containing the URL where the song lyrics is located at.
-        :type url: str
+        Extracts the song lyrics and its author(s) from the lyrics page.
+        :param contents: A string containing the lyrics page.
+        :type contents: str
         :return: A tuple containing both the lyrics and its author(s) or both None if no lyrics is found.
         :rtype: Tuple[Optional[str], Optional[str]]
-        :raise ValueError: If an empty URL is given.
         """
-        if not str:
-            raise ValueError('URL cannot be empty.')
-        try:
-            # Send the request to the page.
-            req = request.Request(url, headers={
-                'User-Agent': Config.Config.get_user_agent()
-            })
-            response = request.urlopen(req)
-            # Load the HTML page contents.
-            contents: str = response.read().decode('utf-8')
-        except (HTTPError, RemoteDisconnected, TimeoutError) as ex:
-            Logger.Logger.log_error(str(ex))
-            Logger.Logger.log_error('Request failed for URL: ' + url)
-            return None, None
-        # Parse the HTML page.
-        document = BeautifulSoup(contents, 'html.parser')
+        # Parse the lyrics blocks and the copyright notice only.
+        document: BeautifulSoup = LyricsScraper.LyricsScraper.parse(
+            contents, 'p', ['mxm-lyrics__content', 'mxm-lyrics__copyright']
+        )
         lyrics: str = ''
         lyrics_writer: str = ''
         # Look up all the blocks containing the song lyrics.
@@ -98,15 +66,59 @@ class MusixMatch(LyricsScraper.LyricsScraper):
                 lyrics_writer = lyrics_writer[11:]
         return lyrics, lyrics_writer
 
+    def __search(self, minimal: bool = False) -> str:
+        """
+        Finds the URL where the song lyrics is available at based on the song's query string.
+        :param minimal: If set to "True", a shorter version of the song query will be used instead of the complete one.
+        :type minimal: bool
+        :return: A string containing the URL found, if no URL is found, and empty string will be returned instead.
+        :rtype: str
+        :raise ValueError: If no search query has been defined for current song.
+        """
+        query: str = self.get_query(minimal)
+        if not query:
+            raise ValueError('No query defined for this song.')
+        query = parse.quote(query)
+        query = query.replace('%28', '(').replace('%29', ')')
+        url: str = 'https://www.musixmatch.com/it/search/' + query
+        # Send the request to the provider website, the download stops once search results have been received.
+        contents: Optional[str] = HttpClient.HttpClient.fetch(url, 'div', 'main-panel')
+        if contents is None:
+            self.failed = True
+            return ''
+        return MusixMatch.__find_link(contents)
+
+    def __load(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Extracts the song lyrics from the page that has been found in look up phase, then it will return it as a string.
+        :param url: A string containing the URL where the song lyrics is located at.
+        :type url: str
+        :return: A tuple containing both the lyrics and its author(s) or both None if no lyrics is found.
+        :rtype: Tuple[Optional[str], Optional[str]]
+        :raise ValueError: If an empty URL is given.
+        """
+        if not str:
+            raise ValueError('URL cannot be empty.')
+        # Load the HTML page contents, the download stops once the lyrics have been received.
+        contents: Optional[str] = HttpClient.HttpClient.fetch(url, 'p', 'mxm-lyrics__copyright')
+        if contents is None:
+            self.failed = True
+            return None, None
+        return MusixMatch.__extract(contents)
+
     def fetch(self) -> None:
         """
         Searches and fetches the lyrics for the song defined.
         """
         lyrics: Tuple[Optional[str], Optional[str]] = (None, None)
+        self.failed = False
         if self.query is not None:
             # If a search query for this song has been defined, search the lyrics using it.
             alternative: bool = False
             url: str = self.__search(False)
+            if self.cancelled:
+                # Another provider has already returned the lyrics.
+                return
             if not url and self.minimal_query is not None and not Config.Config.get_strict_lyrics():
                 # If no lyrics has been found using the normal search query, retry using a shorter and simpler one.
                 Logger.Logger.log('No lyrics found using full song name, retrying using a shorter version...')
@@ -115,17 +127,17 @@ class MusixMatch(LyricsScraper.LyricsScraper):
                 url = self.__search(True)
                 if not url:
                     Logger.Logger.log('No lyrics found in anyway.')
-            if url:
-                lyrics = MusixMatch.__load(url)
-                if not lyrics and not alternative and not Config.Config.get_strict_lyrics():
+            if url and not self.cancelled:
+                lyrics = self.__load(url)
+                if not lyrics and not alternative and not Config.Config.get_strict_lyrics() and not self.cancelled:
                     if self.minimal_query is not None:
                         # Lyrics were found but its page was empty, retry searching it using the shorter query version.
                         Logger.Logger.log('No lyrics found using full song name, retrying using a shorter version...')
                         # Repeat the search telling the method to use the shorter query version.
                         url = self.__search(True)
-                        if url:
+                        if url and not self.cancelled:
                             # Try again to fetch the song lyrics.
-                            lyrics = MusixMatch.__load(url)
+                            lyrics = self.__load(url)
                         else:
                             Logger.Logger.log('No lyrics found in anyway.')
         self.lyrics = lyrics[0]
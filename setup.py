@@ -18,9 +18,11 @@ setuptools.setup(
     keywords=['music', 'tagging', 'id3', 'mp3', 'm4a', 'flac', 'ogg'],
     install_requires=[
         'mutagen',
-        'beautifulsoup4',
-        'pydub'
+        'beautifulsoup4'
     ],
+    extras_require={
+        'replaygain': ['numpy']
+    },
     python_requires='>=3.5',
     classifiers=[
         'Development Status :: 3 - Alpha',